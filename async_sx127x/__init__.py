@@ -1,4 +1,10 @@
 from .radio_controller import RadioController  # noqa: F401
+from .radio_pool import RadioPool  # noqa: F401
 from .models import *  # noqa: F403
+from .packets import (PacketRecord, LoRaRxRecord, LoRaTxRecord,  # noqa: F401
+                      FSK_RX_Record, FSK_TX_Record)
+from .packet_buffer import PacketBuffer  # noqa: F401
+from .capture import CaptureReader, CaptureWriter  # noqa: F401
+from .rx_dispatcher import RxDispatcher  # noqa: F401
 
-__version__ = '0.1.2'
\ No newline at end of file
+__version__ = '0.1.2'
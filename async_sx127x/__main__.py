@@ -1,13 +1,13 @@
 
 
 import asyncio
-from async_sx127x.models import FSK_RX_Packet, FSK_TX_Packet, LoRaRxPacket, LoRaTxPacket
+from async_sx127x.packets import RX_RECORD, TX_RECORD
 from async_sx127x.radio_controller import RadioController
 
-async def on_received(data: LoRaRxPacket | FSK_RX_Packet):
+async def on_received(data: RX_RECORD):
     print(data)
 
-async def on_transmited(data: LoRaTxPacket | FSK_TX_Packet):
+async def on_transmited(data: TX_RECORD):
     print(data)
 
 async def test():
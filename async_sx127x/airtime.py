@@ -0,0 +1,127 @@
+from __future__ import annotations
+from functools import lru_cache
+from math import ceil
+from typing import Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install async-sx127x[numpy]
+    np = None  # type: ignore
+
+from async_sx127x.registers import SX127x_DcFree
+
+
+MAX_PAYLOAD = 255
+
+
+def lora_time_on_air(length: int, sf: int, bw: float, cr: int = 5,
+                     ldro: bool = False, implicit: bool = False,
+                     crc: bool = True, preamble: int = 8) -> float:
+    """
+    LoRa packet air time, ms (SX1276 datasheet 4.1.1.7). `bw` in kHz,
+    `cr` is the coding rate denominator 5..8 (4/5..4/8).
+    """
+    t_sym: float = 2 ** sf / bw
+    preamble_time: float = (preamble + 4.25) * t_sym
+    numerator: int = 8 * length - 4 * sf + 28 + 16 * crc - 20 * implicit
+    symbols: int = 8 + max(ceil(numerator / (4 * (sf - 2 * ldro))) * cr, 0)
+    return round(symbols * t_sym + preamble_time, 3)
+
+
+@lru_cache(maxsize=256)
+def lora_table(sf: int, bw: float, cr: int = 5, ldro: bool = False,
+               implicit: bool = False, crc: bool = True,
+               preamble: int = 8) -> tuple[float, ...]:
+    """ Air times of 0..255 bytes payloads of one configuration, ms """
+    return tuple(lora_time_on_air(length, sf, bw, cr, ldro, implicit, crc,
+                                  preamble)
+                 for length in range(MAX_PAYLOAD + 1))
+
+
+def fsk_time_on_air(length: int, bitrate: int, preamble: int = 8,
+                    sync_size: int = 6, crc: bool = True,
+                    dc_free: SX127x_DcFree = SX127x_DcFree.OFF,
+                    variable_length: bool = True,
+                    address: bool = False) -> float:
+    """
+    FSK packet air time, ms. Manchester coding doubles the bits after the
+    sync word, whitening adds none.
+    """
+    body: int = length + variable_length + address + 2 * crc
+    if dc_free == SX127x_DcFree.MANCHESTER:
+        body *= 2
+    return round((preamble + sync_size + body) * 8000 / bitrate, 3)
+
+
+@lru_cache(maxsize=256)
+def fsk_table(bitrate: int, preamble: int = 8, sync_size: int = 6,
+              crc: bool = True, dc_free: SX127x_DcFree = SX127x_DcFree.OFF,
+              variable_length: bool = True,
+              address: bool = False) -> tuple[float, ...]:
+    """ Air times of 0..255 bytes payloads of one configuration, ms """
+    return tuple(fsk_time_on_air(length, bitrate, preamble, sync_size, crc,
+                                 dc_free, variable_length, address)
+                 for length in range(MAX_PAYLOAD + 1))
+
+
+def lora_time_on_air_array(length: Any, sf: Any, bw: Any, cr: Any = 5,
+                           ldro: Any = False, implicit: Any = False,
+                           crc: Any = True, preamble: Any = 8) -> Any:
+    """
+    `lora_time_on_air` over broadcast arrays of parameters, e.g. all
+    candidate configurations at once. Returns numpy array if numpy is
+    installed, list otherwise.
+    """
+    if np is None:
+        return _broadcast(lora_time_on_air, length, sf, bw, cr, ldro,
+                          implicit, crc, preamble)
+    sf = np.asarray(sf, dtype=np.int64)
+    t_sym = np.exp2(sf) / np.asarray(bw, dtype=np.float64)
+    numerator = 8 * np.asarray(length, dtype=np.int64) - 4 * sf + 28 \
+        + 16 * np.asarray(crc, dtype=np.int64) \
+        - 20 * np.asarray(implicit, dtype=np.int64)
+    divider = 4 * (sf - 2 * np.asarray(ldro, dtype=np.int64))
+    symbols = 8 + np.maximum(np.ceil(numerator / divider)
+                             * np.asarray(cr, dtype=np.int64), 0)
+    preamble_time = (np.asarray(preamble, dtype=np.float64) + 4.25) * t_sym
+    return np.round(symbols * t_sym + preamble_time, 3)
+
+
+def fsk_time_on_air_array(length: Any, bitrate: Any, preamble: Any = 8,
+                          sync_size: Any = 6, crc: Any = True,
+                          manchester: Any = False,
+                          variable_length: Any = True,
+                          address: Any = False) -> Any:
+    """ `fsk_time_on_air` over broadcast arrays, see lora_time_on_air_array """
+    if np is None:
+        return _broadcast(_fsk_time_on_air, length, bitrate, preamble,
+                          sync_size, crc, manchester, variable_length, address)
+    body = np.asarray(length, dtype=np.int64) \
+        + np.asarray(variable_length, dtype=np.int64) \
+        + np.asarray(address, dtype=np.int64) \
+        + 2 * np.asarray(crc, dtype=np.int64)
+    body = body * (1 + np.asarray(manchester, dtype=np.int64))
+    bits = (np.asarray(preamble) + np.asarray(sync_size) + body) * 8000
+    return np.round(bits / np.asarray(bitrate, dtype=np.float64), 3)
+
+
+def _fsk_time_on_air(length: int, bitrate: int, preamble: int,
+                     sync_size: int, crc: bool, manchester: bool,
+                     variable_length: bool, address: bool) -> float:
+    dc_free = SX127x_DcFree.MANCHESTER if manchester else SX127x_DcFree.OFF
+    return fsk_time_on_air(length, bitrate, preamble, sync_size, crc, dc_free,
+                           variable_length, address)
+
+
+def _broadcast(func, *args: Any) -> Any:
+    sequences: list[Sequence] = [arg for arg in args
+                                 if isinstance(arg, (list, tuple, range))]
+    if not sequences:
+        return func(*args)
+    size: int = max(len(seq) for seq in sequences)
+    if any(len(seq) not in (1, size) for seq in sequences):
+        raise ValueError('Parameter sequences have different lengths')
+    columns = [arg if isinstance(arg, (list, tuple, range)) and len(arg) == size
+               else [arg[0] if isinstance(arg, (list, tuple, range)) else arg]
+               * size for arg in args]
+    return [func(*row) for row in zip(*columns)]
@@ -0,0 +1,2 @@
+from .runner import BenchCase, BenchReport, BenchResult  # noqa: F401
+from .suite import run_benchmarks  # noqa: F401
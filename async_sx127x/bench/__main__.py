@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+from async_sx127x.bench.suite import run_benchmarks
+
+
+async def main(args: argparse.Namespace) -> None:
+    report = await run_benchmarks(args.transport, args.device,
+                                  args.iterations, args.select,
+                                  args.serial_backend)
+    if args.output:
+        Path(args.output).write_text(str(report))
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SX127x driver benchmarks')
+    parser.add_argument('--transport', choices=['inproc', 'tcp', 'pty'],
+                        default='inproc', help='link to the local emulator')
+    parser.add_argument('--device', help='COM port or ip:port of real radio '
+                        'instead of emulator')
+    parser.add_argument('--serial-backend', choices=['aioserial', 'fd'],
+                        default='aioserial', help='serial port implementation')
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('-k', '--select', default='',
+                        help='run benchmarks containing this substring')
+    parser.add_argument('-o', '--output', help='JSON report file')
+    parser.add_argument('--log-level', default='WARNING')
+    arguments = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level=arguments.log_level)
+    asyncio.run(main(arguments))
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import inspect
+from typing import Any, Callable
+
+from async_sx127x.driver import SX127x_Driver
+from async_sx127x.emulator import SX127xEmulator
+from async_sx127x.radio_controller import RadioController
+from async_sx127x.registers import (SX127x_BW, SX127x_DcFree, SX127x_Field,
+                                    SX127x_FSK_SHAPING, SX127x_PA_Pin)
+from async_sx127x.bench.runner import BenchCase
+
+
+PAYLOAD = bytes(range(16))
+
+# Arguments of driver calls which can not be taken from the paired getter
+DRIVER_ARGS: dict[str, tuple] = {
+    'set_lora_bandwidth': (SX127x_BW.BW500,),
+    'select_power_amp_pin': (SX127x_PA_Pin.PA_BOOST,),
+    'set_pa_select': (True,),
+    'set_tx_power': (17,),
+    'set_low_noize_amplifier': (5, False),
+    'set_frequency': (433_000_000,),
+    'set_lora_fifo_addr_ptr': (0,),
+    'set_lora_rx_tx_fifo_base_addr': (0, 0),
+    'set_lora_irq_flags_mask': (0,),
+    'set_fsk_bitrate_frac': (0,),
+    'set_fsk_sync_value': (b'NSUNET',),
+    'set_fsk_data_shaping': (SX127x_FSK_SHAPING.GAUSSIAN_0_5,),
+    'set_fsk_dc_free_mode': (SX127x_DcFree.WHITENING,),
+    'set_fsK_packet_format': (True,),
+    'set_fsk_auto_afc': (True,),
+    'set_fsk_autoclear_afc': (True,),
+    'set_fsk_afc_bw': (1, 1),
+    'fsk_clear_fifo_on_crc_fail': (True,),
+    'get_field': (SX127x_Field.LORA_SF,),
+    'set_field': (SX127x_Field.LORA_SF, 7),
+    'get_lora_fei': (500,),
+    'get_lora_rssi_packet': (433_000_000,),
+    'get_lora_rssi_value': (433_000_000,),
+    'get_snr_and_rssi': (433_000_000,),
+}
+DRIVER_PREFIXES = ('get_', 'set_', 'select_', 'fsk_')
+
+
+def interface_cases(radio: RadioController) -> list[BenchCase]:
+    interface = radio.driver.interface
+
+    async def batch_read_x10() -> None:
+        async with interface.batch() as batch:
+            for address in range(0x01, 0x0B):
+                batch.read(address)
+
+    return [
+        BenchCase('interface.read', lambda: interface.read(0x42)),
+        BenchCase('interface.write', lambda: interface.write(0x39, [0x12])),
+        BenchCase('interface.read_several',
+                  lambda: interface.read_several(0x01, 0x70)),
+        BenchCase('interface.batch_read_x10', batch_read_x10),
+        BenchCase('interface.run_tx_then_rx_cont',
+                  interface.run_tx_then_rx_cont),
+        BenchCase('interface.run_tx_then_rx_single',
+                  interface.run_tx_then_rx_single),
+        BenchCase('interface.write_fsk_fifo',
+                  lambda: interface.write_fsk_fifo(PAYLOAD)),
+        BenchCase('interface.write_fsk_read_start',
+                  interface.write_fsk_read_start),
+        BenchCase('interface.write_fsk_read', interface.write_fsk_read),
+        BenchCase('interface.reset', interface.reset),
+    ]
+
+
+async def driver_cases(driver: SX127x_Driver, fsk: bool,
+                       skipped: dict[str, str]) -> list[BenchCase]:
+    """
+    Every public driver getter/setter of the modem. Setters write back the
+    value returned by the paired getter, unless DRIVER_ARGS lists them.
+    """
+    cases: list[BenchCase] = []
+    for name, method in inspect.getmembers(driver, inspect.iscoroutinefunction):
+        if not name.startswith(DRIVER_PREFIXES) or \
+                ('fsk' in name.lower()) != fsk:
+            continue
+        required: list[inspect.Parameter] = [
+            param for param in inspect.signature(method).parameters.values()
+            if param.default is inspect.Parameter.empty]
+        args: tuple | None = () if not required else DRIVER_ARGS.get(name)
+        getter: Callable | None = getattr(driver, 'get_' + name[4:], None)
+        if args is None and name.startswith('set_') and getter and \
+                len(required) == 1:
+            args = (await getter(),)
+        if args is None:
+            skipped[f'driver.{name}'] = 'no arguments known'
+            continue
+        cases.append(BenchCase(f'driver.{name}', _bind(method, args)))
+    return cases
+
+
+def lora_cases(radio: RadioController,
+               emulator: SX127xEmulator | None) -> list[BenchCase]:
+    cases: list[BenchCase] = [
+        BenchCase('lora.check_rx_input.idle', radio.lora.check_rx_input),
+        BenchCase('lora.read_config', radio.lora.read_config),
+        BenchCase('lora.send_single', lambda: radio.lora.send_single(PAYLOAD),
+                  iterations=20),
+        BenchCase('lora.init', radio.lora.init, iterations=5),
+    ]
+    if emulator:
+        cases.insert(1, BenchCase('lora.check_rx_input.packet',
+                                  radio.lora.check_rx_input,
+                                  setup=_injector(emulator)))
+    return cases
+
+
+def fsk_cases(radio: RadioController,
+              emulator: SX127xEmulator | None) -> list[BenchCase]:
+    cases: list[BenchCase] = [
+        BenchCase('fsk.check_rx_input.idle', radio.fsk.check_rx_input),
+        BenchCase('fsk.read_config', radio.fsk.read_config),
+        BenchCase('fsk.init', radio.fsk.init, iterations=5),
+    ]
+    if emulator:
+        cases.insert(1, BenchCase('fsk.check_rx_input.packet',
+                                  radio.fsk.check_rx_input,
+                                  setup=_injector(emulator)))
+    return cases
+
+
+def _bind(method: Callable, args: tuple) -> Callable:
+    return lambda: method(*args)
+
+
+def _injector(emulator: SX127xEmulator) -> Callable[[], Any]:
+    return lambda: emulator.inject(PAYLOAD, delay=0)
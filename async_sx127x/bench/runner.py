@@ -0,0 +1,118 @@
+from __future__ import annotations
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Literal, NamedTuple
+
+from pydantic import BaseModel
+
+from async_sx127x import __version__
+from async_sx127x.emulator import SX127xEmulator, serve_pty, serve_tcp
+from async_sx127x.interfaces.emulator import EmulatorInterface
+from async_sx127x.interfaces.stats import InterfaceStats
+from async_sx127x.radio_controller import RadioController
+
+
+TRANSPORT = Literal['inproc', 'tcp', 'pty']
+
+
+class BenchCase(NamedTuple):
+    name: str
+    call: Callable[[], Awaitable[Any]]
+    iterations: int | None = None  # limits iterations of slow cases
+    setup: Callable[[], Any] | None = None  # runs untimed before every call
+
+
+class BenchResult(BaseModel):
+    name: str
+    iterations: int
+    ops_per_sec: float
+    mean_us: float
+    p50_us: float
+    p99_us: float
+    round_trips: float  # interface transactions per call
+    bytes_out: float
+    bytes_in: float
+
+
+class BenchReport(BaseModel):
+    version: str
+    python: str
+    transport: str
+    timestamp: str
+    results: list[BenchResult] = []
+    skipped: dict[str, str] = {}
+
+    def __str__(self) -> str:
+        return self.model_dump_json(indent=4)
+
+
+async def measure(case: BenchCase, stats: InterfaceStats,
+                  iterations: int, warmup: int = 3) -> BenchResult:
+    iterations = min(iterations, case.iterations or iterations)
+    for _ in range(min(warmup, iterations)):
+        if case.setup:
+            case.setup()
+        await case.call()
+    durations: list[int] = []
+    start_counters = stats.totals()
+    for _ in range(iterations):
+        if case.setup:
+            case.setup()
+        started: int = time.perf_counter_ns()
+        await case.call()
+        durations.append(time.perf_counter_ns() - started)
+    transactions, bytes_out, bytes_in = (end - start for end, start
+                                         in zip(stats.totals(), start_counters))
+    total_us: float = sum(durations) / 1000
+    p99: float = durations[0] / 1000
+    if len(durations) > 1:
+        p99 = statistics.quantiles(durations, n=100)[98] / 1000
+    return BenchResult(name=case.name,
+                       iterations=iterations,
+                       ops_per_sec=round(iterations / total_us * 1e6, 1),
+                       mean_us=round(total_us / iterations, 1),
+                       p50_us=round(statistics.median(durations) / 1000, 1),
+                       p99_us=round(p99, 1),
+                       round_trips=transactions / iterations,
+                       bytes_out=bytes_out / iterations,
+                       bytes_in=bytes_in / iterations)
+
+
+async def connect_radio(transport: TRANSPORT, device: str | None,
+                        **kwargs) -> tuple[RadioController,
+                                           SX127xEmulator | None, Any]:
+    """
+    Connects and inits a radio. Without `device` a local emulator is served
+    by `transport`; the returned server must be closed by the caller.
+    """
+    radio = RadioController(**kwargs)
+    if device:
+        if not await radio.connect(device):
+            raise ConnectionError(f'Can not connect to {device}')
+        return radio, None, None
+    emulator = SX127xEmulator(time_scale=0)
+    server: Any = None
+    if transport == 'inproc':
+        radio.driver.set_interface(EmulatorInterface(emulator))
+        await radio.driver.interface.connect()
+        await radio.current_mode.init()
+        return radio, emulator, server
+    if transport == 'tcp':
+        server = await serve_tcp(emulator)
+        port: int = server.sockets[0].getsockname()[1]
+        address: str = f'127.0.0.1:{port}'
+    else:
+        server = serve_pty(emulator)
+        address = server.port
+    if not await radio.connect(address):
+        raise ConnectionError(f'Can not connect to emulator on {address}')
+    return radio, emulator, server
+
+
+def new_report(transport: str) -> BenchReport:
+    return BenchReport(version=__version__,
+                       python=platform.python_version(),
+                       transport=transport,
+                       timestamp=datetime.now().astimezone().isoformat())
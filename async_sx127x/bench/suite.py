@@ -0,0 +1,56 @@
+from __future__ import annotations
+from typing import Any
+
+from loguru import logger
+
+from async_sx127x.bench.cases import (driver_cases, fsk_cases,
+                                      interface_cases, lora_cases)
+from async_sx127x.bench.runner import (TRANSPORT, BenchCase, BenchReport,
+                                       connect_radio, measure, new_report)
+from async_sx127x.radio_controller import RadioController
+
+
+# Fast LoRa settings keep send_single sleeps (packet air time) short
+RADIO_SETTINGS: dict[str, Any] = {'sf': 7, 'bw': 500, 'ldro': False}
+
+
+async def run_benchmarks(transport: TRANSPORT = 'inproc',
+                         device: str | None = None,
+                         iterations: int = 200,
+                         select: str = '',
+                         serial_backend: str = 'aioserial') -> BenchReport:
+    """
+    Runs interface, driver and controller benchmarks whose name contains
+    `select` against a local emulator (or a real `device`).
+    """
+    report: BenchReport = new_report(device or transport)
+    radio, emulator, server = await connect_radio(
+        transport, device, serial_backend=serial_backend, **RADIO_SETTINGS)
+    stats = radio.driver.interface.enable_stats()
+
+    async def run(cases: list[BenchCase]) -> None:
+        for case in cases:
+            if select not in case.name:
+                continue
+            logger.info(f'Benchmark {case.name}')
+            report.results.append(await measure(case, stats, iterations))
+
+    try:
+        await run(interface_cases(radio))
+        await radio.lora.init()
+        await run(await driver_cases(radio.driver, False, report.skipped))
+        await radio.lora.init()
+        await run(lora_cases(radio, emulator))
+        await radio.fsk.init()
+        await run(await driver_cases(radio.driver, True, report.skipped))
+        await radio.fsk.init()
+        await run(fsk_cases(radio, emulator))
+    finally:
+        await _shutdown(radio, server)
+    return report
+
+
+async def _shutdown(radio: RadioController, server: Any) -> None:
+    await radio.driver.disconnect()
+    if server is not None:
+        server.close()
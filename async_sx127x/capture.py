@@ -0,0 +1,257 @@
+from __future__ import annotations
+import asyncio
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from enum import IntEnum
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple
+
+from loguru import logger
+
+from async_sx127x.models import (FSK_RX_Packet, FSK_TX_Packet, LoRaRxPacket,
+                                 LoRaTxPacket, RadioPacket)
+from async_sx127x.packets import (FSK_RX_Record, FSK_TX_Record, LoRaRxRecord,
+                                  LoRaTxRecord, PacketRecord)
+
+
+# File: FILE_HEADER, then records of RECORD_HEADER + caller + data
+CAPTURE_MAGIC = b'SXCAP'
+CAPTURE_VERSION = 1
+FILE_HEADER = struct.Struct('<5sB2x')  # magic, version
+# kind, flags, time_ns, frequency, rssi, snr, fei, sf, bw (kHz), Tpkt (ms),
+# attempt, caller length, data length
+RECORD_HEADER = struct.Struct('<BBqIhhiBffHBH')
+FLAG_CRC_CORRECT = 0x01
+FLAG_LDRO = 0x02
+
+
+class CaptureKind(IntEnum):
+    LORA_RX = 0
+    LORA_TX = 1
+    FSK_RX = 2
+    FSK_TX = 3
+
+
+def encode_record(packet: PacketRecord) -> bytes:
+    """ Packs a packet record into capture record bytes """
+    rssi = snr = fei = sf = attempt = 0
+    bw = t_pkt = 0.0
+    flags: int = 0
+    if isinstance(packet, LoRaRxRecord):
+        kind = CaptureKind.LORA_RX
+        rssi, snr, fei = packet.rssi_pkt, packet.snr, packet.fei
+    elif isinstance(packet, LoRaTxRecord):
+        kind = CaptureKind.LORA_TX
+        attempt = packet.attempt
+    elif isinstance(packet, FSK_RX_Record):
+        kind = CaptureKind.FSK_RX
+        rssi = packet.rssi_pkt
+    elif isinstance(packet, FSK_TX_Record):
+        kind = CaptureKind.FSK_TX
+        attempt = packet.attempt
+    else:
+        raise TypeError(f'Unknown packet record: {type(packet)}')
+    if isinstance(packet, (LoRaRxRecord, LoRaTxRecord)):
+        sf, bw, t_pkt = packet.sf, packet.bw, packet.Tpkt
+        flags |= FLAG_LDRO if packet.ldro else 0
+    if isinstance(packet, (LoRaRxRecord, FSK_RX_Record)):
+        flags |= FLAG_CRC_CORRECT if packet.crc_correct else 0
+    caller: bytes = _truncate_utf8(packet.caller, 255)
+    data: bytes = packet.data[:0xFFFF]
+    return RECORD_HEADER.pack(kind, flags, packet.time_ns, packet.frequency,
+                              rssi, snr, fei, sf, bw, t_pkt,
+                              min(attempt, 0xFFFF), len(caller),
+                              len(data)) + caller + data
+
+
+def _truncate_utf8(text: str, limit: int) -> bytes:
+    """ UTF-8 bytes of `text` cut to `limit` on a character boundary """
+    return text.encode()[:limit].decode(errors='ignore').encode()
+
+
+class CapturedPacket(NamedTuple):
+    kind: CaptureKind
+    time_ns: int
+    frequency: int
+    rssi_pkt: int
+    snr: int
+    fei: int
+    crc_correct: bool
+    sf: int
+    bw: float
+    ldro: bool
+    Tpkt: float
+    attempt: int
+    caller: str
+    data: bytes
+
+    def to_model(self) -> RadioPacket:
+        moment = datetime.fromtimestamp(self.time_ns / 1e9)
+        if self.kind in (CaptureKind.LORA_RX, CaptureKind.LORA_TX):
+            moment = moment.astimezone()
+        fields = {'timestamp': moment.isoformat(' ', 'milliseconds'),
+                  'data': self.data, 'data_len': len(self.data),
+                  'frequency': self.frequency, 'caller': self.caller}
+        if self.kind == CaptureKind.LORA_RX:
+            return LoRaRxPacket(**fields, snr=self.snr, rssi_pkt=self.rssi_pkt,
+                                crc_correct=self.crc_correct, fei=self.fei,
+                                sf=self.sf, bw=self.bw, ldro=self.ldro,
+                                Tpkt=self.Tpkt)
+        if self.kind == CaptureKind.LORA_TX:
+            return LoRaTxPacket(**fields, sf=self.sf, bw=self.bw,
+                                ldro=self.ldro, Tpkt=self.Tpkt,
+                                attempt=self.attempt)
+        if self.kind == CaptureKind.FSK_RX:
+            return FSK_RX_Packet(**fields, rssi_pkt=self.rssi_pkt,
+                                 crc_correct=self.crc_correct)
+        return FSK_TX_Packet(**fields, attempt=self.attempt)
+
+
+class CaptureWriter:
+    """
+    Append-only binary capture of packets. `write()` only queues the record,
+    a background task encodes queued records every `flush_interval` and
+    writes them in a worker thread, the file is fsynced every
+    `fsync_interval`.
+    """
+    def __init__(self, path: str | Path, flush_interval: float = 0.5,
+                 fsync_interval: float = 5.0) -> None:
+        self.path: Path = Path(path)
+        self.flush_interval: float = flush_interval
+        self.fsync_interval: float = fsync_interval
+        self.written: int = 0
+        self._queue: list[PacketRecord] = []
+        self._file: IO[bytes] | None = None
+        self._task: asyncio.Task | None = None
+        self._last_fsync: float = 0.0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._file = await asyncio.to_thread(self._open)
+        self._last_fsync = time.monotonic()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    def _open(self) -> IO[bytes]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # unbuffered: a failed write leaves no bytes behind to be flushed
+        file: IO[bytes] = self.path.open('ab', buffering=0)
+        if file.tell() == 0:
+            file.write(FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+        return file
+
+    def write(self, packet: PacketRecord) -> None:
+        self._queue.append(packet)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as err:  # the capture must outlive bad writes
+                logger.error(f'Capture write to {self.path} failed: {err!r}')
+
+    async def flush(self, fsync: bool = False) -> None:
+        async with self._lock:
+            await self._flush(fsync)
+
+    async def _flush(self, fsync: bool) -> None:
+        if self._file is None:
+            return
+        batch: list[PacketRecord] = []
+        chunks: list[bytes] = []
+        for packet in self._queue:
+            try:
+                chunks.append(encode_record(packet))
+            except (TypeError, ValueError, struct.error) as err:
+                logger.error(f'Capture skips {type(packet).__name__}: {err!r}')
+                continue
+            batch.append(packet)
+        self._queue = []
+        chunk: bytes = b''.join(chunks)
+        now: float = time.monotonic()
+        fsync = fsync or now - self._last_fsync >= self.fsync_interval
+        try:
+            if chunk or fsync:
+                await asyncio.to_thread(self._write_chunk, self._file, chunk,
+                                        fsync)
+        except BaseException:
+            self._queue[:0] = batch  # written again by the next flush
+            raise
+        if fsync:
+            self._last_fsync = now
+        self.written += len(batch)
+
+    @staticmethod
+    def _write_chunk(file: IO[bytes], chunk: bytes, fsync: bool) -> None:
+        position: int = file.tell()
+        try:
+            view = memoryview(chunk)
+            while view:
+                view = view[file.write(view):]
+            if fsync:
+                os.fsync(file.fileno())
+        except OSError:
+            file.truncate(position)  # the batch is written again
+            raise
+
+    async def stop(self) -> None:
+        """ Writes queued packets, fsyncs and closes the file """
+        async with self._lock:  # a write in the worker thread is not cut
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+            if self._file is not None:
+                await self._flush(fsync=True)
+                self._file.close()
+                self._file = None
+
+
+class CaptureReader:
+    """
+    Memory-mapped reader of capture files. A truncated record at the end
+    (e.g. after power loss) is skipped.
+    """
+    def __init__(self, path: str | Path) -> None:
+        self.path: Path = Path(path)
+
+    def __iter__(self) -> Iterator[CapturedPacket]:
+        with self.path.open('rb') as file:
+            if os.fstat(file.fileno()).st_size < FILE_HEADER.size:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                magic, version = FILE_HEADER.unpack_from(view, 0)
+                if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+                    raise ValueError(f'{self.path} is not a capture file '
+                                     f'of version {CAPTURE_VERSION}')
+                yield from self._records(view)
+
+    @staticmethod
+    def _records(view: mmap.mmap) -> Iterator[CapturedPacket]:
+        offset: int = FILE_HEADER.size
+        size: int = len(view)
+        header_size: int = RECORD_HEADER.size
+        while offset + header_size <= size:
+            (kind, flags, time_ns, frequency, rssi, snr, fei, sf, bw, t_pkt,
+             attempt, caller_len, data_len) = RECORD_HEADER.unpack_from(view,
+                                                                        offset)
+            offset += header_size
+            end: int = offset + caller_len + data_len
+            if end > size:
+                return
+            caller: str = view[offset:offset + caller_len].decode(
+                errors='replace')
+            data: bytes = view[offset + caller_len:end]
+            offset = end
+            yield CapturedPacket(CaptureKind(kind), time_ns, frequency, rssi,
+                                 snr, fei, bool(flags & FLAG_CRC_CORRECT), sf,
+                                 round(bw, 3), bool(flags & FLAG_LDRO),
+                                 round(t_pkt, 3), attempt, caller, data)
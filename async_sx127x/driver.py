@@ -1,22 +1,36 @@
-from ast import literal_eval
+from contextlib import asynccontextmanager
 import math
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable
 from loguru import logger
 from async_sx127x.fsk_sequencer import Sequencer
-from async_sx127x.interfaces.base_interface import BaseInterface
+from async_sx127x.interfaces.base_interface import BaseInterface, CommandBatch
+from async_sx127x.interfaces.emulator import EmulatorInterface
 from async_sx127x.interfaces.ethernet import EthernetInterface
+from async_sx127x.interfaces.image import ImageInterface
+from async_sx127x.interfaces.replay import ReplayInterface
 from async_sx127x.interfaces.serial import SerialInterface
+from async_sx127x.interfaces.serial_fd import FdSerialInterface
+from async_sx127x.interfaces.wire_log import PlaybackInterface, WireRecorder
+from async_sx127x.register_image import (RegisterImage, decode_frequency,
+                                         decode_fsk_bitrate,
+                                         decode_fsk_deviation,
+                                         decode_lora_bandwidth,
+                                         decode_lora_coding_rate,
+                                         decode_lora_fei, decode_lora_rssi,
+                                         decode_lora_snr, twos_comp,
+                                         decode_modulation,
+                                         decode_tx_power_dbm,
+                                         contiguous_bursts, diff_bursts)
+from async_sx127x.register_shadow import (FSK_UPLOAD_SKIP, LORA_UPLOAD_SKIP,
+                                          RegisterShadow)
 from async_sx127x.registers import (SX127x_Modulation, SX127x_RestartRxMode,
                                     SX127x_FSK_ISR, SX127x_FSK_SHAPING,
                                     SX127x_HeaderMode, SX127x_PA_Pin,
                                     SX127x_Registers, SX127x_Mode, SX127x_BW,
-                                    SX127x_LoRa_ISR, SX127x_CR, SX127x_DcFree)
-
-
-def twos_comp(val, bits: int):
-    """compute the 2's complement of int value val"""
-    if (val & (1 << (bits - 1))) != 0: # if sign bit is set e.g., 8bit: 128-255
-        val = val - (1 << bits)        # compute negative value
-    return val                         # return positive value as is
+                                    SX127x_LoRa_ISR, SX127x_CR, SX127x_DcFree,
+                                    SX127x_Field)
+from async_sx127x.tracing import traced
 
 
 def is_valid_ip(data: str) -> bool:
@@ -52,141 +66,332 @@ class SX127x_Driver:
         self.interface = SerialInterface()
         self.fsk_sequencer = Sequencer(self.interface)
         self.pa_boost: bool = kwargs.get('pa_boost', True)
+        # 'aioserial' (thread pool) or 'fd' (event loop file descriptor, POSIX)
+        self.serial_backend: str = kwargs.get('serial_backend', 'aioserial')
+        self.replay_speed: float | None = kwargs.get('replay_speed', 1.0)
+        self.wire_log: str | None = kwargs.get('wire_log', None)
+        self.wire_recorder: WireRecorder | None = None
+        self.shadow: RegisterShadow | None = None
+        if kwargs.get('shadow_registers', False):
+            self.shadow = RegisterShadow()
+        self._batch: CommandBatch | None = None
+        self._reset_images: dict[SX127x_Modulation, RegisterImage] = {}
         logger.info(f'PA_BOOST = {self.pa_boost}')
 
     def set_interface(self, interface: BaseInterface) -> None:
         self.interface = interface
+        self.fsk_sequencer.interface = interface
+        self.invalidate_shadow()
+        self._reset_images.clear()
+
+    def invalidate_shadow(self, address: int | None = None) -> None:
+        if self.shadow is not None:
+            self.shadow.invalidate(address)
+
+    async def sync_shadow(self) -> None:
+        """ Reload whole shadow register file by one burst read """
+        await self.get_all_registers()
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[CommandBatch]:
+        """
+        Queue register writes and send them by one transport write. Reads
+        which can not be served by the shadow flush the queue first.
+        """
+        if self._batch is not None:
+            yield self._batch
+            return
+        self._batch = self.interface.batch()
+        try:
+            async with self._batch as batch:
+                yield batch
+        finally:
+            self._batch = None
+
+    async def _flush_batch(self) -> None:
+        if self._batch is not None:
+            await self._batch.execute()
+
+    async def read_register(self, address: int, cached: bool = True) -> int:
+        if self.shadow is None:
+            await self._flush_batch()
+            return await self.interface.read(address)
+        if cached:
+            value: int | None = self.shadow.get(address)
+            if value is not None:
+                return value
+        await self._flush_batch()
+        value = await self.interface.read(address)
+        self.shadow.update(address, [value])
+        return value
+
+    async def read_registers(self, address: int, amount: int) -> list[int]:
+        if self.shadow is None:
+            await self._flush_batch()
+            return await self.interface.read_several(address, amount)
+        values: list[int] | None = self.shadow.get_several(address, amount)
+        if values is not None:
+            return values
+        await self._flush_batch()
+        values = await self.interface.read_several(address, amount)
+        if address != SX127x_Registers.FIFO.value:
+            self.shadow.update(address, values)
+        return values
+
+    async def write_register(self, address: int,
+                             data: bytes | list[int]) -> None:
+        if self._batch is not None:
+            self._batch.write(address, data)
+        else:
+            await self.interface.write(address, data)
+        if self.shadow is not None and address != SX127x_Registers.FIFO.value:
+            self.shadow.update(address, data)
+
+    async def _read_addresses(self, addresses: set[int]) -> dict[int, int]:
+        """ Registers values, missing in shadow are read by one burst """
+        values: dict[int, int] = {}
+        if self.shadow is not None:
+            for addr in addresses:
+                value: int | None = self.shadow.get(addr)
+                if value is not None:
+                    values[addr] = value
+        missing: list[int] = sorted(addresses - values.keys())
+        if len(missing) == 1:
+            values[missing[0]] = await self.read_register(missing[0])
+        elif missing:
+            start: int = missing[0]
+            data: list[int] = await self.read_registers(start,
+                                                        missing[-1] - start + 1)
+            values.update((addr, data[addr - start]) for addr in missing)
+        return values
+
+    async def read_fields(self, *fields: SX127x_Field) -> dict[SX127x_Field, Any]:
+        addresses: set[int] = {field.address + i for field in fields
+                               for i in range(field.value.size)}
+        values: dict[int, int] = await self._read_addresses(addresses)
+        return {field: field.decode([values[field.address + i]
+                                     for i in range(field.value.size)])
+                for field in fields}
+
+    async def get_field(self, field: SX127x_Field) -> Any:
+        return (await self.read_fields(field))[field]
+
+    async def update_fields(self, fields: dict[SX127x_Field, Any]) -> None:
+        """
+        Changes are grouped by register, so every affected register is read
+        (only if it is changed partially) and written once. Consecutive
+        registers are written by one burst.
+        """
+        pending: dict[int, tuple[int, int]] = {}
+        for field, value in fields.items():
+            for address, mask, bits in field.encode(value):
+                old_mask, old_bits = pending.get(address, (0, 0))
+                pending[address] = (old_mask | mask, (old_bits & ~mask) | bits)
+        partial: set[int] = {addr for addr, (mask, _) in pending.items()
+                             if mask != 0xFF}
+        current: dict[int, int] = await self._read_addresses(partial)
+        values: dict[int, int] = {}
+        op_mode_addr = SX127x_Registers.OP_MODE.value
+        for addr, (mask, bits) in pending.items():
+            value: int = (current.get(addr, 0) & ~mask) | bits
+            # operation mode can be changed by chip itself, always write it
+            if addr != op_mode_addr and current.get(addr) == value:
+                continue
+            values[addr] = value
+        for address, data in contiguous_bursts(values):
+            await self.write_register(address, data)
+
+    async def set_field(self, field: SX127x_Field, value: Any) -> None:
+        await self.update_fields({field: value})
+
+    @traced
+    async def upload_config(self, modulation: SX127x_Modulation,
+                            configure: Callable[[], Awaitable[None]]) -> None:
+        """
+        Compile configuration made by `configure` coroutine into registers
+        image and upload its difference with reset state by burst writes.
+        Must be called right after reset.
+        """
+        base: RegisterImage | None = self._reset_images.get(modulation)
+        if base is None:
+            await self.set_modulation(modulation)
+            base = RegisterImage(await self.get_all_registers())
+            self._reset_images[modulation] = base
+        target: RegisterImage = base.copy()
+        interface: BaseInterface = self.interface
+        self.interface = ImageInterface(target)
+        try:
+            await configure()
+        finally:
+            self.interface = interface
+        await self.upload_image(base, target)
+
+    async def upload_image(self, base: RegisterImage,
+                           target: RegisterImage) -> None:
+        """
+        Chip is put to sleep before modulation change, then changed registers
+        are written by contiguous bursts and OP_MODE is written last.
+        """
+        addr = SX127x_Registers.OP_MODE.value
+        op_mode: int = target[addr]
+        sleep: int = (op_mode & 0xF8) | SX127x_Mode.SLEEP.value
+        if decode_modulation(op_mode) == SX127x_Modulation.LORA:
+            skip: frozenset[int] = LORA_UPLOAD_SKIP
+        else:
+            skip = FSK_UPLOAD_SKIP
+        await self._flush_batch()
+        async with self.interface.batch() as batch:
+            # LongRangeMode bit can be changed only in sleep mode
+            batch.write(addr, [sleep & 0x7F])
+            batch.write(addr, [sleep])
+            for address, data in diff_bursts(base, target, skip | {addr}):
+                batch.write(address, data)
+            batch.write(addr, [op_mode])
+        if self.shadow is not None:
+            self.shadow.load(target.start, target.data)
+
+    async def run_tx_then_rx_cont(self) -> None:
+        await self._flush_batch()
+        await self.interface.run_tx_then_rx_cont()
+        self.invalidate_shadow(SX127x_Registers.OP_MODE.value)
+
+    async def run_tx_then_rx_single(self) -> None:
+        await self._flush_batch()
+        await self.interface.run_tx_then_rx_single()
+        self.invalidate_shadow(SX127x_Registers.OP_MODE.value)
 
     async def connect(self, port_or_ip: str) -> bool:
         data: list[str] = port_or_ip.split(':')
-        if len(data) == 2 and is_valid_ip(data[0]):
+        if port_or_ip == 'emulator':
+            logger.info('Connecting to in-process emulator')
+            self.interface = EmulatorInterface()
+        elif port_or_ip.startswith('replay:'):
+            logger.info(f'Replaying {port_or_ip[7:]}')
+            self.interface = ReplayInterface(speed=self.replay_speed)
+        elif port_or_ip.startswith('playback:'):
+            logger.info(f'Playback of {port_or_ip[9:]}')
+            self.interface = PlaybackInterface()
+        elif len(data) == 2 and is_valid_ip(data[0]):
             logger.info(f'Connecting to TCP interface: {port_or_ip}')
             self.interface = EthernetInterface()
         else:
             logger.info(f'Connection to serial interface: {port_or_ip}')
-            self.interface = SerialInterface()
-        return await self.interface.connect(port_or_ip)
+            self.interface = self._serial_interface()
+        self.fsk_sequencer.interface = self.interface
+        self.invalidate_shadow()
+        self._reset_images.clear()
+        if not await self.interface.connect(port_or_ip):
+            return False
+        if self.wire_log:
+            self.wire_recorder = WireRecorder(self.interface, self.wire_log)
+            await self.wire_recorder.start()
+        return True
+
+    def _serial_interface(self) -> BaseInterface:
+        if self.serial_backend == 'fd':
+            if os.name == 'posix':
+                return FdSerialInterface()
+            logger.warning('fd serial backend is POSIX only, using aioserial')
+        return SerialInterface()
 
     async def disconnect(self) -> bool:
-        return await self.interface.disconnect()
+        if self.interface.notifications:
+            try:
+                await self.interface.disable_notifications()
+            except (RuntimeError, ConnectionError) as err:
+                logger.warning(f'Can not disable radio notifications: {err}')
+        result: bool = await self.interface.disconnect()
+        if self.wire_recorder is not None:
+            await self.wire_recorder.stop()
+            self.wire_recorder = None
+        return result
 
     async def reset(self) -> None:
+        await self._flush_batch()
         await self.interface.reset()
+        self.invalidate_shadow()
 
     # @exception_handler
     async def get_modulation(self) -> SX127x_Modulation:
-        result: int = await self.interface.read(SX127x_Registers.OP_MODE.value)
-        return SX127x_Modulation(result & 0x80)
+        return await self.get_field(SX127x_Field.MODULATION)
 
     # @exception_handler
     async def get_operation_mode(self) -> SX127x_Mode:
-        resutl: int = await self.interface.read(SX127x_Registers.OP_MODE.value)
-        return SX127x_Mode(resutl & 0x07)
+        addr = SX127x_Registers.OP_MODE.value
+        resutl: int = await self.read_register(addr, cached=False)
+        return SX127x_Field.MODE.decode([resutl])
 
     async def set_sleep_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr,
-                                   [(reg & 0xF8) | SX127x_Mode.SLEEP.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.SLEEP)
 
     async def set_standby_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr,
-                                   [(reg & 0xF8) | SX127x_Mode.STDBY.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.STDBY)
 
     async def set_modulation(self, modulation: SX127x_Modulation) -> None:
         await self.set_sleep_mode()
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [(reg & 0x7F) | modulation.value])
+        await self.set_field(SX127x_Field.MODULATION, modulation)
+        if self.shadow is not None:
+            # modem registers page was switched, reload it by one burst
+            await self.sync_shadow()
 
     async def set_lora_header_mode(self, mode: SX127x_HeaderMode) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        reg: int = await self.interface.read(addr) & 0xFE
-        await self.interface.write(addr, [reg | mode.value])
+        await self.set_field(SX127x_Field.LORA_HEADER_MODE, mode)
 
     # @exception_handler
     async def get_lora_header_mode(self) -> SX127x_HeaderMode:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        result: int = await self.interface.read(addr)
-        return SX127x_HeaderMode(result & 0x01)
+        return await self.get_field(SX127x_Field.LORA_HEADER_MODE)
 
     async def set_lora_coding_rate(self, coding_rate: int) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        cr: int = await self.interface.read(addr) & 0xF1
-        await self.interface.write(addr, [cr | self.cr[coding_rate].value])
+        await self.set_field(SX127x_Field.LORA_CODING_RATE,
+                             self.cr[coding_rate])
 
     # @exception_handler
     async def get_lora_coding_rate(self) -> int:
         addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        result: int = await self.interface.read(addr)
-        return literal_eval(SX127x_CR(result & 0x0E).name.replace('CR', ''))
+        return decode_lora_coding_rate(await self.read_register(addr))
 
     async def set_lora_bandwidth(self, bandwidth: SX127x_BW) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        bw: int = await self.interface.read(addr) & 0x0F
-        await self.interface.write(addr, [bw | bandwidth.value])
+        await self.set_field(SX127x_Field.LORA_BANDWIDTH, bandwidth)
 
     async def set_lora_payload_length(self, payload_length) -> None:
-        addr = SX127x_Registers.LORA_PAYLOAD_LENGTH.value
-        await self.interface.write(addr, [payload_length])
+        await self.set_field(SX127x_Field.LORA_PAYLOAD_LENGTH, payload_length)
 
     async def get_lora_payload_length(self) -> int:
-        addr = SX127x_Registers.LORA_PAYLOAD_LENGTH.value
-        return await self.interface.read(addr)
+        return await self.get_field(SX127x_Field.LORA_PAYLOAD_LENGTH)
 
     # @exception_handler
     async def get_lora_bandwidth(self) -> int | float:
         addr = SX127x_Registers.LORA_MODEM_CONFIG_1.value
-        data: int = await self.interface.read(addr)
-        val: str = SX127x_BW(data & 0xF0).name.replace('_', '.')
-        return literal_eval(val.replace('BW', ''))
+        return decode_lora_bandwidth(await self.read_register(addr))
 
     async def set_lora_sf(self, spreading_factor: int) -> None:
         if 6 <= spreading_factor <= 12:
-            addr = SX127x_Registers.LORA_MODEM_CONFIG_2.value
-            sf: int = await self.interface.read(addr) & 0x0F
-            await self.interface.write(addr, [sf | spreading_factor << 4])
+            await self.set_field(SX127x_Field.LORA_SF, spreading_factor)
         else:
             raise ValueError(f'Incorrect SF value {spreading_factor}. SF must'\
                              f' be from 6 to 12.')
 
     async def get_lora_sf(self) -> int:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_2.value
-        result: int = await self.interface.read(addr)
-        return (result & 0xF0) >> 4
+        return await self.get_field(SX127x_Field.LORA_SF)
 
     async def set_lora_crc_mode(self, enable: bool) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_2.value
-        crc: int = await self.interface.read(addr) & 0xfb
-        await self.interface.write(addr, [crc | (enable << 2)])
+        await self.set_field(SX127x_Field.LORA_CRC, enable)
 
     async def get_lora_crc_mode(self) -> bool:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_2.value
-        result: int = await self.interface.read(addr)
-        return bool(result & 0x04)
-
-    async def __disable_ocp(self) -> None:
-        await self.interface.write(SX127x_Registers.OCP.value, [0x2B])
+        return await self.get_field(SX127x_Field.LORA_CRC)
 
     async def select_power_amp_pin(self, pin: SX127x_PA_Pin) -> None:
-        addr = SX127x_Registers.PA_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0x7F
-        await self.interface.write(addr, [(pin.value << 7) | reg])
+        await self.set_field(SX127x_Field.PA_SELECT, pin.value)
 
     async def set_pa_select(self, pa_select: bool) -> None:
-        addr = SX127x_Registers.PA_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0x7F
-        await self.interface.write(addr, [(pa_select << 7) | reg])
+        await self.set_field(SX127x_Field.PA_SELECT, pa_select)
 
     async def get_chip_version(self) -> int:
-        return await self.interface.read(SX127x_Registers.VERSION.value)
+        return await self.read_register(SX127x_Registers.VERSION.value)
 
     async def set_tx_power(self, power_dbm: int) -> None:
         """ -3 to 12 - RFO; 13 to 20 - PA_BOOST """
 
-        await self.__disable_ocp()
         ENABLE_20dBm = 0x87
         DISABLE_20dBm = 0x84
         if power_dbm >= 20:
@@ -198,150 +403,119 @@ class SX127x_Driver:
         else:
             pa_select = SX127x_PA_Pin.RFO
         if not pa_select and power_dbm <= 12:
-            max_output = 0x02 << 4  # 12dbm
+            max_power = 0x02  # 12dbm
             power_dbm += 3
         elif pa_select:
-            max_output: int = 0x07 << 4
+            max_power: int = 0x07
         else:
             raise ValueError('Incorrect power output! For RFO pin max output '\
                              'power is 12dBm')
 
+        pa_dac: int = DISABLE_20dBm
         if not self.pa_boost:
             power_dbm = 15 if power_dbm > 15 else power_dbm
-            await self.interface.write(SX127x_Registers.PA_DAC.value,
-                                       [DISABLE_20dBm])
-            await self.interface.write(SX127x_Registers.PA_CONFIG.value,
-                                       [max_output | power_dbm])
+        elif 17 < power_dbm <= 20:
+            pa_dac = ENABLE_20dBm
+            power_dbm = 15  # Pout=Pmax-(15-OutputPower)
         else:
-            if 17 < power_dbm <= 20:
-                await self.interface.write(SX127x_Registers.PA_DAC.value,
-                                           [ENABLE_20dBm])
-                power_dbm = 15  # Pout=Pmax-(15-OutputPower)
-            else:
-                await self.interface.write(SX127x_Registers.PA_DAC.value,
-                                           [DISABLE_20dBm])
-                power_dbm -= 2  # Pout=17-(15-OutputPower) [dBm]
-            data: int = (pa_select.value << 7) | power_dbm | max_output
-            await self.interface.write(SX127x_Registers.PA_CONFIG.value, [data])
+            power_dbm -= 2  # Pout=17-(15-OutputPower) [dBm]
+        await self.update_fields({SX127x_Field.OCP: 0x2B,  # disable OCP
+                                  SX127x_Field.PA_DAC: pa_dac,
+                                  SX127x_Field.PA_SELECT: pa_select,
+                                  SX127x_Field.MAX_POWER: max_power,
+                                  SX127x_Field.OUTPUT_POWER: power_dbm})
 
     async def get_tx_power_dbm(self) -> float:
-        reg: int = await self.interface.read(SX127x_Registers.PA_CONFIG.value)
-        max_output: float = 10.8 + 0.6 * ((reg >> 4) & 0x07)
-        pa_select: int = reg >> 7
-        output_power: int = reg & 0x0F
-        if pa_select:
-            output_power_dbm: float = 17 - (15 - output_power)
-        else:
-            output_power_dbm: float = max_output - (15 - output_power)
-
-        reg_pa_dac: int = await self.interface.read(SX127x_Registers.PA_DAC.value)
-        if reg_pa_dac == 0x87:
-            if output_power == 15:
-                output_power_dbm = 20
-        return output_power_dbm
+        reg: int = await self.read_register(SX127x_Registers.PA_CONFIG.value)
+        reg_pa_dac: int = await self.read_register(SX127x_Registers.PA_DAC.value)
+        return decode_tx_power_dbm(reg, reg_pa_dac)
 
     async def set_lora_sync_word(self, sync_word: int) -> None:
         if 0 <= sync_word <= 255:
-            await self.interface.write(SX127x_Registers.LORA_SYNC_WORD.value,
-                                       [sync_word])
+            await self.set_field(SX127x_Field.LORA_SYNC_WORD, sync_word)
         else:
             raise ValueError(f'Incorrect sync word value. Value must be from '\
                              f'0 to 255, but got {sync_word}.')
 
     async def get_lora_sync_word(self) -> int:
-        return await self.interface.read(SX127x_Registers.LORA_SYNC_WORD.value)
+        return await self.get_field(SX127x_Field.LORA_SYNC_WORD)
 
     async def set_lora_preamble_length(self, length: int) -> None:
         if length > 100:
             raise ValueError('Incorrect preamble length. Max preamble length '\
                              'is 100.')
         length = 6 if length < 6 else length
-        await self.interface.write(SX127x_Registers.LORA_PREAMBLE_MSB.value,
-                                   [length >> 8, length & 0xFF])
+        await self.set_field(SX127x_Field.LORA_PREAMBLE_LENGTH, length)
 
     async def get_lora_preamble_length(self) -> int:
-        addr = SX127x_Registers.LORA_PREAMBLE_MSB.value
-        return await self.interface.read(addr)
+        return await self.get_field(SX127x_Field.LORA_PREAMBLE_LENGTH)
 
     async def set_lora_auto_gain_control(self, agc_flag: bool) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_3.value
-        lna_state: int = await self.interface.read(addr) & 0xFB
-        await self.interface.write(addr, [lna_state | (agc_flag << 2)])
+        await self.set_field(SX127x_Field.LORA_AGC, agc_flag)
 
     async def get_lora_auto_gain_control(self) -> bool:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_3.value
-        answer: int = await self.interface.read(addr)
-        return bool(answer & 0x04)
+        return await self.get_field(SX127x_Field.LORA_AGC)
 
     async def set_low_noize_amplifier(self, lna_gain: int,
                                       lna_boost: bool) -> None:
         """lna_gain = 1 - min gain; 6 - max gain"""
-        await self.interface.write(SX127x_Registers.LNA.value,
-                                   [(lna_gain << 5) + 3 * lna_boost])
+        await self.write_register(SX127x_Registers.LNA.value,
+                                  [(lna_gain << 5) + 3 * lna_boost])
 
     async def get_lna_boost(self) -> bool:
-        answer: int = await self.interface.read(SX127x_Registers.LNA.value)
-        return bool(answer & 0x03)
+        return bool(await self.get_field(SX127x_Field.LNA_BOOST))
 
     async def get_lna_gain(self) -> int:
-        answer: int = await self.interface.read(SX127x_Registers.LNA.value)
-        return (answer & 0xE0) >> 5
+        return await self.get_field(SX127x_Field.LNA_GAIN)
 
     async def set_frequency(self, freq_hz: int) -> None:
         frf = int((freq_hz / self.FXOSC) * 524288)
-        await self.interface.write(SX127x_Registers.FREQ_MSB.value,
-                                   [frf >> 16, (frf >> 8) & 0xFF, frf & 0xFF])
+        await self.set_field(SX127x_Field.FRF, frf)
 
     async def get_freq(self) -> int:
         addr = SX127x_Registers.FREQ_MSB.value
-        freq: list[int] = await self.interface.read_several(addr, 3)
-        return int((freq[0] << 16 | freq[1] << 8 | freq[2]) * self.FXOSC / 524288)
+        return decode_frequency(await self.read_registers(addr, 3))
 
     async def set_lora_fifo_addr_ptr(self, address: int) -> None:
-        await self.interface.write(SX127x_Registers.LORA_FIFO_ADDR_PTR.value,
-                                   [address])
+        await self.set_field(SX127x_Field.LORA_FIFO_ADDR_PTR, address)
 
     async def set_lora_rx_tx_fifo_base_addr(self, rx_ptr: int,
                                             tx_ptr: int) -> None:
-        addr = SX127x_Registers.LORA_FIFO_TX_BASE_ADDR.value
-        await self.interface.write(addr, [tx_ptr, rx_ptr])
+        await self.update_fields({SX127x_Field.LORA_FIFO_TX_BASE_ADDR: tx_ptr,
+                                  SX127x_Field.LORA_FIFO_RX_BASE_ADDR: rx_ptr})
 
-    async def write_fifo(self, data: list[int] | bytes,
+    async def write_fifo(self, data: bytes,
                          is_implicit: bool = False) -> None:
         await self.set_lora_fifo_addr_ptr(0)
         # if is_implicit:
         await self.set_lora_payload_length(len(data))
-        await self.interface.write(SX127x_Registers.FIFO.value, [*data])
+        await self.write_register(SX127x_Registers.FIFO.value, data)
 
-    async def write_fsk_fifo(self, data: bytes | list[int]) -> None:
-        await self.interface.write(SX127x_Registers.FIFO.value,
-                                   [len(data), *list(data)])
+    async def write_fsk_fifo(self, data: bytes) -> None:
+        await self.write_register(SX127x_Registers.FIFO.value,
+                                  bytes((len(data),)) + data)
 
-    async def read_fsk_fifo(self, data_len: int):
-        addr: int = SX127x_Registers.FIFO.value
-        return await self.interface.read_several(addr, data_len)
+    async def read_fsk_fifo(self, data_len: int) -> bytes:
+        await self._flush_batch()
+        return await self.interface.read_burst(SX127x_Registers.FIFO.value,
+                                               data_len)
 
     async def set_lora_irq_flags_mask(self, mask: int) -> None:
         """
         0 bit - active interrupt
         1 bit - inactive interrupt
         """
-        addr = SX127x_Registers.LORA_IRQ_FLAGS_MASK.value
-        await self.interface.write(addr, [mask])
+        await self.set_field(SX127x_Field.LORA_IRQ_FLAGS_MASK, mask)
 
     async def get_lora_irq_mask_register(self) -> int:
-        addr = SX127x_Registers.LORA_IRQ_FLAGS_MASK.value
-        return await self.interface.read(addr)
+        return await self.get_field(SX127x_Field.LORA_IRQ_FLAGS_MASK)
 
     async def get_lora_isr_register(self) -> int:
-        return await self.interface.read(SX127x_Registers.LORA_IRQ_FLAGS.value)
+        return await self.read_register(SX127x_Registers.LORA_IRQ_FLAGS.value)
 
     async def get_lora_fei(self, bw_khz: float) -> int:
         addr = SX127x_Registers.LORA_FEI_MSB.value
-        data = bytes(await self.interface.read_several(addr, 3))
-        raw_val: int = twos_comp(int.from_bytes(data, 'big'), 20)
-        f_err: int = -int(raw_val * (1 << 24) / self.FXOSC * bw_khz / 500)
-        return f_err
+        return decode_lora_fei(await self.read_registers(addr, 3), bw_khz)
 
     async def get_lora_isr_list(self) -> list[str]:
         reg: int = await self.get_lora_isr_register()
@@ -349,205 +523,187 @@ class SX127x_Driver:
 
     async def get_rx_done_flag(self) -> bool:
         addr = SX127x_Registers.LORA_IRQ_FLAGS.value
-        answer: int = await self.interface.read(addr)
+        answer: int = await self.read_register(addr)
         return bool(answer & SX127x_LoRa_ISR.RXDONE.value)
 
     async def get_lora_fifo_ptr(self) -> int:
         addr = SX127x_Registers.LORA_FIFO_RX_CURRENT_ADDR.value
-        return await self.interface.read(addr)
+        return await self.read_register(addr)
 
     async def read_lora_fifo(self, data_len: int) -> bytes:
-        addr: int = SX127x_Registers.FIFO.value
-        return bytes(await self.interface.read_several(addr, data_len))
+        await self._flush_batch()
+        return await self.interface.read_burst(SX127x_Registers.FIFO.value,
+                                               data_len)
+
+    async def read_lora_rx_status(self) -> RegisterImage:
+        """
+        RX status block (current FIFO address, IRQ flags, RX bytes amount,
+        counters, SNR, RSSI) and FEI registers by one burst read
+        """
+        start = SX127x_Registers.LORA_FIFO_RX_CURRENT_ADDR.value
+        end: int = SX127x_Registers.LORA_FEI_MSB.value + 3
+        return RegisterImage(await self.read_registers(start, end - start), start)
+
+    async def fetch_lora_fifo(self, address: int, length: int) -> bytes:
+        """
+        Reads received packet from FIFO `address` and clears IRQ flags by
+        one round trip
+        """
+        await self._flush_batch()
+        async with self.interface.batch() as batch:
+            batch.write(SX127x_Registers.LORA_FIFO_ADDR_PTR.value, [address])
+            data = batch.read_burst(SX127x_Registers.FIFO.value, length) \
+                if length else None
+            batch.write(SX127x_Registers.LORA_IRQ_FLAGS.value, [0xFF])
+        return data.result() if data else b''
 
     async def get_tx_done_flag(self) -> bool:
         addr = SX127x_Registers.LORA_IRQ_FLAGS.value
-        answer: int = await self.interface.read(addr)
+        answer: int = await self.read_register(addr)
         return bool(answer & SX127x_LoRa_ISR.TXDONE.value)
 
     async def get_crc_flag(self) -> bool:
         addr = SX127x_Registers.LORA_IRQ_FLAGS.value
-        data: int = await self.interface.read(addr)
+        data: int = await self.read_register(addr)
         return bool(data & SX127x_LoRa_ISR.PAYLOAD_CRC_ERROR.value)
 
     async def reset_irq_flags(self) -> None:
         addr = SX127x_Registers.LORA_IRQ_FLAGS.value
-        await self.interface.write(addr, [0xFF])
+        await self.write_register(addr, [0xFF])
 
     async def set_low_data_rate_optimize(self, optimization_flag: bool) -> None:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_3.value
-        ldro: int = await self.interface.read(addr) & 0xf7
-        await self.interface.write(addr,
-                                   [ldro | (optimization_flag * (1 << 3))])
+        await self.set_field(SX127x_Field.LORA_LDRO, optimization_flag)
 
     async def get_low_data_rate_optimize(self) -> bool:
-        addr = SX127x_Registers.LORA_MODEM_CONFIG_3.value
-        return bool(await self.interface.read(addr) & 0x08)
+        return await self.get_field(SX127x_Field.LORA_LDRO)
 
     async def set_tx_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [(reg & 0xF8) | SX127x_Mode.TX.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.TX)
 
     async def set_rx_continuous_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr,
-                                   [(reg & 0xF8) | SX127x_Mode.RXCONT.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.RXCONT)
 
     async def get_all_registers(self) -> list[int]:
-        return await self.interface.read_several(0x01, 0x70)
+        await self._flush_batch()
+        data: list[int] = await self.interface.read_several(0x01, 0x70)
+        if self.shadow is not None:
+            self.shadow.load(0x01, data)
+        return data
 
     async def get_lora_rssi_packet(self, freq_hz: int) -> int:
         addr = SX127x_Registers.LORA_PKT_RSSI_VALUE.value
-        raw_val: int = await self.interface.read(addr)
-        return raw_val - (164 if freq_hz < 800_000_000 else 157)
+        return decode_lora_rssi(await self.read_register(addr), freq_hz)
 
     async def get_lora_rssi_value(self, freq_hz: int) -> int:
         addr = SX127x_Registers.LORA_RSSI_VALUE.value
-        raw_val: int = await self.interface.read(addr)
-        return raw_val - (164 if freq_hz < 800_000_000 else 157)
+        return decode_lora_rssi(await self.read_register(addr), freq_hz)
 
     async def get_lora_snr(self) -> int:
         addr = SX127x_Registers.LORA_PKT_SNR_VALUE.value
-        return await twos_comp(self.interface.read(addr), 8) // 4
+        return decode_lora_snr(await self.read_register(addr))
 
     async def get_snr_and_rssi(self, freq_hz: int) -> tuple[int, int]:
         addr = SX127x_Registers.LORA_PKT_SNR_VALUE.value
-        data: list[int] = await self.interface.read_several(addr, 2)
+        data: list[int] = await self.read_registers(addr, 2)
         if len(data) == 2:
-            snr, rssi = twos_comp(data[0], 8), data[1]
-            return snr // 4, rssi - (164 if freq_hz < 800_000_000 else 157)
+            return decode_lora_snr(data[0]), decode_lora_rssi(data[1], freq_hz)
         return 0, 0
 
     async def set_fsk_bitrate(self, bitrate: int) -> None:
         frac: float = await self._get_fsk_bitrate_frac() / 16
         reg_bitrate = int(self.FXOSC / bitrate - frac)
-        addr = SX127x_Registers.FSK_BITRATE_MSB.value
-        await self.interface.write(addr, [reg_bitrate >> 8, reg_bitrate & 0xFF])
+        await self.set_field(SX127x_Field.FSK_BITRATE, reg_bitrate)
 
     async def get_fsk_bitrate(self) -> int:
-        frac: float = await self._get_fsk_bitrate_frac() / 16
+        frac: int = await self._get_fsk_bitrate_frac()
         addr = SX127x_Registers.FSK_BITRATE_MSB.value
-        data: list[int] = await self.interface.read_several(addr, 2)
-        return int(self.FXOSC / ((data[0] << 8) + data[1] + frac))
+        return decode_fsk_bitrate(await self.read_registers(addr, 2), frac)
 
     async def set_fsk_bitrate_frac(self, frac: int) -> None:
-        await self.interface.write(SX127x_Registers.BITRATE_FRAC.value, [frac])
+        await self.write_register(SX127x_Registers.BITRATE_FRAC.value, [frac])
 
     async def _get_fsk_bitrate_frac(self) -> int:
-        return await self.interface.read(SX127x_Registers.BITRATE_FRAC.value)
+        return await self.read_register(SX127x_Registers.BITRATE_FRAC.value)
 
     async def set_fsk_preamble_length(self, preamble: int) -> None:
-        addr = SX127x_Registers.FSK_PREAMBLE_MSB.value
-        await self.interface.write(addr, [preamble >> 8, preamble & 0xFF])
+        await self.set_field(SX127x_Field.FSK_PREAMBLE_LENGTH, preamble)
 
     async def get_fsk_preamble_length(self) -> int:
-        addr = SX127x_Registers.FSK_PREAMBLE_MSB.value
-        data: list[int] = await self.interface.read_several(addr, 2)
-        return data[0] << 8 | data[1]
+        return await self.get_field(SX127x_Field.FSK_PREAMBLE_LENGTH)
 
     async def set_fsk_restart_rx_mode(self, mode: SX127x_RestartRxMode) -> None:
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0x3F
-        await self.interface.write(SX127x_Registers.FSK_SYNC_CONFIG.value,
-                                   [reg | (mode.value << 6)])
+        await self.set_field(SX127x_Field.FSK_RESTART_RX_MODE, mode)
 
     async def get_fsk_restart_rx_mode(self) -> SX127x_RestartRxMode:
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        data: int = await self.interface.read(addr)
-        return SX127x_RestartRxMode((data & 0xC0) >> 6)
+        return await self.get_field(SX127x_Field.FSK_RESTART_RX_MODE)
 
     async def get_fsk_sync_size(self) -> int:
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        return await self.interface.read(addr) & 0x07
+        return await self.get_field(SX127x_Field.FSK_SYNC_SIZE)
 
     async def set_fsk_sync_value(self, sync_word: bytes) -> None:
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0xF8
-        await self.interface.write(addr, [reg | len(sync_word) - 1])
-        await self.interface.write(SX127x_Registers.FSK_SYNC_VALUE1.value,
-                                   list(sync_word))
+        await self.set_field(SX127x_Field.FSK_SYNC_SIZE, len(sync_word) - 1)
+        await self.write_register(SX127x_Registers.FSK_SYNC_VALUE1.value,
+                                  list(sync_word))
 
     async def get_fsk_sync_value(self, sync_len: int = 8) -> bytes:
         addr = SX127x_Registers.FSK_SYNC_VALUE1.value
-        return bytes(await self.interface.read_several(addr, sync_len))
+        return bytes(await self.read_registers(addr, sync_len))
 
     async def set_fsk_dc_free_mode(self, mode: SX127x_DcFree) -> None:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        reg: int = await self.interface.read(addr) & 0x9F
-        await self.interface.write(addr, [reg | (mode.value << 5)])
+        await self.set_field(SX127x_Field.FSK_DC_FREE, mode)
 
     async def set_fsk_data_shaping(self, shaping: SX127x_FSK_SHAPING) -> None:
-        addr = SX127x_Registers.PA_RAMP.value
-        reg: int = await self.interface.read(addr) & 0x0F
-        await self.interface.write(addr, [reg | (shaping.value << 5)])
+        await self.set_field(SX127x_Field.FSK_DATA_SHAPING, shaping)
 
     async def get_fsk_dc_free_mode(self) -> SX127x_DcFree:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        reg: int = await self.interface.read(addr)
-        return SX127x_DcFree((reg & 0x60) >> 5)
+        return await self.get_field(SX127x_Field.FSK_DC_FREE)
 
     async def set_fstx_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [(reg & 0xF8) | SX127x_Mode.FSTX.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.FSTX)
 
     async def set_fsrx_mode(self) -> None:
-        addr = SX127x_Registers.OP_MODE.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [(reg & 0xF8) | SX127x_Mode.FSRX.value])
+        await self.set_field(SX127x_Field.MODE, SX127x_Mode.FSRX)
 
     async def set_fsk_crc(self, crc_mode: bool) -> None:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        reg: int = await self.interface.read(addr) & 0xEF
-        await self.interface.write(addr, [reg | (crc_mode << 4)])
+        await self.set_field(SX127x_Field.FSK_CRC, crc_mode)
 
     async def fsk_clear_fifo_on_crc_fail(self, mode: bool):
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        reg: int = await self.interface.read(addr) & 0xF7
-        await self.interface.write(addr, [reg | ((not mode) << 3)])
+        await self.set_field(SX127x_Field.FSK_CRC_AUTOCLEAR_OFF, not mode)
 
     async def get_fsk_crc(self) -> bool:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        return bool(await self.interface.read(addr) & 0x10)
+        return await self.get_field(SX127x_Field.FSK_CRC)
 
     async def set_fsK_packet_format(self, packet_format: bool) -> None:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        reg: int = await self.interface.read(addr) & 0x7F
-        await self.interface.write(addr, [reg | (packet_format << 7)])
+        await self.set_field(SX127x_Field.FSK_PACKET_FORMAT, packet_format)
 
     async def get_fsk_packet_format(self) -> bool:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG1.value
-        return bool(await self.interface.read(addr) & 0x80)
+        return await self.get_field(SX127x_Field.FSK_PACKET_FORMAT)
 
     async def set_fsk_sync_mode(self, enable: bool) -> None:
         """Enables the Sync word generation and detection\n
         RegSyncConfig(0x27) 0x04 offset
         """
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0xF7
-        await self.interface.write(addr, [reg | (enable << 4)])
+        await self.set_field(SX127x_Field.FSK_SYNC_ON, enable)
 
     async def get_fsk_sync_mode(self) -> bool:
-        addr = SX127x_Registers.FSK_SYNC_CONFIG.value
-        return bool(await self.interface.read(addr) & 0x10)
+        return await self.get_field(SX127x_Field.FSK_SYNC_ON)
 
     async def set_fsk_fifo_threshold(self, threshold: int,
                                      immediate_tx: bool = False) -> None:
         addr = SX127x_Registers.FSK_FIFO_THRESH.value
-        await self.interface.write(addr, [immediate_tx << 7 | threshold])
+        await self.write_register(addr, [immediate_tx << 7 | threshold])
 
     async def get_fsk_fifo_threshold(self) -> int:
-        addr = SX127x_Registers.FSK_FIFO_THRESH.value
-        return await self.interface.read(addr) & 0x3F
+        return await self.get_field(SX127x_Field.FSK_FIFO_THRESHOLD)
 
+    @traced
     async def add_freq_ppm(self, ppm: float) -> int:
         freq: int = await self.get_freq()
         new_freq: int = freq + int(freq * ppm / 1_000_000)
         await self.set_frequency(new_freq)
         return new_freq
 
+    @traced
     async def add_freq(self, freq_hz: int) -> int:
         freq: int = await self.get_freq()
         await self.set_standby_mode()
@@ -557,7 +713,7 @@ class SX127x_Driver:
 
     async def get_fsk_isr(self) -> int:
         addr = SX127x_Registers.FSK_IRQ_FLAGS1.value
-        data: list[int] = await self.interface.read_several(addr, 2)
+        data: list[int] = await self.read_registers(addr, 2)
         return (data[0] << 8) + data[1]
 
     async def get_fsk_isr_list(self) -> list[str]:
@@ -565,62 +721,46 @@ class SX127x_Driver:
         return [mask.name for mask in list(SX127x_FSK_ISR) if reg & mask.value]
 
     async def get_fsk_payload_length(self) -> int:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG2.value
-        data: list[int] = await self.interface.read_several(addr, 2)
-        return ((data[0] & 0x07) << 8) + data[1]
+        return await self.get_field(SX127x_Field.FSK_PAYLOAD_LENGTH)
 
     async def set_fsk_payload_length(self, payload_length: int) -> None:
-        addr = SX127x_Registers.FSK_PACKET_CONFIG2.value
-        reg: int = await self.interface.read(addr) & 0xFC
-        payload_high: int = payload_length >> 8
-        payload_low: int =  payload_length & 0xFF
-        await self.interface.write(addr, [reg | payload_high, payload_low])
+        await self.set_field(SX127x_Field.FSK_PAYLOAD_LENGTH, payload_length)
 
     async def set_fsk_deviation(self, deviation_hz: int) -> None:
-        fdev_high: int = math.ceil(deviation_hz / self.F_STEP) >> 8
-        fdev_low: int = math.ceil(deviation_hz / self.F_STEP) & 0xFF
-        addr = SX127x_Registers.FSK_FDEV_MSB.value
-        await self.interface.write(addr, [fdev_high, fdev_low])
+        fdev: int = math.ceil(deviation_hz / self.F_STEP)
+        await self.set_field(SX127x_Field.FSK_DEVIATION, fdev)
 
     async def get_fsk_deviation(self) -> int:
         addr = SX127x_Registers.FSK_FDEV_MSB.value
-        data: list[int] = await self.interface.read_several(addr, 2)
-        return int((data[0] << 8 | data[1]) * self.F_STEP)
+        return decode_fsk_deviation(await self.read_registers(addr, 2))
 
     async def get_fsk_fei(self) -> int:
         """ Works incorrectly on sx127x """
         addr = SX127x_Registers.FSK_FEI_MSB.value
-        data = bytes(await self.interface.read_several(addr, 2))
+        data = bytes(await self.read_registers(addr, 2))
         return -int(twos_comp(int.from_bytes(data, 'big'), 16) * self.F_STEP)
 
     async def set_fsk_auto_afc(self, mode: bool):
-        addr = SX127x_Registers.FSK_RX_CONFIG.value
-        reg: int = await self.interface.read(addr) & 0xEF
-        await self.interface.write(addr, [reg | (mode << 4)])
+        await self.set_field(SX127x_Field.FSK_AUTO_AFC, mode)
 
     async def fsk_clear_afc(self) -> None:
-        addr = SX127x_Registers.FSK_AFC_FEI.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [reg | (1 << 1)])
+        await self.set_field(SX127x_Field.FSK_AFC_CLEAR, True)
 
     async def set_fsk_autoclear_afc(self, mode: bool) -> None:
-        addr = SX127x_Registers.FSK_AFC_FEI.value
-        reg: int = await self.interface.read(addr)
-        await self.interface.write(addr, [reg | mode])
+        await self.set_field(SX127x_Field.FSK_AFC_AUTOCLEAR, mode)
 
     async def set_fsk_afc_bw(self, mantis: int, exp: int) -> None:
-        addr = SX127x_Registers.FSK_AFC_BW.value
-        reg: int = await self.interface.read(addr) & 0xE0
-        await self.interface.write(addr, [reg | mantis << 3 | exp])
+        await self.update_fields({SX127x_Field.FSK_AFC_BW_MANTISSA: mantis,
+                                  SX127x_Field.FSK_AFC_BW_EXPONENT: exp})
 
     async def get_fsk_afc(self) -> int:
         addr = SX127x_Registers.FSK_AFC_MSB.value
-        data: bytes = bytes(await self.interface.read_several(addr, 2))
+        data: bytes = bytes(await self.read_registers(addr, 2))
         return int(twos_comp(int.from_bytes(data, 'big'), 16) * self.F_STEP)
 
     async def get_fsk_rssi(self) -> int:
         addr = SX127x_Registers.FSK_RSSI_VALUE.value
-        raw_val: int = await self.interface.read(addr)
+        raw_val: int = await self.read_register(addr)
         return -raw_val // 2
 
     async def registers_dump(self) -> None:
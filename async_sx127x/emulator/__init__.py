@@ -0,0 +1,3 @@
+from .chip import SX127xEmulator  # noqa: F401
+from .transports import (PtyServer, notify_loop, serve_pty,  # noqa: F401
+                         serve_tcp)
@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+
+from loguru import logger
+
+from async_sx127x.emulator.chip import SX127xEmulator
+from async_sx127x.emulator.transports import serve_pty, serve_tcp
+
+
+async def main(args: argparse.Namespace) -> None:
+    emulator = SX127xEmulator(time_scale=args.time_scale)
+    if args.transport == 'pty':
+        server = serve_pty(emulator)
+        logger.success(f'Connect radio to {server.port}')
+        await asyncio.Event().wait()
+    else:
+        host, port = args.address.rsplit(':', 1)
+        tcp_server: asyncio.Server = await serve_tcp(emulator, host, int(port))
+        logger.success(f'Connect radio to {args.address}')
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SX127x radio bridge emulator')
+    parser.add_argument('transport', choices=['pty', 'tcp'])
+    parser.add_argument('address', nargs='?', default='127.0.0.1:5000',
+                        help='host:port for tcp transport')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='air time multiplier, 0 - instant transmission')
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print('Shutdown')
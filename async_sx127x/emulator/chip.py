@@ -0,0 +1,578 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from loguru import logger
+
+from async_sx127x.airtime import fsk_time_on_air, lora_time_on_air
+from async_sx127x.register_image import (FXOSC, decode_fsk_bitrate,
+                                         decode_lora_bandwidth,
+                                         decode_lora_coding_rate)
+from async_sx127x.register_shadow import PAGED_REGISTERS, REGISTERS_COUNT
+from async_sx127x.registers import (SX127x_Field, SX127x_FSK_ISR,
+                                    SX127x_HeaderMode, SX127x_LoRa_ISR,
+                                    SX127x_Mode, SX127x_Modulation,
+                                    SX127x_Registers)
+
+
+LORA_FIFO_SIZE = 256
+FSK_FIFO_SIZE = 64
+CHIP_VERSION = 0x12
+
+# Reset values of the common (not banked) registers, SX1276 datasheet table 41
+COMMON_DEFAULTS: dict[int, int] = {
+    0x01: 0x09, 0x02: 0x1A, 0x03: 0x0B, 0x04: 0x00, 0x05: 0x52,
+    0x06: 0x6C, 0x07: 0x80, 0x08: 0x00, 0x09: 0x4F, 0x0A: 0x09,
+    0x0B: 0x2B, 0x0C: 0x20, 0x40: 0x00, 0x41: 0x00, 0x42: CHIP_VERSION,
+    0x44: 0x2D, 0x4B: 0x09, 0x4D: 0x84, 0x5B: 0x00, 0x5D: 0x00,
+    0x61: 0x13, 0x62: 0x0E, 0x63: 0x5B, 0x64: 0xDB, 0x70: 0xD0,
+}
+
+FSK_DEFAULTS: dict[int, int] = {
+    0x0D: 0x0E, 0x0E: 0x02, 0x0F: 0x0A, 0x10: 0xFF, 0x12: 0x15,
+    0x13: 0x0B, 0x14: 0x28, 0x15: 0x0C, 0x16: 0x12, 0x17: 0x47,
+    0x18: 0x32, 0x19: 0x3E, 0x1F: 0x40, 0x24: 0x05, 0x26: 0x03,
+    0x27: 0x93, **{addr: 0x55 for addr in range(0x28, 0x30)},
+    0x30: 0x90, 0x31: 0x40, 0x32: 0x40, 0x35: 0x0F, 0x39: 0xF5,
+    0x3A: 0x20, 0x3B: 0x82, 0x3D: 0x02,
+}
+
+LORA_DEFAULTS: dict[int, int] = {
+    0x0E: 0x80, 0x18: 0x10, 0x1D: 0x72, 0x1E: 0x70, 0x1F: 0x64,
+    0x21: 0x08, 0x22: 0x01, 0x23: 0xFF, 0x26: 0x04, 0x31: 0xC3,
+    0x33: 0x27, 0x37: 0x0A, 0x39: 0x12,
+}
+
+# Opcodes of the radio bridge firmware
+OP_READ = 1
+OP_WRITE = 2
+OP_RESET = 6
+OP_READ_SEVERAL = 7
+OP_BURST_WRITE = 8
+OP_TX_THEN_RX_CONT = 21
+OP_TX_THEN_RX_SINGLE = 22
+OP_FSK_FIFO_WRITE = 31
+OP_FSK_READ_START = 32
+OP_FSK_READ = 33
+OP_NOTIFY = 40
+# With notifications enabled every reply is prefixed by REPLY_TAG and DIO0
+# rising edges are sent unsolicited as [EVENT_TAG, irq flags]
+REPLY_TAG = 0xA5
+EVENT_TAG = 0x5A
+
+_OP_MODE = SX127x_Registers.OP_MODE.value
+_FIFO = SX127x_Registers.FIFO.value
+_RX_MODES = (SX127x_Mode.RXCONT, SX127x_Mode.RXSINGLE)
+_LORA_DIO0 = SX127x_LoRa_ISR.RXDONE.value | SX127x_LoRa_ISR.TXDONE.value
+_FSK_DIO0 = SX127x_FSK_ISR.PAYLOAD_READY.value | SX127x_FSK_ISR.PACKET_SENT.value
+
+
+@dataclass
+class AirFrame:
+    """ Packet on air. `end` is the moment of its last bit """
+    data: bytes
+    end: float
+    channel: tuple
+    rssi: int = -80
+    snr: float = 10.0
+    crc_ok: bool = True
+
+
+class SX127xEmulator:
+    """
+    Register-level model of SX127x behind the radio bridge firmware. It
+    keeps LoRa and FSK register pages, FIFO, IRQ flags and operation mode
+    transitions, and takes time on air into account. Time is evaluated
+    lazily on every command, so the model needs no background task.
+
+    `time_scale` multiplies every air time: 0 makes transmissions instant,
+    1 keeps real time.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 time_scale: float = 1.0, noise_floor_dbm: int = -120) -> None:
+        self.clock: Callable[[], float] = clock
+        self.time_scale: float = time_scale
+        self.noise_floor_dbm: int = noise_floor_dbm
+        self.peers: list[SX127xEmulator] = []
+        self.transmitted: list[bytes] = []
+        self.dropped: int = 0
+        self.commands: int = 0
+        self.notify: bool = False
+        self._tx: AirFrame | None = None
+        self.reset()
+
+    # ----------------------------------------------------------- protocol
+    def handle(self, buffer: bytearray) -> bytes:
+        """
+        Executes all complete command frames from `buffer` and removes them
+        from it. Incomplete tail stays in the buffer until more bytes come.
+        """
+        answer = bytearray()
+        while buffer:
+            size: int = self._frame_size(buffer)
+            if size < 0:
+                logger.warning(f'Emulator: unknown opcode {buffer[0]}')
+                del buffer[0]
+                continue
+            if len(buffer) < size:
+                break
+            frame = bytes(buffer[:size])
+            del buffer[:size]
+            tagged: bool = self.notify
+            reply: bytes = self.execute(frame)
+            answer += bytes([REPLY_TAG]) + reply if tagged else reply
+            answer += self._dio0_events()
+        return bytes(answer)
+
+    def poll_events(self) -> bytes:
+        """ Event frames of DIO0 edges which happened without commands """
+        self._advance()
+        return self._dio0_events()
+
+    def next_event_at(self) -> float | None:
+        """ Clock value of the next air event (packet end) if any """
+        ends: list[float] = [frame.end for frame in self._arrivals]
+        if self._tx is not None:
+            ends.append(self._tx.end)
+        return min(ends, default=None)
+
+    def listening(self) -> bool:
+        self._advance()
+        return self.mode in _RX_MODES
+
+    def rx_pending(self) -> bool:
+        """ A received packet is not taken by the host yet """
+        self._advance()
+        if self.modulation == SX127x_Modulation.LORA:
+            return bool(self._lora_irq & SX127x_LoRa_ISR.RXDONE.value)
+        return self._payload_ready
+
+    def _dio0_events(self) -> bytes:
+        if self.modulation == SX127x_Modulation.LORA:
+            flags: int = self._lora_irq
+            level: int = flags & _LORA_DIO0
+        else:
+            flags = self._fsk_irq() & 0xFF
+            level = flags & _FSK_DIO0
+        rising: int = level & ~self._dio0_level
+        self._dio0_level = level
+        if rising and self.notify:
+            return bytes([EVENT_TAG, flags])
+        return b''
+
+    @staticmethod
+    def _frame_size(buffer: bytearray) -> int:
+        opcode: int = buffer[0]
+        if opcode in (OP_RESET, OP_TX_THEN_RX_CONT, OP_TX_THEN_RX_SINGLE,
+                      OP_FSK_READ_START, OP_FSK_READ):
+            return 1
+        if opcode in (OP_READ, OP_NOTIFY):
+            return 2
+        if opcode in (OP_WRITE, OP_READ_SEVERAL):
+            return 3
+        if opcode == OP_BURST_WRITE:
+            return 3 + buffer[2] if len(buffer) > 2 else 3
+        if opcode == OP_FSK_FIFO_WRITE:
+            return 2 + buffer[1] if len(buffer) > 1 else 2
+        return -1
+
+    def execute(self, frame: bytes) -> bytes:
+        """ Executes single command frame and returns its reply """
+        self.commands += 1
+        self._advance()
+        opcode: int = frame[0]
+        if opcode == OP_READ:
+            return bytes([self.read(frame[1])])
+        if opcode == OP_WRITE:
+            self.write(frame[1], frame[2:3])
+        elif opcode == OP_BURST_WRITE:
+            self.write(frame[1], frame[3:])
+        elif opcode == OP_READ_SEVERAL:
+            return bytes(self.read_several(frame[1], frame[2]))
+        elif opcode == OP_RESET:
+            self.reset()
+        elif opcode == OP_TX_THEN_RX_CONT:
+            self._start_tx(SX127x_Mode.RXCONT)
+        elif opcode == OP_TX_THEN_RX_SINGLE:
+            self._start_tx(SX127x_Mode.RXSINGLE)
+        elif opcode == OP_FSK_FIFO_WRITE:
+            self._fsk_fifo += frame[2:]
+            self._start_fsk_tx()
+        elif opcode == OP_FSK_READ_START:
+            self._mcu_streaming = True
+            self._mcu_fifo += self._fsk_fifo
+            self._fsk_fifo.clear()
+        elif opcode == OP_FSK_READ:
+            self._mcu_streaming = False
+            data = bytes(self._mcu_fifo[:255])
+            del self._mcu_fifo[:len(data)]
+            self._payload_ready = False
+            return bytes([len(data)]) + data
+        elif opcode == OP_NOTIFY:
+            self.notify = bool(frame[1])
+        return bytes([opcode])
+
+    # ---------------------------------------------------------- registers
+    def reset(self) -> None:
+        self._abort_tx()
+        self._common = bytearray(REGISTERS_COUNT)
+        self._pages: dict[SX127x_Modulation, bytearray] = {
+            SX127x_Modulation.FSK: bytearray(len(PAGED_REGISTERS)),
+            SX127x_Modulation.LORA: bytearray(len(PAGED_REGISTERS)),
+        }
+        for addr, val in COMMON_DEFAULTS.items():
+            self._common[addr] = val
+        for addr, val in FSK_DEFAULTS.items():
+            self._pages[SX127x_Modulation.FSK][addr - PAGED_REGISTERS.start] = val
+        for addr, val in LORA_DEFAULTS.items():
+            self._pages[SX127x_Modulation.LORA][addr - PAGED_REGISTERS.start] = val
+        self._lora_fifo = bytearray(LORA_FIFO_SIZE)
+        self._fsk_fifo = bytearray()
+        self._mcu_fifo = bytearray()
+        self._mcu_streaming: bool = False
+        self._lora_irq: int = 0
+        self._packet_sent: bool = False
+        self._payload_ready: bool = False
+        self._crc_ok: bool = False
+        self._after_tx: SX127x_Mode = SX127x_Mode.STDBY
+        self._arrivals: list[AirFrame] = []
+        self._dio0_level: int = 0
+
+    @property
+    def modulation(self) -> SX127x_Modulation:
+        return SX127x_Modulation(self._common[_OP_MODE] & 0x80)
+
+    @property
+    def mode(self) -> SX127x_Mode:
+        return SX127x_Mode(self._common[_OP_MODE] & 0x07)
+
+    def read_several(self, address: int, amount: int) -> list[int]:
+        if address == _FIFO:
+            return [self.read(_FIFO) for _ in range(amount)]
+        return [self.read(addr & 0x7F)
+                for addr in range(address, address + amount)]
+
+    def read(self, address: int) -> int:
+        if address == _FIFO:
+            return self._read_fifo()
+        if address in PAGED_REGISTERS:
+            if self.modulation == SX127x_Modulation.LORA:
+                return self._read_lora(address)
+            return self._read_fsk(address)
+        return self._common[address]
+
+    def write(self, address: int, data: bytes | list[int]) -> None:
+        if address == _FIFO:
+            self._write_fifo(data)
+            return
+        for addr, val in enumerate(data, start=address):
+            self._write_one(addr & 0x7F, val)
+
+    def _get(self, address: int) -> int:
+        if address in PAGED_REGISTERS:
+            page: bytearray = self._pages[self.modulation]
+            return page[address - PAGED_REGISTERS.start]
+        return self._common[address]
+
+    def _set(self, address: int, value: int) -> None:
+        if address in PAGED_REGISTERS:
+            page: bytearray = self._pages[self.modulation]
+            page[address - PAGED_REGISTERS.start] = value & 0xFF
+        else:
+            self._common[address] = value & 0xFF
+
+    def _field(self, field: SX127x_Field) -> Any:
+        size: int = field.value.size
+        return field.decode([self._get(addr) for addr
+                             in range(field.address, field.address + size)])
+
+    def _write_one(self, address: int, value: int) -> None:
+        if address == _OP_MODE:
+            self._write_op_mode(value)
+        elif address == SX127x_Registers.VERSION.value:
+            return
+        elif self.modulation == SX127x_Modulation.LORA and \
+                address == SX127x_Registers.LORA_IRQ_FLAGS.value:
+            self._lora_irq &= ~value
+        elif self.modulation == SX127x_Modulation.FSK and \
+                address == SX127x_Registers.FSK_SEQ_CONFIG1.value:
+            self._write_sequencer(value)
+        elif self.modulation == SX127x_Modulation.FSK and address in (
+                SX127x_Registers.FSK_IRQ_FLAGS1.value,
+                SX127x_Registers.FSK_IRQ_FLAGS2.value):
+            return
+        else:
+            self._set(address, value)
+
+    def _write_op_mode(self, value: int) -> None:
+        old_mode: SX127x_Mode = self.mode
+        if old_mode != SX127x_Mode.SLEEP:
+            # LongRangeMode bit can be modified only in sleep mode
+            value = (value & 0x7F) | (self._common[_OP_MODE] & 0x80)
+        self._common[_OP_MODE] = value
+        new_mode: SX127x_Mode = self.mode
+        if old_mode == SX127x_Mode.TX and new_mode != SX127x_Mode.TX:
+            self._abort_tx()
+        if new_mode == SX127x_Mode.TX and old_mode != SX127x_Mode.TX:
+            self._after_tx = SX127x_Mode.STDBY
+            if self.modulation == SX127x_Modulation.LORA:
+                self._start_lora_tx()
+            else:
+                self._start_fsk_tx()
+        elif new_mode == SX127x_Mode.CAD:
+            self._lora_irq |= SX127x_LoRa_ISR.CAD_DONE.value
+            self._set_mode(SX127x_Mode.STDBY)
+
+    def _set_mode(self, mode: SX127x_Mode) -> None:
+        self._common[_OP_MODE] = (self._common[_OP_MODE] & 0xF8) | mode.value
+
+    def _write_sequencer(self, value: int) -> None:
+        self._set(SX127x_Registers.FSK_SEQ_CONFIG1.value, value & 0x3F)
+        if value & 0x40:  # SequencerStop
+            self._set_mode(SX127x_Mode.STDBY)
+        elif value & 0x80:  # SequencerStart
+            from_start: int = value & 0x18
+            if from_start == 0x08:
+                self._set_mode(SX127x_Mode.RXCONT)
+            elif from_start in (0x10, 0x18):
+                self._set_mode(SX127x_Mode.TX)
+                low_power = SX127x_Mode.SLEEP if value & 0x20 \
+                    else SX127x_Mode.STDBY
+                self._after_tx = SX127x_Mode.RXCONT if value & 0x01 \
+                    else low_power
+                self._start_fsk_tx()
+
+    # --------------------------------------------------------------- FIFO
+    def _read_fifo(self) -> int:
+        if self.modulation == SX127x_Modulation.LORA:
+            ptr_addr = SX127x_Registers.LORA_FIFO_ADDR_PTR.value
+            ptr: int = self._get(ptr_addr)
+            self._set(ptr_addr, ptr + 1)
+            return self._lora_fifo[ptr]
+        if not self._fsk_fifo:
+            return 0
+        val: int = self._fsk_fifo.pop(0)
+        if not self._fsk_fifo:
+            self._payload_ready = False
+        return val
+
+    def _write_fifo(self, data: bytes | list[int]) -> None:
+        if self.modulation == SX127x_Modulation.LORA:
+            ptr_addr = SX127x_Registers.LORA_FIFO_ADDR_PTR.value
+            ptr: int = self._get(ptr_addr)
+            for val in data:
+                self._lora_fifo[ptr] = val
+                ptr = (ptr + 1) & 0xFF
+            self._set(ptr_addr, ptr)
+            return
+        free: int = FSK_FIFO_SIZE - len(self._fsk_fifo)
+        self._fsk_fifo += bytes(data[:free])
+        self._start_fsk_tx()
+
+    # -------------------------------------------------------- status regs
+    def _read_lora(self, address: int) -> int:
+        if address == SX127x_Registers.LORA_IRQ_FLAGS.value:
+            return self._lora_irq
+        if address == SX127x_Registers.LORA_RSSI_VALUE.value:
+            return max(0, self.noise_floor_dbm + self._rssi_offset())
+        if address == 0x18:  # RegModemStat
+            return 0x10 if self.mode not in _RX_MODES else 0x14
+        return self._get(address)
+
+    def _read_fsk(self, address: int) -> int:
+        if address == SX127x_Registers.FSK_IRQ_FLAGS1.value:
+            return self._fsk_irq() >> 8
+        if address == SX127x_Registers.FSK_IRQ_FLAGS2.value:
+            return self._fsk_irq() & 0xFF
+        if address == SX127x_Registers.FSK_RSSI_VALUE.value:
+            if self._get(address) == 0:
+                return min(0xFF, -2 * self.noise_floor_dbm)
+        return self._get(address)
+
+    def _fsk_irq(self) -> int:
+        flags: int = SX127x_FSK_ISR.MODE_READY.value
+        mode: SX127x_Mode = self.mode
+        if mode in _RX_MODES:
+            flags |= SX127x_FSK_ISR.RX_READY.value
+        if mode == SX127x_Mode.TX:
+            flags |= SX127x_FSK_ISR.TX_READY.value
+        if mode not in (SX127x_Mode.SLEEP, SX127x_Mode.STDBY):
+            flags |= SX127x_FSK_ISR.PLL_LOCK.value
+        if not self._fsk_fifo:
+            flags |= SX127x_FSK_ISR.FIFO_EMPTY.value
+        if self._packet_sent:
+            flags |= SX127x_FSK_ISR.PACKET_SENT.value
+        if self._payload_ready:
+            flags |= SX127x_FSK_ISR.PAYLOAD_READY.value
+            if self._crc_ok:
+                flags |= SX127x_FSK_ISR.CRC_OK.value
+        return flags
+
+    def _rssi_offset(self) -> int:
+        freq: int = int(self._field(SX127x_Field.FRF) * FXOSC / 524288)
+        return 164 if freq < 800_000_000 else 157
+
+    # ---------------------------------------------------------------- air
+    def link(self, other: SX127xEmulator) -> None:
+        """ Puts two emulated chips on the same air """
+        if other not in self.peers:
+            self.peers.append(other)
+        if self not in other.peers:
+            other.peers.append(self)
+
+    def channel(self) -> tuple:
+        """ Parameters which must be equal on both sides of the link """
+        frf: int = self._field(SX127x_Field.FRF)
+        if self.modulation == SX127x_Modulation.LORA:
+            return (SX127x_Modulation.LORA, frf,
+                    self._field(SX127x_Field.LORA_SF),
+                    self._field(SX127x_Field.LORA_BANDWIDTH),
+                    self._field(SX127x_Field.LORA_SYNC_WORD))
+        return (SX127x_Modulation.FSK, frf,
+                self._field(SX127x_Field.FSK_BITRATE))
+
+    def time_on_air(self, length: int) -> float:
+        """ Air time of `length` bytes payload with current settings, sec """
+        if self.modulation == SX127x_Modulation.LORA:
+            return self._lora_time_on_air(length)
+        return self._fsk_time_on_air(length)
+
+    def _lora_time_on_air(self, length: int) -> float:
+        mc1: int = self._get(SX127x_Registers.LORA_MODEM_CONFIG_1.value)
+        implicit: bool = self._field(SX127x_Field.LORA_HEADER_MODE) == \
+            SX127x_HeaderMode.IMPLICIT
+        return lora_time_on_air(
+            length, self._field(SX127x_Field.LORA_SF),
+            decode_lora_bandwidth(mc1), decode_lora_coding_rate(mc1),
+            self._field(SX127x_Field.LORA_LDRO), implicit,
+            self._field(SX127x_Field.LORA_CRC),
+            self._field(SX127x_Field.LORA_PREAMBLE_LENGTH)) / 1000
+
+    def _fsk_time_on_air(self, length: int) -> float:
+        bitrate_regs: list[int] = [self._get(0x02), self._get(0x03)]
+        bitrate: int = decode_fsk_bitrate(bitrate_regs, self._get(0x5D))
+        sync: int = self._field(SX127x_Field.FSK_SYNC_SIZE) + 1 \
+            if self._field(SX127x_Field.FSK_SYNC_ON) else 0
+        return fsk_time_on_air(
+            length, bitrate, self._field(SX127x_Field.FSK_PREAMBLE_LENGTH),
+            sync, self._field(SX127x_Field.FSK_CRC),
+            self._field(SX127x_Field.FSK_DC_FREE),
+            self._field(SX127x_Field.FSK_PACKET_FORMAT)) / 1000
+
+    def inject(self, data: bytes, rssi: int = -80, snr: float = 10.0,
+               crc_ok: bool = True, delay: float | None = None) -> None:
+        """
+        Puts a packet on air. It is received if the chip listens when the
+        packet ends: after its air time, or after `delay` seconds.
+        """
+        self._advance()
+        if delay is None:
+            delay = self.time_on_air(len(data)) * self.time_scale
+        self._arrivals.append(AirFrame(bytes(data), self.clock() + delay,
+                                       self.channel(), rssi, snr, crc_ok))
+
+    def _start_tx(self, after_tx: SX127x_Mode) -> None:
+        self._set_mode(SX127x_Mode.TX)
+        self._after_tx = after_tx
+        if self.modulation == SX127x_Modulation.LORA:
+            self._start_lora_tx()
+        else:
+            self._start_fsk_tx()
+
+    def _start_lora_tx(self) -> None:
+        base: int = self._get(SX127x_Registers.LORA_FIFO_TX_BASE_ADDR.value)
+        length: int = self._get(SX127x_Registers.LORA_PAYLOAD_LENGTH.value)
+        data = bytes((self._lora_fifo * 2)[base:base + length])
+        self._begin_tx(data)
+
+    def _start_fsk_tx(self) -> None:
+        if self.mode != SX127x_Mode.TX or self._tx or not self._fsk_fifo:
+            return
+        data = bytes(self._fsk_fifo)
+        self._fsk_fifo.clear()
+        self._begin_tx(data)
+
+    def _begin_tx(self, data: bytes) -> None:
+        self._packet_sent = False
+        end: float = self.clock() + self.time_on_air(len(data)) * self.time_scale
+        self._tx = AirFrame(data, end, self.channel())
+        for peer in self.peers:
+            peer._arrivals.append(self._tx)
+
+    def _abort_tx(self) -> None:
+        if self._tx is None:
+            return
+        for peer in self.peers:
+            if self._tx in peer._arrivals:
+                peer._arrivals.remove(self._tx)
+        self._tx = None
+
+    def _finish_tx(self) -> None:
+        frame: AirFrame = self._tx  # type: ignore
+        self._tx = None
+        self.transmitted.append(frame.data)
+        if self.modulation == SX127x_Modulation.LORA:
+            self._lora_irq |= SX127x_LoRa_ISR.TXDONE.value
+        else:
+            self._packet_sent = True
+        self._set_mode(self._after_tx)
+
+    def _receive(self, frame: AirFrame) -> None:
+        if self.mode not in _RX_MODES or frame.channel != self.channel():
+            self.dropped += 1
+            return
+        if self.modulation == SX127x_Modulation.LORA:
+            self._receive_lora(frame)
+        else:
+            self._receive_fsk(frame)
+        if self.mode == SX127x_Mode.RXSINGLE:
+            self._set_mode(SX127x_Mode.STDBY)
+
+    def _receive_lora(self, frame: AirFrame) -> None:
+        base: int = self._get(SX127x_Registers.LORA_FIFO_RX_BASE_ADDR.value)
+        for i, val in enumerate(frame.data):
+            self._lora_fifo[(base + i) & 0xFF] = val
+        self._set(SX127x_Registers.LORA_FIFO_RX_CURRENT_ADDR.value, base)
+        self._set(SX127x_Registers.LORA_RX_NB_BYTES.value, len(frame.data))
+        self._set(SX127x_Registers.LORA_PKT_SNR_VALUE.value,
+                  int(frame.snr * 4) & 0xFF)
+        self._set(SX127x_Registers.LORA_PKT_RSSI_VALUE.value,
+                  max(0, frame.rssi + self._rssi_offset()))
+        for counter in (SX127x_Registers.LORA_RX_HEADER_CNT_VALUE_MSB,
+                        SX127x_Registers.LORA_RX_PACKET_CNT_VALUE_MSB):
+            addr: int = counter.value
+            value: int = ((self._get(addr) << 8) + self._get(addr + 1) + 1)
+            self._set(addr, value >> 8)
+            self._set(addr + 1, value)
+        self._lora_irq |= SX127x_LoRa_ISR.RXDONE.value | \
+            SX127x_LoRa_ISR.VALID_HEADER.value
+        if not frame.crc_ok:
+            self._lora_irq |= SX127x_LoRa_ISR.PAYLOAD_CRC_ERROR.value
+
+    def _receive_fsk(self, frame: AirFrame) -> None:
+        self._set(SX127x_Registers.FSK_RSSI_VALUE.value,
+                  min(0xFF, -2 * frame.rssi))
+        if self._mcu_streaming:
+            self._mcu_fifo += frame.data
+        else:
+            self._fsk_fifo = bytearray(frame.data[:FSK_FIFO_SIZE])
+        self._payload_ready = True
+        self._crc_ok = frame.crc_ok
+
+    def _advance(self) -> None:
+        """ Applies all events which have happened since last command """
+        now: float = self.clock()
+        while True:
+            events: list[AirFrame] = [frame for frame in self._arrivals
+                                      if frame.end <= now]
+            if self._tx and self._tx.end <= now:
+                events.append(self._tx)
+            if not events:
+                return
+            frame = min(events, key=lambda item: item.end)
+            if frame is self._tx:
+                self._finish_tx()
+            else:
+                self._arrivals.remove(frame)
+                self._receive(frame)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import asyncio
+import os
+import tty
+from typing import Any, Callable
+
+from loguru import logger
+
+from async_sx127x.emulator.chip import SX127xEmulator
+
+
+NOTIFY_TICK = 0.005  # seconds between DIO0 checks without air events
+
+
+async def notify_loop(emulator: SX127xEmulator,
+                      send: Callable[[bytes], Any]) -> None:
+    """
+    Plays the bridge firmware interrupt handler: passes DIO0 event frames
+    to `send` while notifications are enabled. Run it as a task.
+    """
+    while True:
+        if not emulator.notify:
+            await asyncio.sleep(NOTIFY_TICK)
+            continue
+        delay: float = NOTIFY_TICK
+        next_event: float | None = emulator.next_event_at()
+        if next_event is not None:
+            delay = min(delay, max(0.0, next_event - emulator.clock()))
+        await asyncio.sleep(delay)
+        events: bytes = emulator.poll_events()
+        if events:
+            send(events)
+
+
+async def serve_tcp(emulator: SX127xEmulator, host: str = '127.0.0.1',
+                    port: int = 0) -> asyncio.Server:
+    """
+    Serves the emulator for EthernetInterface. With port 0 the system
+    chooses a free port: `server.sockets[0].getsockname()[1]`.
+    """
+    async def _client(reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        buffer = bytearray()
+        notifier = asyncio.create_task(notify_loop(emulator, writer.write))
+        try:
+            while data := await reader.read(1024):
+                buffer += data
+                answer: bytes = emulator.handle(buffer)
+                if answer:
+                    writer.write(answer)
+                    await writer.drain()
+        except ConnectionError as err:
+            logger.debug(f'Emulator TCP client error: {err}')
+        finally:
+            notifier.cancel()
+            emulator.notify = False  # notifications live per connection
+            writer.close()
+
+    server: asyncio.Server = await asyncio.start_server(_client, host, port)
+    logger.info(f'Emulator listens on {server.sockets[0].getsockname()}')
+    return server
+
+
+class PtyServer:
+    """
+    Serves the emulator on a pseudo terminal for SerialInterface. The slave
+    side path is in `port` (e.g. /dev/pts/5). Linux and macOS only.
+    """
+    def __init__(self, emulator: SX127xEmulator) -> None:
+        self.emulator: SX127xEmulator = emulator
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port: str = os.ttyname(self._slave)
+        self._buffer = bytearray()
+        self._loop = asyncio.get_running_loop()
+        os.set_blocking(self._master, False)
+        self._loop.add_reader(self._master, self._on_data)
+        self._notifier: asyncio.Task = self._loop.create_task(
+            notify_loop(emulator, lambda events: os.write(self._master, events)))
+        logger.info(f'Emulator serves pty {self.port}')
+
+    def _on_data(self) -> None:
+        try:
+            self._buffer += os.read(self._master, 1024)
+        except BlockingIOError:
+            return
+        answer: bytes = self.emulator.handle(self._buffer)
+        if answer:
+            os.write(self._master, answer)
+
+    def close(self) -> None:
+        self._notifier.cancel()
+        self._loop.remove_reader(self._master)
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def serve_pty(emulator: SX127xEmulator) -> PtyServer:
+    return PtyServer(emulator)
@@ -2,21 +2,24 @@
 
 import asyncio
 from asyncio import Lock, wait_for
-from datetime import datetime
 import time
 from typing import Awaitable, Callable, Iterable
 from loguru import logger
 from event import Event
+from async_sx127x.airtime import MAX_PAYLOAD, fsk_table, fsk_time_on_air
 from async_sx127x.driver import SX127x_Driver
-from async_sx127x.models import (FSK_Model, FSK_RX_Packet, FSK_TX_Packet, FSK_Transaction,
-                                 RadioModel)
+from async_sx127x.models import FSK_Model, FSK_Transaction, RadioModel
+from async_sx127x.packets import FSK_RX_Record, FSK_TX_Record
+from async_sx127x.register_image import RegisterImage, decode_fsk_config
 from async_sx127x.registers import (SX127x_FSK_SHAPING, SX127x_RestartRxMode,
                                     SX127x_Mode, SX127x_Modulation,
                                     SX127x_DcFree)
+from async_sx127x.rx_dispatcher import RxDispatcher
+from async_sx127x.tracing import traced
 
 
-lock = Lock()
-ANSWER_CALLBACK = Callable[[FSK_RX_Packet, Iterable], Awaitable[bool] | bool]
+FSK_FIFO_SIZE = 64
+ANSWER_CALLBACK = Callable[[FSK_RX_Record, Iterable], Awaitable[bool] | bool]
 
 
 class FSK_Controller:
@@ -52,46 +55,55 @@ class FSK_Controller:
                                           SX127x_RestartRxMode.NO_WAIT_PLL)
         self.label: str = kwargs.get('label', '')
         self._last_caller_name: str = ''
-        self._transmited: Event = Event(FSK_TX_Packet)
+        self._transmited: Event = Event(FSK_TX_Record)
         self._extra_delay_ms = 0
+        self._lock: Lock = Lock()
+        self.rx_activity: bool = False  # preamble or sync seen by the last poll
+        self.rx: RxDispatcher[FSK_RX_Record] = RxDispatcher()
+        # awaited with air time (ms) before every send_repeat frame
+        self.tx_gate: Callable[[float], Awaitable] | None = None
 
+    @traced
     async def init(self, ax25_mode: bool = False) -> None:
-        async with lock:
-            await self.driver.interface.reset()
+        async with self._lock:
+            await self.driver.reset()
             await asyncio.sleep(0.1)
-
-            await self.driver.set_modulation(SX127x_Modulation.FSK)
-            await self.driver.set_standby_mode()
-            await self.driver.set_frequency(self.freq_hz)
-            await self.driver.set_tx_power(self.tx_power)
-            await self.driver.set_pa_select(self.driver.pa_boost)
-
-            await self.driver.set_fsk_bitrate(self.bitrate)
-            await self.driver.set_fsk_deviation(self.deviation)
-            await self.driver.set_fsk_sync_mode(self.sync_mode)
-            await self.driver.set_fsk_payload_length(self.max_payload_length)
-            await self.driver.set_fsk_preamble_length(self.preamble_length)
-            # await self.set_fsk_auto_afc(True)
-            # await self.set_fsk_autoclear_afc(True)
-            # await self.set_fsk_afc_bw(2, 7)
-            await self.driver.set_fsk_data_shaping(self.data_shaping)
-            await self.driver.set_fsk_fifo_threshold(15, immediate_tx=True)
-            if ax25_mode:
-                await self.driver.set_fsK_packet_format(False)
-                await self.driver.set_fsk_dc_free_mode(SX127x_DcFree.OFF)
-                await self.driver.set_fsk_crc(False)
-                await self.driver.set_fsk_sync_value(bytes([0xFE, 0xFB, 0x91, 0xC5, 0xD5, 0xBE]))
-                await self.driver.set_fsk_restart_rx_mode(SX127x_RestartRxMode.WAIT_PLL)
-            else:
-                await self.driver.set_fsK_packet_format(self.packet_mode)
-                await self.driver.set_fsk_dc_free_mode(self.dc_free)
-                await self.driver.set_fsk_crc(self.check_crc)
-                await self.driver.fsk_clear_fifo_on_crc_fail(False)
-                await self.driver.set_fsk_sync_value(self.sync_word)
-                await self.driver.set_fsk_restart_rx_mode(self.rx_restart_mode)
-            await self.driver.set_rx_continuous_mode()
+            await self.driver.upload_config(SX127x_Modulation.FSK,
+                                            lambda: self._configure(ax25_mode))
             await self.driver.interface.write_fsk_read_start()
 
+    async def _configure(self, ax25_mode: bool) -> None:
+        await self.driver.set_modulation(SX127x_Modulation.FSK)
+        await self.driver.set_standby_mode()
+        await self.driver.set_frequency(self.freq_hz)
+        await self.driver.set_tx_power(self.tx_power)
+        await self.driver.set_pa_select(self.driver.pa_boost)
+
+        await self.driver.set_fsk_bitrate(self.bitrate)
+        await self.driver.set_fsk_deviation(self.deviation)
+        await self.driver.set_fsk_sync_mode(self.sync_mode)
+        await self.driver.set_fsk_payload_length(self.max_payload_length)
+        await self.driver.set_fsk_preamble_length(self.preamble_length)
+        # await self.set_fsk_auto_afc(True)
+        # await self.set_fsk_autoclear_afc(True)
+        # await self.set_fsk_afc_bw(2, 7)
+        await self.driver.set_fsk_data_shaping(self.data_shaping)
+        await self.driver.set_fsk_fifo_threshold(15, immediate_tx=True)
+        if ax25_mode:
+            await self.driver.set_fsK_packet_format(False)
+            await self.driver.set_fsk_dc_free_mode(SX127x_DcFree.OFF)
+            await self.driver.set_fsk_crc(False)
+            await self.driver.set_fsk_sync_value(bytes([0xFE, 0xFB, 0x91, 0xC5, 0xD5, 0xBE]))
+            await self.driver.set_fsk_restart_rx_mode(SX127x_RestartRxMode.WAIT_PLL)
+        else:
+            await self.driver.set_fsK_packet_format(self.packet_mode)
+            await self.driver.set_fsk_dc_free_mode(self.dc_free)
+            await self.driver.set_fsk_crc(self.check_crc)
+            await self.driver.fsk_clear_fifo_on_crc_fail(False)
+            await self.driver.set_fsk_sync_value(self.sync_word)
+            await self.driver.set_fsk_restart_rx_mode(self.rx_restart_mode)
+        await self.driver.set_rx_continuous_mode()
+
     async def to_model(self) -> RadioModel:
         model = FSK_Model(bitrate=9600,
                           deviation=4800,
@@ -104,44 +116,27 @@ class FSK_Controller:
                           check_crc=self.check_crc,
                           tx_power=self.tx_power)
 
+    @traced
     async def read_config(self) -> RadioModel:
-        bitrate: int = await self.driver.get_fsk_bitrate()
-        deviation: int = await self.driver.get_fsk_deviation()
-        sync_val: bytes = await self.driver.get_fsk_sync_value(6)
-        dc_free: str = (await self.driver.get_fsk_dc_free_mode()).name
-        packet_mode: bool = await self.driver.get_fsk_packet_format()
-        model = FSK_Model(bitrate=bitrate,
-                          deviation=deviation,
-                          sync_word=sync_val,
-                          dc_free=dc_free,
-                          packet_format=packet_mode)
-        freq: int = await self.driver.get_freq()
-        tx_power: float = await self.driver.get_tx_power_dbm()
-        radio_model = RadioModel(mode=model,
-                                 frequency=freq,
-                                 pa_select=self.driver.pa_boost,
-                                 check_crc=self.check_crc,
-                                 tx_power=tx_power)
-        return radio_model
-
-    def _tx_frame(self, data: bytes, caller_name: str) -> FSK_TX_Packet:
-        timestamp: str = datetime.now().isoformat(' ', 'milliseconds')
-        return FSK_TX_Packet(timestamp=timestamp,
-                             data = data,
-                             data_len=len(data),
-                             frequency=self.freq_hz,
-                             caller=caller_name)
+        image = RegisterImage(await self.driver.get_all_registers())
+        return decode_fsk_config(image, self.driver.pa_boost)
+
+    def _tx_frame(self, data: bytes, caller_name: str,
+                  attempt: int = 0) -> FSK_TX_Record:
+        return FSK_TX_Record(data, self.freq_hz, caller_name, attempt)
 
+    @traced
     async def send_single(self, data: bytes, caller_name: str = '',
-                          attempt: int = 0) -> FSK_TX_Packet:
-        async with lock:
+                          attempt: int = 0) -> FSK_TX_Record:
+        async with self._lock:
             await self.driver.interface.write_fsk_read()
             await self.driver.set_standby_mode()
             await self.driver.fsk_sequencer.start_tx()
             await self.driver.interface.write_fsk_fifo(data)
             while await self.driver.get_operation_mode() == SX127x_Mode.TX:
                 pass
-            tx_frame: FSK_TX_Packet = self._tx_frame(data, caller_name)
+            tx_frame: FSK_TX_Record = self._tx_frame(data, caller_name,
+                                                     attempt)
             logger.debug(f'{self.label} {tx_frame}')
             await self.driver.set_rx_continuous_mode()
             while 'MODE_READY' not in await self.driver.get_fsk_isr_list():
@@ -150,31 +145,49 @@ class FSK_Controller:
             await self.driver.interface.write_fsk_read_start()
             return tx_frame
 
-    async def check_rx_input(self) -> FSK_RX_Packet | None:
-        async with lock:
+    @traced
+    async def check_rx_input(self) -> FSK_RX_Record | None:
+        async with self._lock:
             isr: list[str] = await self.driver.get_fsk_isr_list()
+            self.rx_activity = 'PREAMBLE_DETECT' in isr or \
+                'SYNC_ADDR_MATCH' in isr
             if 'PAYLOAD_READY' in isr:
-                timestamp: str = datetime.now().isoformat(' ', 'milliseconds')
                 crc_correct: bool = 'CRC_OK' in isr
                 rx_data: bytes = await self.driver.interface.write_fsk_read()
                 await self.driver.interface.write_fsk_read_start()
                 rssi: int = await self.driver.get_fsk_rssi()
-                rx_packet =  FSK_RX_Packet(timestamp=timestamp,
-                                           rssi_pkt=rssi,
-                                           data=rx_data,
-                                           data_len=len(rx_data),
-                                           frequency=self.freq_hz,
-                                           crc_correct=crc_correct,
-                                           caller=self._last_caller_name)
-                return rx_packet
+                packet = FSK_RX_Record(rx_data, self.freq_hz,
+                                       self._last_caller_name, rssi,
+                                       crc_correct)
+                self.rx.dispatch(packet)
+                return packet
             return None
 
-    async def _wait_rx(self) -> FSK_RX_Packet:
-        while True:
-            rx: FSK_RX_Packet | None = await self.check_rx_input()
-            if rx:
-                return rx
-
+    def time_on_air(self, packet_len: int) -> float:
+        """ Air time of the packet with current settings, ms """
+        sync_size: int = len(self.sync_word) if self.sync_mode else 0
+        if packet_len > MAX_PAYLOAD:
+            return fsk_time_on_air(packet_len, self.bitrate,
+                                   self.preamble_length, sync_size,
+                                   self.check_crc, self.dc_free,
+                                   self.packet_mode)
+        return fsk_table(self.bitrate, self.preamble_length, sync_size,
+                         self.check_crc, self.dc_free,
+                         self.packet_mode)[packet_len]
+
+    def poll_intervals(self) -> tuple[float, float]:
+        """
+        RX poll intervals, sec: 4 bytes time after a preamble and FIFO fill
+        time in silence
+        """
+        byte_time: float = 8 / self.bitrate
+        return 4 * byte_time, FSK_FIFO_SIZE * byte_time
+
+    async def _wait_rx(self, future: asyncio.Future) -> FSK_RX_Record:
+        return await self.rx.wait(future, self.check_rx_input,
+                                  self.poll_intervals()[0])
+
+    @traced
     async def send_repeat(self, data: bytes | Callable[..., bytes],
                           period_sec: float,
                           untill_answer: bool = True,
@@ -183,16 +196,20 @@ class FSK_Controller:
                           handler_args: Iterable = (),
                           expected_len: int = -1,
                           caller_name: str = '') -> FSK_Transaction:
-        last_rx_packet: FSK_RX_Packet | None = None
-        last_tx_packet: FSK_TX_Packet | None = None
+        last_rx_packet: FSK_RX_Record | None = None
+        last_tx_packet: FSK_TX_Record | None = None
         retries = 0
         _ts_start = time.time()
         while retries < max_retries:
             bdata: bytes = data() if isinstance(data, Callable) else data
-            await self.send_single(bdata, caller_name)
+            if self.tx_gate is not None:  # duty cycle budget of the frame
+                await self.tx_gate(self.time_on_air(len(bdata)))
+            # registered before TX, so a fast answer is not missed
+            answer_future: asyncio.Future = self.rx.subscribe()
             try:
-                rx_packet: FSK_RX_Packet = await wait_for(self._wait_rx(),
-                                                            period_sec)
+                await self.send_single(bdata, caller_name)
+                rx_packet: FSK_RX_Record = await wait_for(
+                    self._wait_rx(answer_future), period_sec)
                 last_rx_packet = rx_packet
                 if rx_packet.crc_correct and untill_answer:
                     if handler:
@@ -206,10 +223,14 @@ class FSK_Controller:
                         break
             except asyncio.TimeoutError:
                 logger.debug('FSK Rx timeout')
+            finally:
+                self.rx.unsubscribe(answer_future)
             retries += 1
         duration = int((time.time() - _ts_start) * 1000)
-        transaction = FSK_Transaction(request=last_tx_packet,
-                                      answer=last_rx_packet,
+        request = last_tx_packet.to_model() if last_tx_packet else None
+        answer = last_rx_packet.to_model() if last_rx_packet else None
+        transaction = FSK_Transaction(request=request,
+                                      answer=answer,
                                       duration_ms=duration,
                                       retries=retries,
                                       rx_timeout_ms=int(period_sec * 1000))
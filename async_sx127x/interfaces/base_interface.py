@@ -1,8 +1,40 @@
 from __future__ import annotations
 import asyncio
+import time
+from collections import deque
 from typing import Any, Callable, Coroutine
 from loguru import logger
 
+from async_sx127x.interfaces.stats import (BATCH_OPCODE, InterfaceStats,
+                                           TransactionRecord)
+
+
+NOTIFY_OPCODE = 40
+# In notification mode the bridge prefixes every reply by REPLY_TAG and
+# sends DIO0 interrupts unsolicited as [EVENT_TAG, irq flags]
+REPLY_TAG = 0xA5
+EVENT_TAG = 0x5A
+
+
+def _to_int(answer: bytes) -> int:
+    return int.from_bytes(answer, "big")
+
+
+def _write_frame(address: int, data: bytes | list[int]) -> bytes | bytearray:
+    if len(data) == 1:
+        return bytes((2, address, data[0]))
+    frame = bytearray(3 + len(data))
+    frame[0], frame[1], frame[2] = 8, address, len(data)
+    frame[3:] = data
+    return frame
+
+
+def _fsk_fifo_frame(data: bytes) -> bytearray:
+    frame = bytearray(len(data) + 1)
+    frame[0], frame[1] = 31, len(data) - 1
+    frame[2:] = memoryview(data)[1:]
+    return frame
+
 
 def check_connection(func: Callable):
     def _wrapper(*args, **kwargs):
@@ -11,25 +43,139 @@ def check_connection(func: Callable):
         return func(*args, **kwargs)
     return _wrapper
 
-async def retry(func: Callable[..., Coroutine], counter: int):
-    data = b''
-    while counter > 0:
-        data = await func()
-        if data != b'':
-            break
-        await asyncio.sleep(0.15)
-        logger.error('read empty bytes')
-        counter -= 1
-    return data
 
+class LinkReset(ConnectionResetError):
+    """
+    Raised by transport reads after it has reconnected. Requests in flight
+    are failed by the transport already, the reader just goes on.
+    """
+
+
+class PendingRequest:
+    """ Sent command waiting for its reply in the reader queue """
+    __slots__ = ('future', 'sizes', 'variable', 'retries', 'counter', 'notify')
+
+    def __init__(self, sizes: list[int], variable: bool = False,
+                 retries: int = 0, notify: bool | None = None) -> None:
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.sizes: list[int] = sizes
+        self.variable: bool = variable
+        self.retries: int = retries  # empty reads allowed before failure
+        self.counter: int = 0  # empty reads happened
+        self.notify: bool | None = notify  # notification mode after reply
+
+class CommandBatch:
+    """
+    Collects opcode frames and sends them by a single transport write. Replies
+    are parsed in the same order and returned through futures:
+
+        async with interface.batch() as batch:
+            sf_reg = batch.read(0x1E)
+            batch.write(0x39, [0x12])
+        print(sf_reg.result())
+
+    Commands with variable reply length (opcode 33) can not be batched.
+    """
+    def __init__(self, interface: BaseInterface) -> None:
+        self.interface: BaseInterface = interface
+        self._frames: list[bytes | bytearray] = []
+        self._replies: list[tuple[asyncio.Future, int,
+                                  Callable[[bytes], Any]]] = []
+
+    async def __aenter__(self) -> CommandBatch:
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            await self.execute()
+        else:
+            self._cancel()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def _add(self, frame: bytes | bytearray, amount: int,
+             decode: Callable[[bytes], Any] = _to_int) -> asyncio.Future:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._frames.append(frame)
+        self._replies.append((future, amount, decode))
+        return future
+
+    def _cancel(self) -> None:
+        for future, _, _ in self._replies:
+            future.cancel()
+        self._frames.clear()
+        self._replies.clear()
+
+    def read(self, address: int) -> asyncio.Future[int]:
+        return self._add(bytes([1, address]), 1)
+
+    def write(self, address: int,
+              data: bytes | list[int]) -> asyncio.Future[int]:
+        return self._add(_write_frame(address, data), 1)
+
+    def read_several(self, address: int,
+                     amount: int) -> asyncio.Future[list[int]]:
+        return self._add(bytes((7, address, amount)), amount, list)
+
+    def read_burst(self, address: int, amount: int) -> asyncio.Future[bytes]:
+        return self._add(bytes((7, address, amount)), amount, bytes)
+
+    def reset(self) -> asyncio.Future[int]:
+        return self._add(bytes([6]), 1)
+
+    def run_tx_then_rx_cont(self) -> asyncio.Future[int]:
+        return self._add(bytes([21]), 1)
+
+    def run_tx_then_rx_single(self) -> asyncio.Future[int]:
+        return self._add(bytes([22]), 1)
+
+    def write_fsk_fifo(self, data: bytes) -> asyncio.Future[int]:
+        return self._add(_fsk_fifo_frame(data), 1)
+
+    def write_fsk_read_start(self) -> asyncio.Future[int]:
+        return self._add(bytes([32]), 1)
+
+    async def execute(self) -> None:
+        if not self._frames:
+            return
+        frame: bytes = b''.join(self._frames)
+        amount: int = sum(reply[1] for reply in self._replies)
+        try:
+            answer: bytes = await self.interface._transaction(
+                frame, amount, opcode=BATCH_OPCODE,
+                sizes=[reply[1] for reply in self._replies])
+            if len(answer) != amount:
+                raise RuntimeError(f'Radio batch reply is incomplete: '
+                                   f'{len(answer)} of {amount} bytes')
+        except BaseException:
+            self._cancel()
+            raise
+        offset: int = 0
+        for future, reply_len, decode in self._replies:
+            future.set_result(decode(answer[offset:offset + reply_len]))
+            offset += reply_len
+        self._frames.clear()
+        self._replies.clear()
 
-lock = asyncio.Lock()
 
 class BaseInterface:
     _write: Callable[..., Coroutine]
     _read: Callable[..., Coroutine]
     _interface: Any
     connection_status: bool = False
+    notifications: bool = False
+    stats: InterfaceStats | None = None
+
+    def __init__(self) -> None:
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self.last_irq: int = 0
+        self._irq_event: asyncio.Event = asyncio.Event()
+        self._pending: deque[PendingRequest] = deque()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._reader_task: asyncio.Task | None = None
+        # awaited after transparent reconnect to restore the radio state
+        self.on_reconnect: list[Callable[[], Coroutine]] = []
 
     async def connect(self, ip_or_port: str) -> bool:
         raise NotImplementedError
@@ -37,64 +183,264 @@ class BaseInterface:
     def disconnect(self):
         raise NotImplementedError
 
-    @check_connection
-    async def read(self, address: int) -> int:
-        async with lock:
-            await self._write(bytes([1, address]))
-            data: bytes = await retry(self._try_read, 5)
-            return int.from_bytes(data, "big")
+    def batch(self) -> CommandBatch:
+        return CommandBatch(self)
 
-    @check_connection
-    async def write(self, address: int, data: list[int]) -> int:
-        async with lock:
-            if len(data) == 1:
-                await self._write(bytes([2, address, data[0]]))
+    def enable_stats(self, hook: Callable[[TransactionRecord], Any] | None = None
+                     ) -> InterfaceStats:
+        """ Starts transactions accounting, see `InterfaceStats` """
+        self.stats = InterfaceStats(hook)
+        return self.stats
+
+    def disable_stats(self) -> None:
+        self.stats = None
+
+    async def enable_notifications(self) -> bool:
+        """
+        Asks the bridge to send DIO0 (RxDone/TxDone, PayloadReady/PacketSent)
+        interrupts unsolicited, see `wait_irq`. Returns False if the firmware
+        does not support it.
+        """
+        if self.notifications:
+            return True
+        answer: bytes = await self._transaction(bytes([NOTIFY_OPCODE, 1]), 1,
+                                                notify=True)
+        if answer != bytes([NOTIFY_OPCODE]):
+            logger.warning('Radio bridge does not support notifications')
+            return False
+        return True
+
+    async def disable_notifications(self) -> None:
+        if self.notifications:
+            await self._transaction(bytes([NOTIFY_OPCODE, 0]), 1, notify=False)
+
+    def stop_reader(self, error: BaseException | None = None) -> None:
+        """
+        Stops the reader task and cancels requests waiting for replies, or
+        fails them with `error`
+        """
+        self.notifications = False
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        while self._pending:
+            request: PendingRequest = self._pending.popleft()
+            if request.future.done():
+                continue
+            if error is None:
+                request.future.cancel()
             else:
-                await self._write(bytes([8, address, len(data), *data]))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")
+                request.future.set_exception(error)
+
+    async def wait_irq(self, timeout: float | None = None) -> int | None:
+        """
+        Waits for DIO0 notification and returns IRQ flags register sent with
+        it, or None after `timeout` seconds
+        """
+        try:
+            await asyncio.wait_for(self._irq_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._irq_event.clear()
+        return self.last_irq
 
     @check_connection
+    async def _transaction(self, frame: bytes, amount: int, retries: int = 0,
+                           variable: bool = False, opcode: int | None = None,
+                           sizes: list[int] | None = None,
+                           notify: bool | None = None) -> bytes:
+        """
+        Sends `frame` and waits for `amount` bytes of reply. With `variable`
+        the first reply byte is amount of data bytes following it. `sizes`
+        are reply lengths of every command of a batched frame. The lock is
+        held only while the frame is written, the reply is read by the
+        reader task, so several requests can be in flight.
+        """
+        request = PendingRequest(sizes or [amount], variable, retries, notify)
+        if self.stats is not None:
+            return await self._measured_transaction(frame, request, opcode)
+        await self._submit(frame, request)
+        return await request.future
+
+    async def _measured_transaction(self, frame: bytes, request: PendingRequest,
+                                    opcode: int | None) -> bytes:
+        answer: bytes = b''
+        error: BaseException | None = None
+        contended: bool = self._lock.locked()
+        requested: int = time.perf_counter_ns()
+        acquired: int = requested
+        try:
+            acquired = await self._submit(frame, request)
+            answer = await request.future
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            finished: int = time.perf_counter_ns()
+            if self.stats is not None:
+                opcode = frame[0] if opcode is None else opcode
+                wait: int = acquired - requested if contended else 0
+                self.stats.record(TransactionRecord(opcode, len(frame),
+                                                    len(answer), wait,
+                                                    finished - acquired,
+                                                    request.counter, error))
+        return answer
+
+    async def _submit(self, frame: bytes, request: PendingRequest) -> int:
+        """ Queues `request` and writes its frame, returns lock acquire time """
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._reader())
+        async with self._lock:
+            acquired: int = time.perf_counter_ns()
+            self._pending.append(request)
+            self._wakeup.set()
+            try:
+                await self._write(frame)
+            except BaseException:
+                self._pending.remove(request)
+                raise
+        return acquired
+
+    async def _reader(self) -> None:
+        """
+        Owns the incoming byte stream: resolves pending requests in order
+        and, in notification mode, handles DIO0 event frames between them.
+        A reader replaced by stop_reader() exits even if its cancellation
+        was lost in a read which failed at the same moment.
+        """
+        while self.connection_status and \
+                self._reader_task is asyncio.current_task():
+            if not self._pending and not self.notifications:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._read_reply()
+            except asyncio.CancelledError:
+                raise
+            except LinkReset:
+                continue
+            except Exception as exc:
+                if not self._pending:
+                    logger.error(f'Radio reader: {exc}')
+                    await asyncio.sleep(0.1)
+                    continue
+                request: PendingRequest = self._pending[0]
+                self._discard(request)
+                if not request.future.done():
+                    request.future.set_exception(exc)
+
+    def _discard(self, request: PendingRequest) -> None:
+        """
+        Removes `request` from the queue. It may be gone already if the queue
+        was cleared while its reply was read.
+        """
+        if self._pending and self._pending[0] is request:
+            self._pending.popleft()
+        elif request in self._pending:
+            self._pending.remove(request)
+
+    async def _read_reply(self) -> None:
+        if self.notifications and not await self._read_tag():
+            return
+        if not self._pending:
+            logger.warning('Radio sent reply without request')
+            return
+        request: PendingRequest = self._pending[0]
+        try:
+            answer: bytes = await self._read_answer(request)
+        except (asyncio.CancelledError, LinkReset):
+            raise
+        except Exception as exc:
+            self._discard(request)
+            if not request.future.done():
+                request.future.set_exception(exc)
+            return
+        self._discard(request)
+        if request.notify is not None and answer == bytes([NOTIFY_OPCODE]):
+            self.notifications = request.notify
+        if not request.future.done():  # the caller may be cancelled
+            request.future.set_result(answer)
+
+    async def _read_answer(self, request: PendingRequest) -> bytes:
+        if self.notifications:
+            answer: bytes = await self._receive(request, request.sizes[0])
+            for size in request.sizes[1:]:
+                while not await self._read_tag():
+                    pass
+                answer += await self._receive(request, size)
+        else:
+            answer = await self._receive(request, sum(request.sizes))
+        if request.variable and answer[0]:
+            answer += await self._receive(request, answer[0])
+        return answer
+
+    async def _read_tag(self) -> bool:
+        """ Reads next frame tag. Returns True for reply, handles events """
+        tag: bytes = await self._read(1)
+        if tag == b'':
+            if self._pending:
+                raise RuntimeError('Radio read empty data')
+            await asyncio.sleep(0.01)
+            return False
+        if tag[0] == EVENT_TAG:
+            self.last_irq = (await self._try_read(1))[0]
+            self._irq_event.set()
+            return False
+        if tag[0] != REPLY_TAG:
+            logger.warning(f'Radio sent unexpected byte {tag[0]:#04x}')
+            return False
+        return True
+
+    async def _receive(self, request: PendingRequest, amount: int) -> bytes:
+        while True:
+            try:
+                data: bytes = await self._try_read(amount)
+            except RuntimeError:
+                if not request.retries:
+                    raise
+                data = b''
+            if data:
+                return data
+            if not request.retries:
+                raise RuntimeError('Radio read empty data')
+            request.retries -= 1
+            request.counter += 1
+            logger.error('read empty bytes')
+            await asyncio.sleep(0.15)
+            if request.future.done():
+                raise RuntimeError('Radio request is dropped')
+
+    async def read(self, address: int) -> int:
+        return _to_int(await self._transaction(bytes([1, address]), 1,
+                                               retries=5))
+
+    async def write(self, address: int, data: bytes | list[int]) -> int:
+        return _to_int(await self._transaction(_write_frame(address, data), 1))
+
     async def run_tx_then_rx_cont(self) -> int:
-        async with lock:
-            await self._write(bytes([21]))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")
+        return _to_int(await self._transaction(bytes([21]), 1))
 
-    @check_connection
     async def run_tx_then_rx_single(self) -> int:
-        async with lock:
-            await self._write(bytes([22]))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")
+        return _to_int(await self._transaction(bytes([22]), 1))
 
-    @check_connection
     async def read_several(self, address: int, amount: int) -> list[int]:
-        async with lock:
-            await self._write(bytes([7, address, amount]))
-            answer: bytes = await self._try_read(amount)
-            return list(answer)
+        return list(await self.read_burst(address, amount))
+
+    async def read_burst(self, address: int, amount: int) -> bytes:
+        """ Reads `amount` bytes from `address` (e.g. FIFO) without copying """
+        return await self._transaction(bytes((7, address, amount)), amount)
 
-    @check_connection
     async def reset(self) -> int:
-        async with lock:
-            await self._write(bytes([6]))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")
+        return _to_int(await self._transaction(bytes([6]), 1))
 
-    @check_connection
     async def write_fsk_fifo(self, data: bytes) -> int:
         """ В пакете FSK, в отличие от пакета LoRa *НЕ* передается первым байтом
         последущий размер пакета. Но для совместимости верхнего  уровня будем
         его добавлять, а убирать в этой функции.
         """
-        async with lock:
-            send_data = [31, len(data) - 1, *data[1:]]
-            await self._write(bytes(send_data))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")  # 31
+        return _to_int(await self._transaction(_fsk_fifo_frame(data), 1))  # 31
 
-    @check_connection
     async def write_fsk_read_start(self) -> int:
         """
         Запускает на микроконтроллере процесс перекладывания данных из FIFO приемопередатчика
@@ -103,35 +449,29 @@ class BaseInterface:
         Для остановки процесса перекладывания данных можно вызвать функцию write_fsk_read до
         окончания пакета.
         """
-        async with lock:
-            await self._write(bytes([32]))
-            answer: bytes = await self._try_read()
-            return int.from_bytes(answer, "big")
+        return _to_int(await self._transaction(bytes([32]), 1))
 
-    @check_connection
     async def write_fsk_read(self) -> bytes:
         """
         Первым байтом возвращает количество следующих байт, а потом последующие байты из
         FIFO микроконтроллера.
         """
-        async with lock:
-            await self._write(bytes([33]))
-            answer: bytes = await self._try_read()
-            data_len: int = int.from_bytes(answer, "big")
-            if data_len > 0:
-                answer = await self._try_read(data_len)
-                return int.to_bytes(data_len) + answer
-            return b''
+        answer: bytes = await self._transaction(bytes([33]), 1, variable=True)
+        return answer if answer[0] > 0 else b''
 
     async def _try_read(self, amount: int = 1) -> bytes:
+        """ Reads exactly `amount` bytes """
         try:
             data: bytes = await self._read(amount)
             if data == b'':
                 raise RuntimeError('Radio read empty data')
-            if len(data) != amount:
+            while len(data) < amount:
                 logger.debug(f'Waiting for remain data {amount - len(data)}')
-                while len(data) != amount:
-                    data += await self._read(amount)
+                chunk: bytes = await self._read(amount - len(data))
+                if chunk == b'':
+                    raise RuntimeError(f'Radio read {len(data)} of {amount} '
+                                       f'bytes')
+                data += chunk
             return data
         except TimeoutError as exc:
             raise TimeoutError(f'Radio reading timeout: {exc}') from exc
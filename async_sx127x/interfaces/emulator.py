@@ -0,0 +1,66 @@
+from __future__ import annotations
+import asyncio
+
+from async_sx127x.emulator.chip import SX127xEmulator
+from async_sx127x.emulator.transports import notify_loop
+from async_sx127x.interfaces.base_interface import BaseInterface
+
+
+class EmulatorInterface(BaseInterface):
+    """
+    In-process transport to SX127xEmulator. Replies come `latency` seconds
+    after the command to imitate a link round trip. Reads wait up to
+    `timeout` seconds for data like a serial port does.
+    """
+    def __init__(self, emulator: SX127xEmulator | None = None,
+                 latency: float = 0.0, timeout: float = 1.0) -> None:
+        super().__init__()
+        self.emulator: SX127xEmulator = emulator or SX127xEmulator()
+        self.latency: float = latency
+        self.timeout: float = timeout
+        self._buffer = bytearray()
+        self._answer = bytearray()
+        self._readable: asyncio.Event = asyncio.Event()
+        self._notifier: asyncio.Task | None = None
+        self._write = self._emulator_write
+        self._read = self._emulator_read
+
+    async def connect(self, ip_or_port: str = 'emulator') -> bool:
+        self.connection_status = True
+        self._notifier = asyncio.create_task(
+            notify_loop(self.emulator, self._put_answer))
+        return True
+
+    async def disconnect(self) -> bool:
+        self.stop_reader()
+        if self._notifier is not None:
+            self._notifier.cancel()
+            self._notifier = None
+        self.emulator.notify = False
+        self.connection_status = False
+        return True
+
+    def _put_answer(self, data: bytes) -> None:
+        if data:
+            self._answer += data
+            self._readable.set()
+
+    async def _emulator_write(self, data: bytes) -> None:
+        self._buffer += data
+        answer: bytes = self.emulator.handle(self._buffer)
+        if self.latency:
+            asyncio.get_running_loop().call_later(self.latency,
+                                                  self._put_answer, answer)
+        else:
+            self._put_answer(answer)
+
+    async def _emulator_read(self, amount: int = 1) -> bytes:
+        if not self._answer:
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                return b''
+        data = bytes(self._answer[:amount])
+        del self._answer[:amount]
+        return data
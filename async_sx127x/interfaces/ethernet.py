@@ -1,34 +1,133 @@
 from loguru import logger
 
-from async_sx127x.interfaces.base_interface import BaseInterface
+from async_sx127x.interfaces.base_interface import BaseInterface, LinkReset
 import asyncio
+import socket
 
 
 class EthernetInterface(BaseInterface):
+    """
+    TCP link to the radio bridge. Nagle's algorithm is disabled and TCP
+    keepalive is on, replies are read by exact amount with `read_timeout`
+    deadline. When the link breaks or a reply is late, requests in flight
+    fail with ConnectionResetError and the interface reconnects in
+    background (up to `reconnect_attempts`), then awaits `on_reconnect`
+    callbacks which restore the radio configuration.
+    """
+    def __init__(self, connect_timeout: float = 3.0, read_timeout: float = 1.0,
+                 reconnect_attempts: int = 10) -> None:
+        super().__init__()
+        self.connect_timeout: float = connect_timeout
+        self.read_timeout: float = read_timeout
+        self.reconnect_attempts: int = reconnect_attempts
+        self.address: tuple[str, str] = ('', '')
+        self._reconnect_task: asyncio.Task | None = None
+
     async def connect(self, ip_or_port: str) -> bool:
         if self.connection_status:
             return True
         try:
             ip, port = ip_or_port.split(':')
-            self.reader, self.writer = await asyncio.open_connection(ip, port)
-            self._read = self.reader.read
+            self.address = (ip, port)
+            await self._open()
+            self._read = self._tcp_read
             self._write = self._tcp_write
             self.connection_status = True
             return True
         except ConnectionRefusedError:
             logger.error('Radio connected in another thread! Connection refused')
             return False
+        except (OSError, asyncio.TimeoutError) as err:
+            logger.error(f'Can not connect to {ip_or_port}: {err!r}')
+            return False
+
+    async def _open(self) -> None:
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(*self.address), self.connect_timeout)
+        sock: socket.socket | None = self.writer.get_extra_info('socket')
+        if sock is None:
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', 10), ('TCP_KEEPINTVL', 5),
+                              ('TCP_KEEPCNT', 3)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option),
+                                value)
 
+    async def _tcp_read(self, amount: int = 1) -> bytes:
+        try:
+            return await asyncio.wait_for(self.reader.readexactly(amount),
+                                          self.read_timeout)
+        except asyncio.TimeoutError:
+            if not self._pending:  # idle wait for notifications
+                return b''
+            # a late reply would be taken for the next request's one
+            logger.warning(f'Radio reply timeout {self.read_timeout} s')
+        except (asyncio.IncompleteReadError, ConnectionError) as err:
+            logger.warning(f'Radio TCP link lost: {err!r}')
+        # reconnect stops the reader which may be the caller, do not cancel it
+        if not await asyncio.shield(self._start_reconnect()):
+            raise ConnectionResetError('Radio TCP link lost')
+        raise LinkReset('Radio TCP link reconnected')
 
     async def _tcp_write(self, data):
-        self.writer.write(data)
-        await self.writer.drain()
+        try:
+            self.writer.write(data)
+            await self.writer.drain()
+        except ConnectionError as err:
+            # the lock is held by the writer here, reconnect waits for it
+            asyncio.ensure_future(self._start_reconnect())
+            raise ConnectionResetError(f'Radio TCP link lost: {err}') from err
+
+    def _start_reconnect(self) -> asyncio.Task:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+        return self._reconnect_task
+
+    async def _reconnect(self) -> bool:
+        async with self._lock:
+            self.writer.close()
+            # the reader may be reading a reply of a failed request, the
+            # next request starts a new one on the new stream
+            self.stop_reader(ConnectionResetError('Radio TCP link lost'))
+            delay: float = 0.1
+            for attempt in range(1, self.reconnect_attempts + 1):
+                if not self.connection_status:
+                    return False
+                try:
+                    await self._open()
+                    logger.success(f'Radio TCP link restored, attempt {attempt}')
+                    break
+                except (OSError, asyncio.TimeoutError) as err:
+                    logger.warning(f'Radio reconnect attempt {attempt}: {err!r}')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+            else:
+                logger.error('Radio TCP link is not restored')
+                self.connection_status = False
+                return False
+        asyncio.create_task(self._restore())
+        return True
+
+    async def _restore(self) -> None:
+        for callback in self.on_reconnect:
+            try:
+                await callback()
+            except (RuntimeError, ConnectionError) as err:
+                logger.error(f'Radio restore after reconnect failed: {err}')
 
     async def disconnect(self) -> bool:
         if self.connection_status:
-            self.writer.close()
-            await self.writer.wait_closed()
             self.connection_status = False
+            self.stop_reader()
+            if self._reconnect_task is not None:
+                self._reconnect_task.cancel()
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
             return True
         return False
 
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from async_sx127x.interfaces.base_interface import BaseInterface
+from async_sx127x.register_image import RegisterImage
+from async_sx127x.registers import SX127x_Registers
+
+
+class ImageInterface(BaseInterface):
+    """
+    Registers access to in-memory image. Driver setters executed over it
+    compile configuration without touching the chip.
+    """
+    connection_status: bool = True
+
+    def __init__(self, image: RegisterImage) -> None:
+        super().__init__()
+        self.image: RegisterImage = image
+
+    async def connect(self, ip_or_port: str) -> bool:
+        return True
+
+    async def disconnect(self) -> bool:
+        return True
+
+    async def read(self, address: int) -> int:
+        return self.image[address]
+
+    async def write(self, address: int, data: bytes | list[int]) -> int:
+        if address != SX127x_Registers.FIFO.value:
+            self.image.update(address, data)
+        return 0
+
+    async def read_several(self, address: int, amount: int) -> list[int]:
+        return self.image.several(address, amount)
+
+    async def read_burst(self, address: int, amount: int) -> bytes:
+        return bytes(self.image.several(address, amount))
+
+    async def reset(self) -> int:
+        raise RuntimeError('Registers image can not be reset')
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import asyncio
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+from loguru import logger
+
+from async_sx127x.capture import CAPTURE_MAGIC, CaptureKind, CaptureReader
+from async_sx127x.emulator.chip import SX127xEmulator
+from async_sx127x.interfaces.emulator import EmulatorInterface
+
+
+REPLAY_POLL = 0.001  # seconds, chip state check period of the feeder
+
+
+class ReplayPacket(NamedTuple):
+    time: float  # seconds, only differences between packets matter
+    data: bytes
+    rssi: int = -80
+    snr: float = 10.0
+    crc_ok: bool = True
+
+
+def load_replay_packets(path: str | Path) -> list[ReplayPacket]:
+    """
+    Reads RX packets from a capture file (`async_sx127x.capture`) or from
+    JSON lines of LoRaRxPacket/FSK_RX_Packet dumps. TX packets are skipped.
+    """
+    path = Path(path)
+    with path.open('rb') as file:
+        is_capture: bool = file.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC
+    if is_capture:
+        return [ReplayPacket(pkt.time_ns / 1e9, _strip_fsk_length(pkt.data)
+                             if pkt.kind == CaptureKind.FSK_RX else pkt.data,
+                             pkt.rssi_pkt, pkt.snr, pkt.crc_correct)
+                for pkt in CaptureReader(path)
+                if pkt.kind in (CaptureKind.LORA_RX, CaptureKind.FSK_RX)]
+    return list(_json_packets(path))
+
+
+def _json_packets(path: Path) -> Iterator[ReplayPacket]:
+    with path.open(encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                item: dict = json.loads(line)
+                if 'crc_correct' not in item:  # TX packet
+                    continue
+                data: bytes = bytes.fromhex(item['data'])
+                if item.get('mode') == 'FSK':
+                    data = _strip_fsk_length(data)
+                yield ReplayPacket(
+                    datetime.fromisoformat(item['timestamp']).timestamp(),
+                    data, item['rssi_pkt'], item.get('snr', 10.0),
+                    item['crc_correct'])
+            except (ValueError, KeyError) as err:
+                logger.warning(f'{path}:{number} is not a RX packet: {err!r}')
+
+
+def _strip_fsk_length(data: bytes) -> bytes:
+    """ FSK RX data starts with the length byte which the chip adds again """
+    if data and data[0] == len(data) - 1:
+        return data[1:]
+    return data
+
+
+class ReplayInterface(EmulatorInterface):
+    """
+    Emulated radio which receives recorded packets with their original
+    timing, `speed` times faster (None - back to back, each packet as soon
+    as the previous one is taken by the host). Replay starts when the
+    controller puts the chip in RX mode. The controller code runs as with
+    real hardware: check_rx_input, rx_routine and received event.
+    """
+    def __init__(self, packets: Iterable[ReplayPacket] | str | Path | None = None,
+                 speed: float | None = 1.0, latency: float = 0.0,
+                 timeout: float = 1.0) -> None:
+        super().__init__(SX127xEmulator(time_scale=0), latency, timeout)
+        self.speed: float | None = speed
+        self.packets: list[ReplayPacket] = []
+        self.replayed: int = 0
+        self.finished: asyncio.Event = asyncio.Event()
+        self._source = packets
+        self._feeder: asyncio.Task | None = None
+
+    async def connect(self, ip_or_port: str = 'replay') -> bool:
+        source = self._source
+        if source is None:
+            source = ip_or_port.removeprefix('replay:')
+        try:
+            if isinstance(source, (str, Path)):
+                self.packets = await asyncio.to_thread(load_replay_packets,
+                                                       source)
+            else:
+                self.packets = list(source)
+        except OSError as err:
+            logger.error(f'Can not load replay packets: {err}')
+            return False
+        logger.info(f'Replay of {len(self.packets)} packets')
+        await super().connect(ip_or_port)
+        self.replayed = 0
+        self.finished.clear()
+        self._feeder = asyncio.create_task(self._feed())
+        return True
+
+    async def disconnect(self) -> bool:
+        if self._feeder is not None:
+            self._feeder.cancel()
+            self._feeder = None
+        return await super().disconnect()
+
+    async def _feed(self) -> None:
+        while not self.emulator.listening():
+            await asyncio.sleep(REPLAY_POLL)
+        started: float = time.monotonic()
+        first: float = self.packets[0].time if self.packets else 0.0
+        for packet in self.packets:
+            if self.speed:
+                delay: float = started + (packet.time - first) / self.speed \
+                    - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                while self.emulator.rx_pending():
+                    await asyncio.sleep(REPLAY_POLL)
+            self.emulator.inject(packet.data, packet.rssi, packet.snr,
+                                 packet.crc_ok, delay=0)
+            self.replayed += 1
+        self.finished.set()
@@ -16,7 +16,10 @@ class SerialInterface(BaseInterface):
                                                    timeout=1, write_timeout=1)
             self._read = self._interface.read_async
             self._write = self._interface.write_async
-            self._interface.dtr = False
+            try:
+                self._interface.dtr = False
+            except OSError:  # pseudo terminals have no modem lines
+                logger.debug(f'{ip_or_port} does not support DTR')
             await self._interface.write_async(bytes([6]))
             await self._interface.read_async(1)
             if self._interface.is_open:
@@ -30,6 +33,7 @@ class SerialInterface(BaseInterface):
 
     async def disconnect(self) -> bool:
         if self.connection_status:
+            self.stop_reader()
             self._interface.close()
             self.connection_status = False
             return not self._interface.is_open
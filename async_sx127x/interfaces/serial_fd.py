@@ -0,0 +1,116 @@
+from __future__ import annotations
+import asyncio
+import os
+
+from loguru import logger
+from serial import Serial, serialutil
+
+from async_sx127x.interfaces.base_interface import BaseInterface
+
+
+class FdSerialInterface(BaseInterface):
+    """
+    Serial backend on the event loop: the port is opened non-blocking and
+    its file descriptor is watched by `loop.add_reader`, so reads and
+    writes do not hop to a thread pool like aioserial does. Incoming bytes
+    are collected in a buffer. POSIX only.
+    """
+    def __init__(self, timeout: float = 1.0) -> None:
+        super().__init__()
+        self.timeout: float = timeout
+        self._rx_buffer = bytearray()
+        self._readable: asyncio.Event = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._fd: int = -1
+        self._read = self._fd_read
+        self._write = self._fd_write
+
+    async def connect(self, ip_or_port: str) -> bool:
+        if self.connection_status:
+            return True
+        try:
+            self._interface: Serial = Serial(port=ip_or_port, baudrate=500000,
+                                             timeout=0, write_timeout=0)
+            try:
+                self._interface.dtr = False
+            except OSError:  # pseudo terminals have no modem lines
+                logger.debug(f'{ip_or_port} does not support DTR')
+        except serialutil.SerialException as err:
+            logger.error(err)
+            return False
+        self._fd = self._interface.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._on_readable)
+        self.connection_status = True
+        await self._fd_write(bytes([6]))
+        if await self._fd_read(1) == b'':
+            await self.disconnect()
+            raise ConnectionError(f"Can\'t connect to {ip_or_port}. "
+                                  f"Probably device is busy")
+        return True
+
+    async def disconnect(self) -> bool:
+        if self._fd < 0:
+            return True
+        # also after a read error, which has cleared connection_status
+        self.stop_reader()
+        if self._loop is not None:
+            self._loop.remove_reader(self._fd)
+        self._interface.close()
+        self._fd = -1
+        self.connection_status = False
+        return not self._interface.is_open
+
+    def _on_readable(self) -> None:
+        try:
+            data: bytes = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as err:
+            self._lost(f'Serial read error: {err}')
+            return
+        if not data:  # EOF: the adapter is unplugged
+            self._lost('Serial port is closed by the device')
+            return
+        self._rx_buffer += data
+        self._readable.set()
+
+    def _lost(self, reason: str) -> None:
+        logger.error(reason)
+        self._loop.remove_reader(self._fd)  # type: ignore
+        self.connection_status = False
+        self._readable.set()
+
+    async def _fd_read(self, amount: int = 1) -> bytes:
+        if not self._rx_buffer:
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                return b''
+        data = bytes(self._rx_buffer[:amount])
+        del self._rx_buffer[:amount]
+        return data
+
+    async def _fd_write(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            try:
+                written: int = os.write(self._fd, view)
+            except BlockingIOError:
+                written = 0
+            view = view[written:]
+            if view:
+                await self._writable()
+
+    async def _writable(self) -> None:
+        loop: asyncio.AbstractEventLoop = self._loop  # type: ignore
+        future: asyncio.Future = loop.create_future()
+        loop.add_writer(self._fd, future.set_result, None)
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as exc:
+            raise TimeoutError('Serial write timeout') from exc
+        finally:
+            loop.remove_writer(self._fd)
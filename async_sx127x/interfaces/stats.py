@@ -0,0 +1,119 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Any, Callable, NamedTuple
+
+
+BATCH_OPCODE = 0  # pseudo opcode of CommandBatch transactions
+OPCODE_NAMES: dict[int, str] = {
+    BATCH_OPCODE: 'batch',
+    1: 'read',
+    2: 'write',
+    6: 'reset',
+    7: 'read_several',
+    8: 'burst_write',
+    21: 'tx_then_rx_cont',
+    22: 'tx_then_rx_single',
+    31: 'fsk_fifo_write',
+    32: 'fsk_read_start',
+    33: 'fsk_read',
+    40: 'notify',
+}
+# Upper bounds of latency histogram buckets, microseconds
+LATENCY_BUCKETS_US: tuple[int, ...] = (50, 100, 250, 500, 1_000, 2_500, 5_000,
+                                       10_000, 25_000, 100_000, 1_000_000)
+
+
+class TransactionRecord(NamedTuple):
+    opcode: int
+    bytes_out: int
+    bytes_in: int
+    lock_wait_ns: int
+    latency_ns: int  # write and read, without lock wait
+    retries: int
+    error: BaseException | None = None
+
+
+class OpcodeStats:
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.errors: int = 0
+        self.bytes_out: int = 0
+        self.bytes_in: int = 0
+        self.total_ns: int = 0
+        self.max_ns: int = 0
+        self.histogram: list[int] = [0] * (len(LATENCY_BUCKETS_US) + 1)
+
+    def record(self, record: TransactionRecord) -> None:
+        self.count += 1
+        self.bytes_out += record.bytes_out
+        self.bytes_in += record.bytes_in
+        if record.error is not None:
+            self.errors += 1
+        self.total_ns += record.latency_ns
+        self.max_ns = max(self.max_ns, record.latency_ns)
+        bucket: int = bisect_left(LATENCY_BUCKETS_US, record.latency_ns / 1000)
+        self.histogram[bucket] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        labels: list[str] = [f'<={bound}us' for bound in LATENCY_BUCKETS_US]
+        labels.append(f'>{LATENCY_BUCKETS_US[-1]}us')
+        return {'count': self.count,
+                'errors': self.errors,
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in,
+                'mean_us': round(self.total_ns / self.count / 1000, 1)
+                           if self.count else 0.0,
+                'max_us': round(self.max_ns / 1000, 1),
+                'histogram': dict(zip(labels, self.histogram))}
+
+
+class InterfaceStats:
+    """
+    Transactions accounting of BaseInterface: per opcode counters, bytes,
+    latency histograms, lock wait time and read retries. Every callable of
+    `hooks` is called with TransactionRecord after every transaction.
+    """
+    def __init__(self,
+                 hook: Callable[[TransactionRecord], Any] | None = None) -> None:
+        self.hooks: list[Callable[[TransactionRecord], Any]] = []
+        if hook is not None:
+            self.hooks.append(hook)
+        self.reset()
+
+    def reset(self) -> None:
+        self.opcodes: dict[int, OpcodeStats] = {}
+        self.lock_wait_ns: int = 0
+        self.lock_wait_max_ns: int = 0
+        self.lock_contended: int = 0
+        self.retries: int = 0
+
+    def record(self, record: TransactionRecord) -> None:
+        stats: OpcodeStats | None = self.opcodes.get(record.opcode)
+        if stats is None:
+            stats = self.opcodes[record.opcode] = OpcodeStats()
+        stats.record(record)
+        self.retries += record.retries
+        self.lock_wait_ns += record.lock_wait_ns
+        self.lock_wait_max_ns = max(self.lock_wait_max_ns, record.lock_wait_ns)
+        if record.lock_wait_ns > 0:
+            self.lock_contended += 1
+        for hook in self.hooks:
+            hook(record)
+
+    def totals(self) -> tuple[int, int, int]:
+        """ Transactions, bytes sent and bytes received """
+        return (sum(stats.count for stats in self.opcodes.values()),
+                sum(stats.bytes_out for stats in self.opcodes.values()),
+                sum(stats.bytes_in for stats in self.opcodes.values()))
+
+    def snapshot(self) -> dict[str, Any]:
+        transactions, bytes_out, bytes_in = self.totals()
+        return {'transactions': transactions,
+                'bytes_out': bytes_out,
+                'bytes_in': bytes_in,
+                'retries': self.retries,
+                'lock_contended': self.lock_contended,
+                'lock_wait_us': round(self.lock_wait_ns / 1000, 1),
+                'lock_wait_max_us': round(self.lock_wait_max_ns / 1000, 1),
+                'opcodes': {OPCODE_NAMES.get(opcode, str(opcode)): stats.snapshot()
+                            for opcode, stats in sorted(self.opcodes.items())}}
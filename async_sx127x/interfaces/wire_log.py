@@ -0,0 +1,243 @@
+from __future__ import annotations
+import asyncio
+import struct
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from pathlib import Path
+from typing import IO, AsyncIterator, Awaitable, Callable, NamedTuple
+
+from loguru import logger
+
+from async_sx127x.interfaces.base_interface import BaseInterface
+
+
+# File: WIRE_HEADER, then events of EVENT_HEADER + bytes
+WIRE_MAGIC = b'SXWIRE'
+WIRE_VERSION = 1
+WIRE_HEADER = struct.Struct('<6sB1x')  # magic, version
+EVENT_HEADER = struct.Struct('<BqI')  # direction, ns since start, length
+
+
+class WireDirection(IntEnum):
+    WRITE = 0
+    READ = 1
+
+
+class WireEvent(NamedTuple):
+    direction: WireDirection
+    time_ns: int
+    data: bytes
+
+
+def read_wire_log(path: str | Path) -> list[WireEvent]:
+    raw: bytes = Path(path).read_bytes()
+    magic, version = WIRE_HEADER.unpack_from(raw, 0)
+    if magic != WIRE_MAGIC or version != WIRE_VERSION:
+        raise ValueError(f'{path} is not a wire log of version {WIRE_VERSION}')
+    events: list[WireEvent] = []
+    offset: int = WIRE_HEADER.size
+    while offset + EVENT_HEADER.size <= len(raw):
+        direction, time_ns, length = EVENT_HEADER.unpack_from(raw, offset)
+        offset += EVENT_HEADER.size
+        events.append(WireEvent(WireDirection(direction), time_ns,
+                                raw[offset:offset + length]))
+        offset += length
+    return events
+
+
+class WireRecorder:
+    """
+    Logs every transport write and read of the interface with its time.
+    Events are buffered in memory and written to the open file by a
+    background task every `flush_interval` in a worker thread, so disk
+    latency does not slow down the recorded transactions. Interfaces
+    assign their transport in connect(), so start the recorder after it.
+    """
+    def __init__(self, interface: BaseInterface, path: str | Path,
+                 flush_interval: float = 0.5) -> None:
+        self.interface: BaseInterface = interface
+        self.path: Path = Path(path)
+        self.flush_interval: float = flush_interval
+        self.writes: int = 0
+        self.reads: int = 0
+        self._buffer = bytearray()
+        self._started: int = 0
+        self._file: IO[bytes] | None = None
+        self._task: asyncio.Task | None = None
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._write: Callable[[bytes], Awaitable] | None = None
+        self._read: Callable[[int], Awaitable[bytes]] | None = None
+
+    async def start(self) -> None:
+        if self._write is not None:
+            return
+        self._file = await asyncio.to_thread(self._open)
+        self._buffer.clear()
+        self._started = time.monotonic_ns()
+        self._write, self._read = self.interface._write, self.interface._read
+        self.interface._write = self._recording_write
+        self.interface._read = self._recording_read
+        self._task = asyncio.create_task(self._flush_loop())
+
+    def _open(self) -> IO[bytes]:
+        file: IO[bytes] = self.path.open('wb')
+        file.write(WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION))
+        return file
+
+    async def stop(self) -> None:
+        """ Restores the interface, writes buffered events, closes the file """
+        if self._write is None:
+            return
+        self.interface._write, self.interface._read = self._write, self._read
+        self._write = self._read = None
+        async with self._lock:  # a write in the worker thread is not cut
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+            await self._flush()
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                async with self._lock:
+                    await self._flush()
+            except OSError as err:
+                logger.error(f'Wire log write to {self.path} failed: {err}')
+
+    async def _flush(self) -> None:
+        if not self._buffer or self._file is None:
+            return
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        try:
+            await asyncio.to_thread(self._file.write, chunk)
+        except BaseException:
+            self._buffer[:0] = chunk  # written by the next flush
+            raise
+
+    def _event(self, direction: WireDirection, data: bytes) -> None:
+        self._buffer += EVENT_HEADER.pack(
+            direction, time.monotonic_ns() - self._started, len(data))
+        self._buffer += data
+
+    async def _recording_write(self, data: bytes) -> None:
+        self.writes += 1
+        self._event(WireDirection.WRITE, bytes(data))
+        await self._write(data)  # type: ignore
+
+    async def _recording_read(self, amount: int = 1) -> bytes:
+        data: bytes = await self._read(amount)  # type: ignore
+        self.reads += 1
+        self._event(WireDirection.READ, bytes(data))
+        return data
+
+
+@asynccontextmanager
+async def recording(interface: BaseInterface, path: str | Path
+                    ) -> AsyncIterator[WireRecorder]:
+    """
+        async with recording(radio.driver.interface, 'init.wire'):
+            await radio.current_mode.init()
+    """
+    recorder = WireRecorder(interface, path)
+    await recorder.start()
+    try:
+        yield recorder
+    finally:
+        await recorder.stop()
+
+
+class PlaybackInterface(BaseInterface):
+    """
+    Serves replies of a wire log without hardware. Incoming bytes are one
+    stream, every recorded read becomes available after the writes which
+    preceded it in the log, so replies come in the recorded order whatever
+    read sizes are used. Writes are compared with the log and differences
+    are counted in `mismatches`. Reads wait for data up to `timeout`.
+    """
+    def __init__(self, path: str | Path | None = None,
+                 timeout: float = 1.0) -> None:
+        super().__init__()
+        self.path: Path | None = Path(path) if path else None
+        self.timeout: float = timeout
+        self.mismatches: int = 0
+        self._writes: list[bytes] = []
+        self._reads: list[tuple[int, bytes]] = []  # (writes before, data)
+        self._write_index: int = 0
+        self._read_index: int = 0
+        self._stream = bytearray()
+        self._readable: asyncio.Event = asyncio.Event()
+        self._write = self._playback_write
+        self._read = self._playback_read
+
+    async def connect(self, ip_or_port: str = '') -> bool:
+        path = self.path or Path(ip_or_port.removeprefix('playback:'))
+        try:
+            events: list[WireEvent] = await asyncio.to_thread(read_wire_log,
+                                                              path)
+        except (OSError, ValueError) as err:
+            logger.error(f'Can not load wire log: {err}')
+            return False
+        self._writes = [event.data for event in events
+                        if event.direction == WireDirection.WRITE]
+        self._reads.clear()
+        writes: int = 0
+        for event in events:
+            if event.direction == WireDirection.WRITE:
+                writes += 1
+            elif event.data:
+                self._reads.append((writes, event.data))
+        self._write_index = self._read_index = self.mismatches = 0
+        self._stream.clear()
+        self._release()
+        logger.info(f'Playback of {len(self._writes)} writes from {path}')
+        self.connection_status = True
+        return True
+
+    async def disconnect(self) -> bool:
+        self.stop_reader()
+        self.connection_status = False
+        return True
+
+    @property
+    def finished(self) -> bool:
+        return self._write_index >= len(self._writes) and \
+            self._read_index >= len(self._reads) and not self._stream
+
+    def _release(self) -> None:
+        """ Moves recorded reads allowed by the writes done to the stream """
+        while self._read_index < len(self._reads):
+            writes, data = self._reads[self._read_index]
+            if writes > self._write_index:
+                break
+            self._stream += data
+            self._read_index += 1
+        if self._stream:
+            self._readable.set()
+
+    async def _playback_write(self, data: bytes) -> None:
+        index: int = self._write_index
+        expected: bytes | None = self._writes[index] \
+            if index < len(self._writes) else None
+        if expected != bytes(data):
+            self.mismatches += 1
+            logger.warning(f'Playback write {index} differs: {bytes(data).hex()}'
+                           f' instead of {expected.hex() if expected else None}')
+        self._write_index += 1
+        self._release()
+
+    async def _playback_read(self, amount: int = 1) -> bytes:
+        if not self._stream:
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                return b''
+        data = bytes(self._stream[:amount])
+        del self._stream[:amount]
+        return data
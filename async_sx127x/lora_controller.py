@@ -1,16 +1,18 @@
 from __future__ import annotations
 import asyncio
-from datetime import datetime
-from math import ceil
 import time
 from typing import Awaitable, Callable, Iterable
 from loguru import logger
 from event import Event
+from async_sx127x.airtime import MAX_PAYLOAD, lora_table, lora_time_on_air
 from async_sx127x.driver import SX127x_Driver
-from async_sx127x.models import (LoRaModel, LoRaRxPacket, LoRaTxPacket, LoraTransaction,
-                                 RadioModel)
-from async_sx127x.registers import (SX127x_HeaderMode,
+from async_sx127x.models import LoRaModel, LoraTransaction, RadioModel
+from async_sx127x.packets import LoRaRxRecord, LoRaTxRecord
+from async_sx127x.register_image import RegisterImage, decode_lora_config
+from async_sx127x.registers import (SX127x_HeaderMode, SX127x_LoRa_ISR,
                                     SX127x_Modulation, SX127x_Registers)
+from async_sx127x.rx_dispatcher import RxDispatcher
+from async_sx127x.tracing import traced
 
 
 async def ainput(prompt: str = "") -> str:
@@ -18,8 +20,7 @@ async def ainput(prompt: str = "") -> str:
 
 
 
-lock = asyncio.Lock()
-ANSWER_CALLBACK = Callable[[LoRaRxPacket, Iterable], Awaitable[bool] | bool]
+ANSWER_CALLBACK = Callable[[LoRaRxRecord, Iterable], Awaitable[bool] | bool]
 
 
 
@@ -55,34 +56,44 @@ class LoRa_Controller:
         self.header_mode = kwargs.get('header_mode', SX127x_HeaderMode.EXPLICIT)
         self.ldro = kwargs.get('ldro', True)
         self.label: str = kwargs.get('label', '')
-        self._transmited: Event = Event(LoRaTxPacket)
+        self.rx_activity: bool = False  # valid header seen by the last poll
+        self._transmited: Event = Event(LoRaTxRecord)
         self._last_caller_name: str = ''
-        self._last_rx: LoRaRxPacket | None = None
+        self._last_rx: LoRaRxRecord | None = None
+        self.rx: RxDispatcher[LoRaRxRecord] = RxDispatcher()
+        # awaited with air time (ms) before every send_repeat frame
+        self.tx_gate: Callable[[float], Awaitable] | None = None
         self._extra_delay_ms = 30
+        self._lock: asyncio.Lock = asyncio.Lock()
 
+    @traced
     async def init(self)  -> None:
-        async with lock:
+        async with self._lock:
             await self.driver.reset()
             await asyncio.sleep(0.1)
-            await self.driver.set_modulation(SX127x_Modulation.LORA)
-            await self.driver.set_lora_header_mode(self.header_mode)
-            if self.header_mode == SX127x_HeaderMode.IMPLICIT:
-                await self.driver.set_lora_payload_length(self.payload_length)
-            await self.driver.set_lora_coding_rate(self.coding_rate)
-            await self.driver.set_lora_bandwidth(self.driver.bw[self.bandwidth])
-            await self.driver.set_lora_sf(self.spread_factor)
-            await self.driver.set_lora_crc_mode(self.crc_mode)
-            await self.driver.set_tx_power(self.tx_power)
-            await self.driver.set_lora_sync_word(self.sync_word)
-            await self.driver.set_lora_preamble_length(self.preamble_length)
-            await self.driver.set_lora_auto_gain_control(self.auto_gain_control)
-            # if not self.auto_gain_control:
-            await self.driver.set_low_noize_amplifier(self.lna_val,
-                                                    self.lna_boost)
-            await self.driver.set_lora_rx_tx_fifo_base_addr(0, 0)
-            await self.driver.set_frequency(self.freq_hz)
-            await self.driver.set_low_data_rate_optimize(self.ldro)
-            await self.driver.set_rx_continuous_mode()
+            await self.driver.upload_config(SX127x_Modulation.LORA,
+                                            self._configure)
+
+    async def _configure(self) -> None:
+        await self.driver.set_modulation(SX127x_Modulation.LORA)
+        await self.driver.set_lora_header_mode(self.header_mode)
+        if self.header_mode == SX127x_HeaderMode.IMPLICIT:
+            await self.driver.set_lora_payload_length(self.payload_length)
+        await self.driver.set_lora_coding_rate(self.coding_rate)
+        await self.driver.set_lora_bandwidth(self.driver.bw[self.bandwidth])
+        await self.driver.set_lora_sf(self.spread_factor)
+        await self.driver.set_lora_crc_mode(self.crc_mode)
+        await self.driver.set_tx_power(self.tx_power)
+        await self.driver.set_lora_sync_word(self.sync_word)
+        await self.driver.set_lora_preamble_length(self.preamble_length)
+        await self.driver.set_lora_auto_gain_control(self.auto_gain_control)
+        # if not self.auto_gain_control:
+        await self.driver.set_low_noize_amplifier(self.lna_val,
+                                                  self.lna_boost)
+        await self.driver.set_lora_rx_tx_fifo_base_addr(0, 0)
+        await self.driver.set_frequency(self.freq_hz)
+        await self.driver.set_low_data_rate_optimize(self.ldro)
+        await self.driver.set_rx_continuous_mode()
 
     async def to_model(self) -> RadioModel:
         model = LoRaModel(spreading_factor=self.spread_factor,
@@ -100,34 +111,10 @@ class LoRa_Controller:
                           check_crc=self.crc_mode,
                           tx_power=self.tx_power)
 
+    @traced
     async def read_config(self) -> RadioModel:
-        bw: int | float = (await self.driver.get_lora_bandwidth())
-        cr: int = await self.driver.get_lora_coding_rate()
-        header_mode: str = (await self.driver.get_lora_header_mode()).name
-        crc: bool = await self.driver.get_lora_crc_mode()
-        sf: int = await self.driver.get_lora_sf()
-        sync_word: int = await self.driver.get_lora_sync_word()
-        agc: bool = await self.driver.get_lora_auto_gain_control()
-        ldro: bool = await self.driver.get_low_data_rate_optimize()
-        lna_boost: bool = await self.driver.get_lna_boost()
-        lna_gain: int = await self.driver.get_lna_gain()
-        model = LoRaModel(spreading_factor=sf,
-                          bandwidth=bw,
-                          sync_word=sync_word,
-                          coding_rate=cr,
-                          autogain_control=agc,
-                          lna_boost=lna_boost,
-                          lna_gain=lna_gain,
-                          header_mode=header_mode,
-                          ldro=ldro)
-        freq: int = await self.driver.get_freq()
-        tx_power: float = await self.driver.get_tx_power_dbm()
-        radio_model = RadioModel(mode=model,
-                                 frequency=freq,
-                                 pa_select=self.driver.pa_boost,
-                                 check_crc=crc,
-                                 tx_power=tx_power)
-        return radio_model
+        image = RegisterImage(await self.driver.get_all_registers())
+        return decode_lora_config(image, self.driver.pa_boost)
 
     async def _send_chunks(self, data: bytes, chunk_size: int) -> None:
         chunks: list[bytes] = [data[i:i + chunk_size]
@@ -135,17 +122,18 @@ class LoRa_Controller:
         logger.debug(f'{self.label} big parcel: {len(data)=}')
         is_implicit: bool = (self.header_mode == SX127x_HeaderMode.IMPLICIT)
         for chunk in chunks:
-            tx_chunk: LoRaTxPacket = self.calculate_packet(chunk)
+            tx_chunk: LoRaTxRecord = self.calculate_packet(chunk)
             logger.debug(tx_chunk)
             await self.driver.write_fifo(chunk, is_implicit)
-            await self.driver.interface.run_tx_then_rx_cont()
+            await self.driver.run_tx_then_rx_cont()
             self._transmited.emit(tx_chunk)
             await asyncio.sleep((tx_chunk.Tpkt + 10) / 1000)
 
+    @traced
     async def send_single(self, data: bytes,
-                          caller_name: str = '', attempt: int = 0) -> LoRaTxPacket:
+                          caller_name: str = '', attempt: int = 0) -> LoRaTxRecord:
         buffer_size: int = 255
-        tx_pkt: LoRaTxPacket = self.calculate_packet(data)
+        tx_pkt: LoRaTxRecord = self.calculate_packet(data)
         tx_pkt.attempt = attempt
         tx_pkt.caller = caller_name
         self._last_caller_name = caller_name
@@ -155,48 +143,44 @@ class LoRa_Controller:
         else:
             is_implicit: bool = (self.header_mode == SX127x_HeaderMode.IMPLICIT)
             await self.driver.write_fifo(data, is_implicit)
-            await self.driver.interface.run_tx_then_rx_cont()
+            await self.driver.run_tx_then_rx_cont()
             self._transmited.emit(tx_pkt)
             await asyncio.sleep((tx_pkt.Tpkt) / 1000)
             await self.driver.reset_irq_flags()
         return tx_pkt
 
     def time_on_air(self, packet_len: int) -> float:
-        sf: int = self.spread_factor
-        cr: int = self.coding_rate - 4
-        if self.header_mode == SX127x_HeaderMode.IMPLICIT:
-            payload_size = self.payload_length
-        else:
-            payload_size: int = packet_len
-        t_sym: float = 2 ** sf / self.bandwidth  # ms
-        optimization_flag: bool = self.ldro#True if force_optimization else t_sym > 16
-        preamble_time: float = (self.preamble_length + 4.25) * t_sym
-        _tmp_1: int = 8 * payload_size - 4 * sf + 28
-        _tmp_2: int = 16 * self.crc_mode - 20 * self.header_mode.value
-        _devider: int = (4 * (sf - 2 * optimization_flag))
-        _ceil: int = ceil((_tmp_1 + _tmp_2) / _devider)
-        payload_symbol_nb: float = 8 + max(_ceil * (4 + cr), 0)
-        payload_time: float = payload_symbol_nb * t_sym
-        packet_time: float = payload_time + preamble_time
-        return round(packet_time, 3)
+        implicit: bool = self.header_mode == SX127x_HeaderMode.IMPLICIT
+        if implicit:
+            packet_len = self.payload_length
+        if packet_len > MAX_PAYLOAD:  # chunked parcel
+            return lora_time_on_air(packet_len, self.spread_factor,
+                                    self.bandwidth, self.coding_rate,
+                                    self.ldro, implicit, self.crc_mode,
+                                    self.preamble_length)
+        return lora_table(self.spread_factor, self.bandwidth, self.coding_rate,
+                          self.ldro, implicit, self.crc_mode,
+                          self.preamble_length)[packet_len]
 
-    def calculate_packet(self, packet: bytes) -> LoRaTxPacket:
-        packet_time: float = self.time_on_air(len(packet))
-        timestamp: datetime = datetime.now().astimezone()
-        return LoRaTxPacket(timestamp=timestamp.isoformat(' ', 'milliseconds'),
-                            data=packet,
-                            data_len=len(packet),
-                            frequency=self.freq_hz,
-                            Tpkt=packet_time,
-                            ldro=self.ldro,
-                            sf=self.spread_factor,
-                            bw=self.bandwidth)
+    def poll_intervals(self) -> tuple[float, float]:
+        """
+        RX poll intervals, sec: a symbol after a valid header and the
+        shortest packet air time in silence (RxDone stays latched)
+        """
+        t_sym: float = 2 ** self.spread_factor / self.bandwidth / 1000
+        return t_sym, self.time_on_air(1) / 1000
 
-    def _tx_frame(self, data: bytes, caller_name: str = '') -> LoRaTxPacket:
-        frame: LoRaTxPacket = self.calculate_packet(data)
+    def calculate_packet(self, packet: bytes) -> LoRaTxRecord:
+        return LoRaTxRecord(packet, self.freq_hz, self.spread_factor,
+                            self.bandwidth, self.ldro,
+                            self.time_on_air(len(packet)))
+
+    def _tx_frame(self, data: bytes, caller_name: str = '') -> LoRaTxRecord:
+        frame: LoRaTxRecord = self.calculate_packet(data)
         frame.caller = caller_name
         return frame
 
+    @traced
     async def send_repeat(self, data: bytes | Callable[..., bytes],
                           period_sec: float,
                           untill_answer: bool = True,
@@ -205,25 +189,28 @@ class LoRa_Controller:
                           handler_args: Iterable = (),
                           expected_len: int = -1,
                           caller_name: str = '') -> LoraTransaction:
-        last_rx_packet: LoRaRxPacket | None = None
-        last_tx_packet: LoRaTxPacket | None = None
+        last_rx_packet: LoRaRxRecord | None = None
+        last_tx_packet: LoRaTxRecord | None = None
         retries = 0
 
         _ts_start: float = time.time()
         timeout: float = period_sec
         while retries < max_retries:
             bdata: bytes = data() if isinstance(data, Callable) else data
-            tx_packet: LoRaTxPacket = await self.send_single(bdata, caller_name, retries)
-            if expected_len > 0:
-                timeout = (self.time_on_air(expected_len) + self._extra_delay_ms) / 1000
-                timeout += tx_packet.Tpkt / 1000
-            else:
-                timeout = period_sec - tx_packet.Tpkt / 1000
-            last_tx_packet = tx_packet
-            self._last_rx = None
+            if self.tx_gate is not None:  # duty cycle budget of the frame
+                await self.tx_gate(self.time_on_air(len(bdata)))
+            # registered before TX, so a fast answer is not missed
+            answer_future: asyncio.Future = self.rx.subscribe()
             try:
-                rx_packet: LoRaRxPacket = await asyncio.wait_for(self._wait_rx(),
-                                                                 timeout)
+                tx_packet: LoRaTxRecord = await self.send_single(bdata, caller_name, retries)
+                if expected_len > 0:
+                    timeout = (self.time_on_air(expected_len) + self._extra_delay_ms) / 1000
+                    timeout += tx_packet.Tpkt / 1000
+                else:
+                    timeout = period_sec - tx_packet.Tpkt / 1000
+                last_tx_packet = tx_packet
+                rx_packet: LoRaRxRecord = await asyncio.wait_for(
+                    self._wait_rx(answer_future), timeout)
                 if not untill_answer:
                     last_rx_packet = rx_packet
                 elif rx_packet.crc_correct and untill_answer:
@@ -241,70 +228,46 @@ class LoRa_Controller:
                         break
             except asyncio.TimeoutError:
                 logger.debug('LoRa Rx timeout')
+            finally:
+                self.rx.unsubscribe(answer_future)
             retries += 1
         duration = int((time.time() - _ts_start) * 1000)
-        transaction = LoraTransaction(request=last_tx_packet,
-                                      answer=last_rx_packet,
+        request = last_tx_packet.to_model() if last_tx_packet else None
+        answer = last_rx_packet.to_model() if last_rx_packet else None
+        transaction = LoraTransaction(request=request,
+                                      answer=answer,
                                       duration_ms=duration,
                                       retries=retries,
                                       rx_timeout_ms=int(timeout * 1000))
         return transaction
 
-    async def _wait_rx(self) -> LoRaRxPacket:
-        while not self._last_rx:
-            await asyncio.sleep(0.001)
-        return self._last_rx
+    async def _wait_rx(self, future: asyncio.Future) -> LoRaRxRecord:
+        return await self.rx.wait(future, self.check_rx_input,
+                                  self.poll_intervals()[0])
 
-    async def check_rx_input(self) -> LoRaRxPacket | None:
-        if not await self.driver.get_rx_done_flag():
+    @traced
+    async def check_rx_input(self) -> LoRaRxRecord | None:
+        irq: int = await self.driver.get_lora_isr_register()
+        self.rx_activity = bool(irq & SX127x_LoRa_ISR.VALID_HEADER.value)
+        if not irq & SX127x_LoRa_ISR.RXDONE.value:
             return None
-        curr_addr: int = await self.driver.get_lora_fifo_ptr()
-        addr = SX127x_Registers.LORA_FIFO_ADDR_PTR.value
-        await self.driver.interface.write(addr, [curr_addr])
+        status: RegisterImage = await self.driver.read_lora_rx_status()
         if self.header_mode == SX127x_HeaderMode.IMPLICIT:
-            data: bytes = await self.driver.read_lora_fifo(self.payload_length)
+            rx_amount: int = self.payload_length
         else:
-            rx_size_addr = SX127x_Registers.LORA_RX_NB_BYTES.value
-            rx_amount: int = await self.driver.interface.read(rx_size_addr)
-            data = await self.driver.read_lora_fifo(rx_amount)
-        crc_error: bool = await self.driver.get_crc_flag()
-        await self.driver.reset_irq_flags()
-        bw: float | int = await self.driver.get_lora_bandwidth()
-        fei: int = await self.driver.get_lora_fei(bw)
-        timestamp: str = datetime.now().astimezone().isoformat(' ', 'milliseconds')
-        snr, rssi = await self.driver.get_snr_and_rssi(self.freq_hz)
-        Tpkt: float = self.time_on_air(len(data))
-        self._last_rx = LoRaRxPacket(timestamp=timestamp,
-                                     data=bytes(data),
-                                     data_len=len(data),
-                                     frequency=self.freq_hz,
-                                     snr=snr,
-                                     rssi_pkt=rssi,
-                                     crc_correct=not crc_error,
-                                     fei=fei,
-                                     caller=self._last_caller_name,
-                                     Tpkt=Tpkt,
-                                     sf=self.spread_factor,
-                                     bw=self.bandwidth,
-                                     ldro=self.ldro)
+            rx_amount = status[SX127x_Registers.LORA_RX_NB_BYTES.value]
+        curr_addr: int = status[SX127x_Registers.LORA_FIFO_RX_CURRENT_ADDR.value]
+        data: bytes = await self.driver.fetch_lora_fifo(curr_addr, rx_amount)
+        crc_error: bool = bool(irq & SX127x_LoRa_ISR.PAYLOAD_CRC_ERROR.value)
+        self._last_rx = LoRaRxRecord(
+            data, self.freq_hz, self._last_caller_name, not crc_error,
+            status[SX127x_Registers.LORA_PKT_SNR_VALUE.value],
+            status[SX127x_Registers.LORA_PKT_RSSI_VALUE.value],
+            bytes(status.several(SX127x_Registers.LORA_FEI_MSB.value, 3)),
+            self.spread_factor, self.bandwidth, self.ldro,
+            self.time_on_air(len(data)))
+        self.rx.dispatch(self._last_rx)
         return self._last_rx
 
 if __name__ == '__main__':
-
-    def time_on_air(packet_len: int) -> float:
-        sf: int = 10
-        cr: int = 1
-        payload_size: int = packet_len
-        t_sym: float = 2 ** sf / 125  # ms
-        optimization_flag: bool = True  #True if force_optimization else t_sym > 16
-        preamble_time: float = (8 + 4.25) * t_sym
-        _tmp_1: int = 8 * payload_size - 4 * sf + 28
-        _tmp_2: int = 16 * 1 - 20 * 0
-        _devider: int = (4 * (sf - 2 * optimization_flag))
-        _ceil: int = ceil((_tmp_1 + _tmp_2) / _devider)
-        payload_symbol_nb: float = 8 + max(_ceil * (4 + cr), 0)
-        payload_time: float = payload_symbol_nb * t_sym
-        packet_time: float = payload_time + preamble_time
-        return round(packet_time, 3)
-
-    print(time_on_air(143))
\ No newline at end of file
+    print(lora_time_on_air(143, sf=10, bw=125, cr=5, ldro=True))
@@ -0,0 +1,104 @@
+from __future__ import annotations
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import IO, Generic, Iterator, TypeVar, overload
+
+from loguru import logger
+
+from async_sx127x.packets import PacketRecord
+
+
+DEFAULT_BUFFER_SIZE = 10_000  # packets
+T = TypeVar('T', bound=PacketRecord)
+
+
+class PacketBuffer(Generic[T]):
+    """
+    Ring buffer of the packet history. It keeps at most `maxlen` packets
+    and `max_bytes` of payload (None - no limit), the oldest packets are
+    evicted on append. Evicted packets are appended to `spill_path` as JSON
+    lines when it is given. Supports len(), iteration, indexing and slicing
+    like the list it replaces.
+    """
+    def __init__(self, maxlen: int | None = DEFAULT_BUFFER_SIZE,
+                 max_bytes: int | None = None,
+                 spill_path: str | Path | None = None) -> None:
+        if maxlen is not None and maxlen < 1:
+            raise ValueError(f'Wrong buffer size: {maxlen}')
+        self.maxlen: int | None = maxlen
+        self.max_bytes: int | None = max_bytes
+        self.spill_path: Path | None = Path(spill_path) if spill_path else None
+        self.total_bytes: int = 0
+        self.evicted: int = 0
+        self._packets: deque[T] = deque()
+        self._spill_file: IO[str] | None = None
+
+    def append(self, packet: T) -> None:
+        self._packets.append(packet)
+        self.total_bytes += len(packet.data)
+        while len(self._packets) > 1 and (
+                (self.maxlen is not None and len(self._packets) > self.maxlen)
+                or (self.max_bytes is not None
+                    and self.total_bytes > self.max_bytes)):
+            self._evict()
+
+    def _evict(self) -> None:
+        packet: T = self._packets.popleft()
+        self.total_bytes -= len(packet.data)
+        self.evicted += 1
+        if self.spill_path is None:
+            return
+        try:
+            if self._spill_file is None:
+                self._spill_file = self.spill_path.open('a', encoding='utf-8')
+            self._spill_file.write(packet.model_dump_json() + '\n')
+        except OSError as err:
+            logger.error(f'Packet buffer spill to {self.spill_path} failed: '
+                         f'{err}')
+            self.spill_path = None
+
+    def clear(self) -> None:
+        self._packets.clear()
+        self.total_bytes = 0
+
+    def close(self) -> None:
+        """ Flushes and closes the spill file """
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def copy(self) -> list[T]:
+        return list(self._packets)
+
+    def __len__(self) -> int:
+        return len(self._packets)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._packets)
+
+    def __reversed__(self) -> Iterator[T]:
+        return reversed(self._packets)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, int):
+            return self._packets[index]
+        size: int = len(self._packets)
+        start, stop, step = index.indices(size)
+        if step == 1 and start > size // 2:  # tail is walked from the end
+            tail = list(islice(reversed(self._packets), size - stop,
+                               size - start))
+            tail.reverse()
+            return tail
+        if step > 0:
+            return list(islice(self._packets, start, stop, step))
+        return list(self._packets)[index]
+
+    def __repr__(self) -> str:
+        return f'PacketBuffer({len(self)} packets, {self.total_bytes} bytes)'
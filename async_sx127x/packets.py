@@ -0,0 +1,150 @@
+from __future__ import annotations
+import time
+from datetime import datetime
+
+from async_sx127x.models import (FSK_RX_Packet, FSK_TX_Packet, LoRaRxPacket,
+                                 LoRaTxPacket, RadioPacket)
+from async_sx127x.register_image import (decode_lora_fei, decode_lora_rssi,
+                                         decode_lora_snr)
+
+
+class PacketRecord:
+    """
+    Lightweight packet of the RX/TX hot path. It keeps raw values (epoch and
+    monotonic nanoseconds, packet registers) and exposes the attributes of
+    the matching pydantic model, which is built by `to_model()` on demand.
+    """
+    __slots__ = ('time_ns', 'mono_ns', 'data', 'frequency', 'caller')
+    mode: str = ''
+    _local_timezone: bool = True
+
+    def __init__(self, data: bytes, frequency: int, caller: str = '') -> None:
+        self.time_ns: int = time.time_ns()
+        self.mono_ns: int = time.monotonic_ns()
+        self.data: bytes = data
+        self.frequency: int = frequency
+        self.caller: str = caller
+
+    @property
+    def data_len(self) -> int:
+        return len(self.data)
+
+    @property
+    def timestamp(self) -> str:
+        moment = datetime.fromtimestamp(self.time_ns / 1e9)
+        if self._local_timezone:
+            moment = moment.astimezone()
+        return moment.isoformat(' ', 'milliseconds')
+
+    def _fields(self) -> dict:
+        return {'timestamp': self.timestamp, 'data': self.data,
+                'data_len': len(self.data), 'frequency': self.frequency,
+                'caller': self.caller}
+
+    def to_model(self) -> RadioPacket:
+        raise NotImplementedError
+
+    def model_dump(self, **kwargs) -> dict:
+        return self.to_model().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        return self.to_model().model_dump_json(**kwargs)
+
+    def __str__(self) -> str:
+        return str(self.to_model())
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class LoRaRxRecord(PacketRecord):
+    __slots__ = ('crc_correct', 'pkt_snr', 'pkt_rssi', 'fei_regs', 'sf', 'bw',
+                 'ldro', 'Tpkt')
+    mode = 'LoRa'
+
+    def __init__(self, data: bytes, frequency: int, caller: str,
+                 crc_correct: bool, pkt_snr: int, pkt_rssi: int,
+                 fei_regs: bytes, sf: int, bw: float, ldro: bool,
+                 Tpkt: float) -> None:
+        super().__init__(data, frequency, caller)
+        self.crc_correct: bool = crc_correct
+        self.pkt_snr: int = pkt_snr  # RegPktSnrValue
+        self.pkt_rssi: int = pkt_rssi  # RegPktRssiValue
+        self.fei_regs: bytes = fei_regs  # RegFeiMsb..RegFeiLsb
+        self.sf: int = sf
+        self.bw: float = bw
+        self.ldro: bool = ldro
+        self.Tpkt: float = Tpkt
+
+    @property
+    def snr(self) -> int:
+        return decode_lora_snr(self.pkt_snr)
+
+    @property
+    def rssi_pkt(self) -> int:
+        return decode_lora_rssi(self.pkt_rssi, self.frequency)
+
+    @property
+    def fei(self) -> int:
+        return decode_lora_fei(self.fei_regs, self.bw)
+
+    def to_model(self) -> LoRaRxPacket:
+        return LoRaRxPacket(**self._fields(), snr=self.snr,
+                            rssi_pkt=self.rssi_pkt,
+                            crc_correct=self.crc_correct, fei=self.fei,
+                            sf=self.sf, bw=self.bw, ldro=self.ldro,
+                            Tpkt=self.Tpkt)
+
+
+class LoRaTxRecord(PacketRecord):
+    __slots__ = ('sf', 'bw', 'ldro', 'Tpkt', 'attempt')
+    mode = 'LoRa'
+
+    def __init__(self, data: bytes, frequency: int, sf: int, bw: float,
+                 ldro: bool, Tpkt: float, caller: str = '',
+                 attempt: int = 0) -> None:
+        super().__init__(data, frequency, caller)
+        self.sf: int = sf
+        self.bw: float = bw
+        self.ldro: bool = ldro
+        self.Tpkt: float = Tpkt
+        self.attempt: int = attempt
+
+    def to_model(self) -> LoRaTxPacket:
+        return LoRaTxPacket(**self._fields(), sf=self.sf, bw=self.bw,
+                            ldro=self.ldro, Tpkt=self.Tpkt,
+                            attempt=self.attempt)
+
+
+class FSK_RX_Record(PacketRecord):
+    __slots__ = ('rssi_pkt', 'crc_correct')
+    mode = 'FSK'
+    _local_timezone = False
+
+    def __init__(self, data: bytes, frequency: int, caller: str,
+                 rssi_pkt: int, crc_correct: bool) -> None:
+        super().__init__(data, frequency, caller)
+        self.rssi_pkt: int = rssi_pkt
+        self.crc_correct: bool = crc_correct
+
+    def to_model(self) -> FSK_RX_Packet:
+        return FSK_RX_Packet(**self._fields(), rssi_pkt=self.rssi_pkt,
+                             crc_correct=self.crc_correct)
+
+
+class FSK_TX_Record(PacketRecord):
+    __slots__ = ('attempt',)
+    mode = 'FSK'
+    _local_timezone = False
+
+    def __init__(self, data: bytes, frequency: int, caller: str = '',
+                 attempt: int = 0) -> None:
+        super().__init__(data, frequency, caller)
+        self.attempt: int = attempt
+
+    def to_model(self) -> FSK_TX_Packet:
+        return FSK_TX_Packet(**self._fields(), attempt=self.attempt)
+
+
+RX_RECORD = LoRaRxRecord | FSK_RX_Record
+TX_RECORD = LoRaTxRecord | FSK_TX_Record
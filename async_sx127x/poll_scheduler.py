@@ -0,0 +1,69 @@
+from __future__ import annotations
+import time
+from typing import Any
+
+
+MIN_POLL_INTERVAL = 0.0005  # seconds, below it sleeping costs more than polling
+
+
+class PollStats:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.polls: int = 0
+        self.idle_polls: int = 0
+        self.activity_polls: int = 0
+        self.packets: int = 0
+        self.sleep_s: float = 0.0
+        self.started: float = time.monotonic()
+
+    def snapshot(self, interval: float) -> dict[str, Any]:
+        elapsed: float = time.monotonic() - self.started
+        return {'polls': self.polls,
+                'idle_polls': self.idle_polls,
+                'activity_polls': self.activity_polls,
+                'packets': self.packets,
+                'poll_rate_hz': round(self.polls / elapsed, 1) if elapsed else 0.0,
+                'mean_interval_ms': round(self.sleep_s / self.polls * 1000, 3)
+                                    if self.polls else 0.0,
+                'interval_ms': round(interval * 1000, 3)}
+
+
+class PollScheduler:
+    """
+    Interval between RX polls. It starts at `fast`, grows `backoff` times
+    per idle poll up to `slow`, and drops back to `fast` when the modem
+    reports activity (valid header, preamble) or a packet is received.
+    Controllers derive both bounds from modem timing, see `poll_intervals`.
+    """
+    def __init__(self, fast: float, slow: float, backoff: float = 1.5) -> None:
+        self.backoff: float = backoff
+        self.stats: PollStats = PollStats()
+        self.configure(fast, slow)
+        self.interval: float = self.fast
+
+    def configure(self, fast: float, slow: float) -> None:
+        self.fast: float = max(fast, MIN_POLL_INTERVAL)
+        self.slow: float = max(slow, self.fast)
+
+    def next_interval(self, packet: bool, activity: bool) -> float:
+        """ Accounts the last poll result and returns seconds to sleep """
+        self.stats.polls += 1
+        if packet:
+            self.stats.packets += 1
+            self.interval = self.fast
+        elif activity:
+            self.stats.activity_polls += 1
+            self.interval = self.fast
+        else:
+            self.stats.idle_polls += 1
+            self.interval = min(self.interval * self.backoff, self.slow)
+        self.interval = max(self.interval, self.fast)
+        self.stats.sleep_s += self.interval
+        return self.interval
+
+    def snapshot(self) -> dict[str, Any]:
+        return {'fast_ms': round(self.fast * 1000, 3),
+                'slow_ms': round(self.slow * 1000, 3),
+                **self.stats.snapshot(self.interval)}
@@ -1,4 +1,5 @@
 import asyncio
+from pathlib import Path
 from random import randint, sample
 from typing import Awaitable, Callable, Coroutine, Iterable, Literal
 
@@ -7,21 +8,28 @@ from event import Event
 from async_sx127x.driver import SX127x_Driver
 from async_sx127x.fsk_controller import FSK_Controller
 from async_sx127x.lora_controller import LoRa_Controller
-from async_sx127x.models import (FSK_RX_Packet, FSK_TX_Packet, LoRaRxPacket,
-                                 LoRaTxPacket, RadioModel, RadioTransaction)
+from async_sx127x.capture import CaptureWriter
+from async_sx127x.models import RadioModel, RadioTransaction
+from async_sx127x.packet_buffer import DEFAULT_BUFFER_SIZE, PacketBuffer
+from async_sx127x.packets import RX_RECORD, TX_RECORD, LoRaTxRecord
+from async_sx127x.poll_scheduler import PollScheduler
+from async_sx127x.tracing import traced
+from async_sx127x.tx_scheduler import TxScheduler
 
 
 async def ainput(prompt: str = "") -> str:
     return await asyncio.to_thread(input, prompt)
 
 
-ANSWER_CALLBACK = Callable[[LoRaRxPacket | FSK_RX_Packet, Iterable],
+IRQ_WAIT_TIMEOUT = 0.5  # seconds, RX check period if a notification is lost
+ANSWER_CALLBACK = Callable[[RX_RECORD, Iterable],
                            Awaitable[bool] | bool]
 
 
 class RadioController:
     def __init__(self, mode: Literal['lora', 'fsk'] = 'lora', **kwargs) -> None:
         self.label: str = kwargs.get('label', '')
+        self.notifications: bool = kwargs.get('notifications', False)
         self.driver = SX127x_Driver(**kwargs)
         self.lora = LoRa_Controller(self.driver, **kwargs)
         self.fsk = FSK_Controller(self.driver, **kwargs)
@@ -29,14 +37,32 @@ class RadioController:
             self.current_mode: LoRa_Controller | FSK_Controller = self.lora
         else:
             self.current_mode = self.fsk
+        self.poll: PollScheduler = PollScheduler(
+            *self.current_mode.poll_intervals(),
+            backoff=kwargs.get('poll_backoff', 1.5))
         self.lora._transmited.subscribe(self._on_transmited)
         self.fsk._transmited.subscribe(self._on_transmited)
-        self.received: Event = Event(LoRaRxPacket | FSK_RX_Packet)
-        self.transmited: Event = Event(LoRaTxPacket | FSK_TX_Packet)
+        self.received: Event = Event(RX_RECORD)
+        self.transmited: Event = Event(TX_RECORD)
         self.tx_started: Event = Event()
         self.tx_finished: Event = Event()
-        self._tx_buffer: list[LoRaTxPacket | FSK_TX_Packet] = []
-        self._rx_buffer: list[LoRaRxPacket | FSK_RX_Packet] = []
+        buffer_size: int | None = kwargs.get('buffer_size', DEFAULT_BUFFER_SIZE)
+        buffer_bytes: int | None = kwargs.get('buffer_bytes', None)
+        spill_dir: str | None = kwargs.get('buffer_spill_dir', None)
+        prefix: str = f'{self.label}_' if self.label else ''
+        self._tx_buffer: PacketBuffer[TX_RECORD] = PacketBuffer(
+            buffer_size, buffer_bytes,
+            Path(spill_dir, f'{prefix}tx.jsonl') if spill_dir else None)
+        self._rx_buffer: PacketBuffer[RX_RECORD] = PacketBuffer(
+            buffer_size, buffer_bytes,
+            Path(spill_dir, f'{prefix}rx.jsonl') if spill_dir else None)
+        capture_path: str | None = kwargs.get('capture_path', None)
+        self.capture: CaptureWriter | None = \
+            CaptureWriter(capture_path) if capture_path else None
+        self.tx_queue: TxScheduler = TxScheduler(kwargs.get('duty_cycle', None),
+                                                 kwargs.get('duty_cycle_window',
+                                                            3600.0))
+        self.lora.tx_gate = self.fsk.tx_gate = self.tx_queue.wait_budget
         self.tx_task: asyncio.Task | None = None
         self._rx_running: bool = False
         self._wait_for_finish: bool = False
@@ -44,33 +70,57 @@ class RadioController:
     def connection_status(self) -> bool:
         return self.driver.interface.connection_status
 
+    @traced
     async def connect(self, port_or_ip: str) -> bool:
         if await self.driver.connect(port_or_ip):
             await asyncio.sleep(0.1)
             logger.success(f'Radio {self.label} connected.\n'
                            f'Start initialization...')
+            if self.notifications:
+                await self.driver.interface.enable_notifications()
+            self.driver.interface.on_reconnect.append(self._restore)
             await self.current_mode.init()
+            if self.capture:
+                await self.capture.start()
             logger.success(f'Radio {self.label} inited.')
             return True
         logger.warning(f'Radio {self.label} is not connected!')
         return False
 
+    async def _restore(self) -> None:
+        """ Uploads the last known configuration after link reconnect """
+        logger.warning(f'Radio {self.label} reconnected, restoring config')
+        self.driver.invalidate_shadow()
+        if self.notifications:
+            await self.driver.interface.enable_notifications()
+        await self.current_mode.init()
+
+    @traced
     async def disconnect(self) -> bool:
         await self.driver.reset()
+        await self.tx_queue.stop()
+        self._rx_buffer.close()
+        self._tx_buffer.close()
+        if self.capture:
+            await self.capture.stop()
         return await self.driver.disconnect()
 
-    async def _on_transmited(self, pkt: LoRaTxPacket | FSK_TX_Packet):
+    async def _on_transmited(self, pkt: TX_RECORD):
         self._tx_buffer.append(pkt)
+        self.tx_queue.account(pkt.Tpkt if isinstance(pkt, LoRaTxRecord)
+                              else self.fsk.time_on_air(len(pkt.data)))
+        if self.capture:
+            self.capture.write(pkt)
         self.transmited.emit(pkt)
 
     def clear_buffers(self) -> None:
         self._rx_buffer.clear()
         self._tx_buffer.clear()
 
-    def get_tx_buffer(self) -> list[LoRaTxPacket | FSK_TX_Packet]:
+    def get_tx_buffer(self) -> PacketBuffer[TX_RECORD]:
         return self._tx_buffer
 
-    def get_rx_buffer(self) -> list[LoRaRxPacket | FSK_RX_Packet]:
+    def get_rx_buffer(self) -> PacketBuffer[RX_RECORD]:
         return self._rx_buffer
 
     def set_extra_delay(self, delay_ms: int) -> None:
@@ -79,12 +129,14 @@ class RadioController:
     def get_extra_delay(self) -> int:
         return self.current_mode._extra_delay_ms
 
+    @traced
     async def read_config(self) -> RadioModel:
         return await self.current_mode.read_config()
 
     async def to_model(self) -> RadioModel:
         return await self.current_mode.to_model()
 
+    @traced
     async def init_lora(self, sf: int | None = None,
                         bw: int | float | None = None,
                         freq: int | None = None,
@@ -116,10 +168,12 @@ class RadioController:
         await self.lora.init()
         self.current_mode = self.lora
 
+    @traced
     async def init_fsk(self, ax25_mode: bool = False) -> None:
         await self.fsk.init(ax25_mode)
         self.current_mode = self.fsk
 
+    @traced
     async def send_repeat(self, data: bytes | Callable,
                           period_sec: float,
                           untill_answer: bool = True,
@@ -127,10 +181,28 @@ class RadioController:
                           answer_handler: ANSWER_CALLBACK | None = None,
                           handler_args: Iterable = (),
                           expected_len: int = -1,
-                          caller_name: str = '') -> RadioTransaction:
-        if self.tx_task and not self.tx_task.done():
-            raise RuntimeError("TX task still active")
-
+                          caller_name: str = '',
+                          priority: int = 0,
+                          deadline: float | None = None) -> RadioTransaction:
+        """
+        Queued in `tx_queue` after transmissions of higher priority (lower
+        value) and of other callers. `deadline` is a time.monotonic() value
+        """
+        return await self.tx_queue.submit(
+            lambda: self._send_repeat(data, period_sec, untill_answer,
+                                      max_retries, answer_handler,
+                                      handler_args, expected_len,
+                                      caller_name),
+            priority, caller_name, self._airtime_estimate(data), deadline)
+
+    async def _send_repeat(self, data: bytes | Callable,
+                           period_sec: float,
+                           untill_answer: bool,
+                           max_retries: int,
+                           answer_handler: ANSWER_CALLBACK | None,
+                           handler_args: Iterable,
+                           expected_len: int,
+                           caller_name: str) -> RadioTransaction:
         coro: Coroutine = self.current_mode.send_repeat(data, period_sec,
                                                         untill_answer,
                                                         max_retries,
@@ -139,10 +211,13 @@ class RadioController:
                                                         expected_len,
                                                         caller_name)
         task_name = f'_({caller_name})' if caller_name else ''
-        self.tx_task = asyncio.create_task(coro, name=f'radio_tx_task{task_name}')
+        # runs in the job task, so the answer handler may send through the
+        # queue (see TxScheduler.submit) and cancel_tx stops the job
+        self.tx_task = asyncio.current_task()
+        self.tx_task.set_name(f'radio_tx_task{task_name}')  # type: ignore
         try:
             self.tx_started.emit()
-            result = await self.tx_task
+            result = await coro
             self.tx_task = None
             self.tx_finished.emit()
         except asyncio.CancelledError as err:
@@ -157,18 +232,47 @@ class RadioController:
             raise err
         return result
 
+    def _airtime_estimate(self, data: bytes | Callable) -> float:
+        """
+        Air time of the first frame for the queue budget check, frames of
+        send_repeat wait for the budget each (controllers' tx_gate)
+        """
+        if isinstance(data, (bytes, bytearray)):
+            return self.current_mode.time_on_air(len(data))
+        return 0.0
+
     async def cancel_tx(self) -> bool:
         if self.tx_task:
             return self.tx_task.cancel()
         return False
 
+    @traced
     async def send_single(self, data: bytes, caller_name: str = '',
-                          attempt: int = 0) -> LoRaTxPacket | FSK_TX_Packet:
-        return await self.current_mode.send_single(data, caller_name, attempt)
-
-    async def check_rx_input(self) -> LoRaRxPacket | FSK_RX_Packet | None:
+                          attempt: int = 0, priority: int = 0,
+                          deadline: float | None = None) -> TX_RECORD:
+        return await self.tx_queue.submit(
+            lambda: self.current_mode.send_single(data, caller_name, attempt),
+            priority, caller_name, self._airtime_estimate(data), deadline)
+
+    @traced
+    async def check_rx_input(self) -> RX_RECORD | None:
         return await self.current_mode.check_rx_input()
 
+    async def wait_packet(self, timeout: float,
+                          predicate: Callable[[RX_RECORD], bool] | None = None
+                          ) -> RX_RECORD | None:
+        """ Next received packet matching `predicate`, None on timeout """
+        mode: LoRa_Controller | FSK_Controller = self.current_mode
+        future = mode.rx.subscribe(predicate)
+        try:
+            return await asyncio.wait_for(
+                mode.rx.wait(future, mode.check_rx_input,
+                             mode.poll_intervals()[0]), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            mode.rx.unsubscribe(future)
+
     async def finish_rx_routine(self) -> bool:
         if not self._rx_running:
             return True
@@ -188,30 +292,59 @@ class RadioController:
             await asyncio.sleep(0.05)
 
     async def rx_routine(self) -> None:
-        pkt: LoRaRxPacket | FSK_RX_Packet | None = None
+        pkt: RX_RECORD | None = None
         self._rx_running = True
+        self.poll.stats.reset()
+        self.lora.rx.polled = self.fsk.rx.polled = True
         try:
             while self._rx_running:
-                pkt = await self.current_mode.check_rx_input()
+                try:
+                    pkt = await self.current_mode.check_rx_input()
+                except ConnectionResetError as err:
+                    if not self.connection_status():
+                        raise
+                    logger.warning(f'Radio {self.label} link reset: {err}')
+                    await asyncio.sleep(IRQ_WAIT_TIMEOUT)
+                    continue
                 if pkt:
                     self.current_mode._last_caller_name = ''
                     # logger.debug(pkt)
                     self._rx_buffer.append(pkt)
+                    if self.capture:
+                        self.capture.write(pkt)
                     self.received.emit(pkt)
+                # settings may be changed by init_lora/init_fsk meanwhile
+                self.poll.configure(*self.current_mode.poll_intervals())
+                interval: float = self.poll.next_interval(
+                    pkt is not None, self.current_mode.rx_activity)
+                if self.driver.interface.notifications:
+                    if not pkt:
+                        await self.driver.interface.wait_irq(IRQ_WAIT_TIMEOUT)
+                else:
+                    await asyncio.sleep(interval)
         except (RuntimeError, ConnectionResetError) as err:
             logger.error(f'Radio RX task error: {err}')
         except asyncio.CancelledError:
             logger.debug('Radio RX task cancelled')
         else:
             logger.debug('Radio RX task finished')
-        self._rx_running = False
-        self._wait_for_finish = False
+        finally:
+            # waiters poll the radio themselves again whatever stopped us
+            self._rx_running = False
+            self.lora.rx.polled = self.fsk.rx.polled = False
+            self._wait_for_finish = False
+
+    def poll_stats(self) -> dict:
+        """ RX polling rate and intervals of the last rx_routine run """
+        return self.poll.snapshot()
 
+    @traced
     async def set_frequency(self, new_freq_hz: int) -> None:
         await self.current_mode.driver.set_frequency(new_freq_hz)
         self.lora.freq_hz = new_freq_hz
         self.fsk.freq_hz = new_freq_hz
 
+    @traced
     async def add_freq(self, freq_hz: int) -> int:
         new_freq: int = await self.current_mode.driver.add_freq(freq_hz)
         self.lora.freq_hz = new_freq
@@ -262,7 +395,7 @@ class RadioController:
                 await self.send_single(bytes.fromhex('1F010668656C700A0D1C7E'))
 
 
-def on_received(data: LoRaRxPacket | FSK_RX_Packet):
+def on_received(data: RX_RECORD):
     try:
         print(data.data[5:].decode(), end = '', sep='')
     except:
@@ -275,7 +408,7 @@ def on_received(data: LoRaRxPacket | FSK_RX_Packet):
                 ...
         print(buff)
 
-async def on_transmited(data: LoRaTxPacket | FSK_TX_Packet):
+async def on_transmited(data: TX_RECORD):
     print(data)
 
 
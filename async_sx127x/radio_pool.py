@@ -0,0 +1,69 @@
+import asyncio
+from typing import Iterator
+
+from loguru import logger
+from event import Event
+from async_sx127x.packets import RX_RECORD, TX_RECORD
+from async_sx127x.radio_controller import RadioController
+
+
+class RadioPool:
+    """
+    Several transceivers served concurrently. Every radio has its own
+    interface lock, so radios on different ports do not block each other.
+    Events of all radios are aggregated with the source radio as first
+    argument.
+    """
+    def __init__(self) -> None:
+        self.radios: dict[str, RadioController] = {}
+        self.received: Event = Event(RadioController, RX_RECORD)
+        self.transmited: Event = Event(RadioController, TX_RECORD)
+        self._rx_tasks: dict[str, asyncio.Task] = {}
+
+    def __iter__(self) -> Iterator[RadioController]:
+        return iter(self.radios.values())
+
+    def __len__(self) -> int:
+        return len(self.radios)
+
+    def __getitem__(self, port_or_ip: str) -> RadioController:
+        return self.radios[port_or_ip]
+
+    def add(self, port_or_ip: str, radio: RadioController) -> RadioController:
+        if port_or_ip in self.radios:
+            raise ValueError(f'Radio on {port_or_ip} already added')
+        self.radios[port_or_ip] = radio
+        radio.received.subscribe(lambda pkt: self.received.emit(radio, pkt))
+        radio.transmited.subscribe(lambda pkt: self.transmited.emit(radio, pkt))
+        return radio
+
+    async def connect(self) -> dict[str, bool]:
+        """ Connects and inits all radios concurrently """
+        ports: list[str] = list(self.radios)
+        results = await asyncio.gather(*(self.radios[port].connect(port)
+                                         for port in ports),
+                                       return_exceptions=True)
+        status: dict[str, bool] = {}
+        for port, result in zip(ports, results):
+            if isinstance(result, BaseException):
+                logger.error(f'Radio on {port} connection error: {result}')
+                result = False
+            status[port] = result
+        return status
+
+    def start_rx(self) -> None:
+        for port, radio in self.radios.items():
+            task: asyncio.Task | None = self._rx_tasks.get(port)
+            if radio.connection_status() and (not task or task.done()):
+                self._rx_tasks[port] = asyncio.create_task(radio.rx_routine(),
+                                                           name=f'radio_rx_{port}')
+
+    async def stop_rx(self) -> None:
+        await asyncio.gather(*(radio.finish_rx_routine() for radio in self))
+        self._rx_tasks.clear()
+
+    async def disconnect(self) -> None:
+        await self.stop_rx()
+        await asyncio.gather(*(radio.disconnect() for radio in self
+                               if radio.connection_status()),
+                             return_exceptions=True)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+from ast import literal_eval
+
+from async_sx127x.models import FSK_Model, LoRaModel, RadioModel
+from async_sx127x.registers import (SX127x_BW, SX127x_CR, SX127x_DcFree,
+                                    SX127x_Field, SX127x_HeaderMode,
+                                    SX127x_Modulation, SX127x_Registers)
+
+
+FXOSC = 32_000_000
+F_STEP: float = FXOSC / 524288
+
+
+def twos_comp(val, bits: int):
+    """compute the 2's complement of int value val"""
+    if (val & (1 << (bits - 1))) != 0: # if sign bit is set e.g., 8bit: 128-255
+        val = val - (1 << bits)        # compute negative value
+    return val                         # return positive value as is
+
+
+class RegisterImage:
+    """ Snapshot of consecutive registers starting from `start` address """
+    def __init__(self, data: list[int], start: int = 0x01) -> None:
+        self.data: list[int] = data
+        self.start: int = start
+
+    def __getitem__(self, register: SX127x_Registers | int) -> int:
+        address: int = register if isinstance(register, int) else register.value
+        return self.data[address - self.start]
+
+    def several(self, register: SX127x_Registers | int,
+                amount: int) -> list[int]:
+        address: int = register if isinstance(register, int) else register.value
+        return self.data[address - self.start:address - self.start + amount]
+
+    def update(self, address: int, data: list[int]) -> None:
+        for addr, val in enumerate(data, start=address):
+            if self.start <= addr < self.start + len(self.data):
+                self.data[addr - self.start] = val
+
+    def copy(self) -> RegisterImage:
+        return RegisterImage(self.data.copy(), self.start)
+
+    def addresses(self) -> range:
+        return range(self.start, self.start + len(self.data))
+
+
+def contiguous_bursts(values: dict[int, int]) -> list[tuple[int, list[int]]]:
+    """ Group registers values into bursts of consecutive addresses """
+    bursts: list[tuple[int, list[int]]] = []
+    for addr in sorted(values):
+        if bursts and bursts[-1][0] + len(bursts[-1][1]) == addr:
+            bursts[-1][1].append(values[addr])
+        else:
+            bursts.append((addr, [values[addr]]))
+    return bursts
+
+
+def diff_bursts(base: RegisterImage, target: RegisterImage,
+                skip: frozenset[int] = frozenset(),
+                max_gap: int = 3) -> list[tuple[int, list[int]]]:
+    """
+    Contiguous burst writes which turn `base` into `target`. Unchanged
+    registers between two changed ones are rewritten with their value when
+    it is cheaper than the header of one more frame and none of them is
+    listed in `skip`.
+    """
+    bursts: list[tuple[int, list[int]]] = []
+    for addr in target.addresses():
+        if addr in skip or base[addr] == target[addr]:
+            continue
+        if bursts:
+            start, data = bursts[-1]
+            gap = range(start + len(data), addr)
+            if len(gap) <= max_gap and not any(a in skip for a in gap):
+                data.extend(target[a] for a in range(gap.start, addr + 1))
+                continue
+        bursts.append((addr, [target[addr]]))
+    return bursts
+
+
+def decode_modulation(op_mode: int) -> SX127x_Modulation:
+    return SX127x_Field.MODULATION.decode([op_mode])
+
+
+def decode_frequency(freq: list[int]) -> int:
+    return int(SX127x_Field.FRF.decode(freq) * FXOSC / 524288)
+
+
+def decode_tx_power_dbm(pa_config: int, pa_dac: int) -> float:
+    max_output: float = 10.8 + 0.6 * ((pa_config >> 4) & 0x07)
+    pa_select: int = pa_config >> 7
+    output_power: int = pa_config & 0x0F
+    if pa_select:
+        output_power_dbm: float = 17 - (15 - output_power)
+    else:
+        output_power_dbm: float = max_output - (15 - output_power)
+    if pa_dac == 0x87:
+        if output_power == 15:
+            output_power_dbm = 20
+    return output_power_dbm
+
+
+def decode_lna_gain(lna: int) -> int:
+    return SX127x_Field.LNA_GAIN.decode([lna])
+
+
+def decode_lna_boost(lna: int) -> bool:
+    return bool(SX127x_Field.LNA_BOOST.decode([lna]))
+
+
+def decode_lora_bandwidth(modem_config_1: int) -> int | float:
+    bw: SX127x_BW = SX127x_Field.LORA_BANDWIDTH.decode([modem_config_1])
+    val: str = bw.name.replace('_', '.')
+    return literal_eval(val.replace('BW', ''))
+
+
+def decode_lora_coding_rate(modem_config_1: int) -> int:
+    cr: SX127x_CR = SX127x_Field.LORA_CODING_RATE.decode([modem_config_1])
+    return literal_eval(cr.name.replace('CR', ''))
+
+
+def decode_lora_header_mode(modem_config_1: int) -> SX127x_HeaderMode:
+    return SX127x_Field.LORA_HEADER_MODE.decode([modem_config_1])
+
+
+def decode_lora_sf(modem_config_2: int) -> int:
+    return SX127x_Field.LORA_SF.decode([modem_config_2])
+
+
+def decode_lora_crc_mode(modem_config_2: int) -> bool:
+    return SX127x_Field.LORA_CRC.decode([modem_config_2])
+
+
+def decode_lora_auto_gain_control(modem_config_3: int) -> bool:
+    return SX127x_Field.LORA_AGC.decode([modem_config_3])
+
+
+def decode_low_data_rate_optimize(modem_config_3: int) -> bool:
+    return SX127x_Field.LORA_LDRO.decode([modem_config_3])
+
+
+def decode_lora_fei(fei: list[int], bw_khz: float) -> int:
+    raw_val: int = twos_comp(int.from_bytes(bytes(fei), 'big'), 20)
+    return -int(raw_val * (1 << 24) / FXOSC * bw_khz / 500)
+
+
+def decode_lora_snr(pkt_snr: int) -> int:
+    return twos_comp(pkt_snr, 8) // 4
+
+
+def decode_lora_rssi(raw_val: int, freq_hz: int) -> int:
+    return raw_val - (164 if freq_hz < 800_000_000 else 157)
+
+
+def decode_fsk_bitrate(bitrate: list[int], bitrate_frac: int) -> int:
+    frac: float = bitrate_frac / 16
+    return int(FXOSC / ((bitrate[0] << 8) + bitrate[1] + frac))
+
+
+def decode_fsk_deviation(fdev: list[int]) -> int:
+    return int(SX127x_Field.FSK_DEVIATION.decode(fdev) * F_STEP)
+
+
+def decode_fsk_sync_size(sync_config: int) -> int:
+    return SX127x_Field.FSK_SYNC_SIZE.decode([sync_config]) + 1
+
+
+def decode_fsk_dc_free_mode(packet_config_1: int) -> SX127x_DcFree:
+    return SX127x_Field.FSK_DC_FREE.decode([packet_config_1])
+
+
+def decode_fsk_crc(packet_config_1: int) -> bool:
+    return SX127x_Field.FSK_CRC.decode([packet_config_1])
+
+
+def decode_fsk_packet_format(packet_config_1: int) -> bool:
+    return SX127x_Field.FSK_PACKET_FORMAT.decode([packet_config_1])
+
+
+def decode_lora_config(image: RegisterImage, pa_boost: bool) -> RadioModel:
+    config_1: int = image[SX127x_Registers.LORA_MODEM_CONFIG_1]
+    config_2: int = image[SX127x_Registers.LORA_MODEM_CONFIG_2]
+    config_3: int = image[SX127x_Registers.LORA_MODEM_CONFIG_3]
+    lna: int = image[SX127x_Registers.LNA]
+    model = LoRaModel(spreading_factor=decode_lora_sf(config_2),
+                      bandwidth=decode_lora_bandwidth(config_1),
+                      sync_word=image[SX127x_Registers.LORA_SYNC_WORD],
+                      coding_rate=decode_lora_coding_rate(config_1),
+                      autogain_control=decode_lora_auto_gain_control(config_3),
+                      lna_boost=decode_lna_boost(lna),
+                      lna_gain=decode_lna_gain(lna),
+                      header_mode=decode_lora_header_mode(config_1).name,
+                      ldro=decode_low_data_rate_optimize(config_3))
+    return RadioModel(mode=model,
+                      frequency=_decode_frequency(image),
+                      pa_select=pa_boost,
+                      check_crc=decode_lora_crc_mode(config_2),
+                      tx_power=_decode_tx_power(image))
+
+
+def decode_fsk_config(image: RegisterImage, pa_boost: bool) -> RadioModel:
+    packet_config_1: int = image[SX127x_Registers.FSK_PACKET_CONFIG1]
+    sync_config: int = image[SX127x_Registers.FSK_SYNC_CONFIG]
+    sync_word: list[int] = image.several(SX127x_Registers.FSK_SYNC_VALUE1,
+                                         decode_fsk_sync_size(sync_config))
+    bitrate: list[int] = image.several(SX127x_Registers.FSK_BITRATE_MSB, 2)
+    bitrate_frac: int = image[SX127x_Registers.BITRATE_FRAC]
+    fdev: list[int] = image.several(SX127x_Registers.FSK_FDEV_MSB, 2)
+    model = FSK_Model(bitrate=decode_fsk_bitrate(bitrate, bitrate_frac),
+                      deviation=decode_fsk_deviation(fdev),
+                      sync_word=bytes(sync_word),
+                      dc_free=decode_fsk_dc_free_mode(packet_config_1).name,
+                      packet_format=decode_fsk_packet_format(packet_config_1))
+    return RadioModel(mode=model,
+                      frequency=_decode_frequency(image),
+                      pa_select=pa_boost,
+                      check_crc=decode_fsk_crc(packet_config_1),
+                      tx_power=_decode_tx_power(image))
+
+
+def decode_config(image: RegisterImage, pa_boost: bool) -> RadioModel:
+    modulation = decode_modulation(image[SX127x_Registers.OP_MODE])
+    if modulation == SX127x_Modulation.LORA:
+        return decode_lora_config(image, pa_boost)
+    return decode_fsk_config(image, pa_boost)
+
+
+def _decode_frequency(image: RegisterImage) -> int:
+    return decode_frequency(image.several(SX127x_Registers.FREQ_MSB, 3))
+
+
+def _decode_tx_power(image: RegisterImage) -> float:
+    return decode_tx_power_dbm(image[SX127x_Registers.PA_CONFIG],
+                               image[SX127x_Registers.PA_DAC])
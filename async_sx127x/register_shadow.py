@@ -0,0 +1,117 @@
+from __future__ import annotations
+from typing import Iterable
+
+from async_sx127x.registers import SX127x_Modulation, SX127x_Registers
+
+
+REGISTERS_COUNT = 0x71
+# Registers 0x0D..0x3F are banked: LoRa and FSK/OOK modems expose different
+# registers on the same addresses, so switching modulation invalidates them.
+PAGED_REGISTERS = range(0x0D, 0x40)
+
+COMMON_VOLATILE: frozenset[int] = frozenset({
+    SX127x_Registers.FIFO.value,
+    0x3B,  # RegImageCal (FSK) - calibration status bits
+    0x3C,  # RegTemp (FSK)
+    0x3E,  # RegIrqFlags1 (FSK)
+    0x3F,  # RegIrqFlags2 (FSK)
+    0x5B,  # RegFormerTemp
+})
+
+LORA_VOLATILE: frozenset[int] = COMMON_VOLATILE | frozenset({
+    SX127x_Registers.LORA_FIFO_ADDR_PTR.value,
+    *range(0x10, 0x1D),  # rx current addr, irq flags, counters, SNR, RSSI
+    SX127x_Registers.LORA_FIFO_RX_BYTE_ADDR.value,
+    0x28, 0x29, 0x2A,  # RegFei
+    0x2C,  # RegRssiWideband
+})
+
+FSK_VOLATILE: frozenset[int] = COMMON_VOLATILE | frozenset({
+    SX127x_Registers.FSK_RX_CONFIG.value,  # RestartRx trigger bits
+    SX127x_Registers.FSK_RSSI_VALUE.value,
+    *range(0x1A, 0x1F),  # AfcFei triggers, AFC and FEI values
+    SX127x_Registers.FSK_SEQ_CONFIG1.value,  # sequencer start/stop bits
+})
+
+# Registers skipped by register image uploads: data, flags and measurements.
+# Narrower than the volatile sets, which also hold configuration registers
+# with trigger bits (RegRxConfig, RegAfcFei, RegSeqConfig1...).
+COMMON_READ_ONLY: frozenset[int] = frozenset({
+    SX127x_Registers.FIFO.value,
+    0x3C,  # RegTemp (FSK)
+    0x3E,  # RegIrqFlags1 (FSK)
+    0x3F,  # RegIrqFlags2 (FSK)
+    0x5B,  # RegFormerTemp
+})
+
+LORA_UPLOAD_SKIP: frozenset[int] = COMMON_READ_ONLY | frozenset({
+    SX127x_Registers.LORA_FIFO_ADDR_PTR.value,
+    0x10,  # RegFifoRxCurrentAddr
+    *range(0x12, 0x1D),  # irq flags, counters, modem status, SNR, RSSI
+    SX127x_Registers.LORA_FIFO_RX_BYTE_ADDR.value,
+    0x28, 0x29, 0x2A,  # RegFei
+    0x2C,  # RegRssiWideband
+})
+
+FSK_UPLOAD_SKIP: frozenset[int] = COMMON_READ_ONLY | frozenset({
+    SX127x_Registers.FSK_RSSI_VALUE.value,
+    0x1D, 0x1E,  # RegFei
+})
+
+
+class RegisterShadow:
+    """
+    Write-through copy of the SX127x register file. Volatile registers
+    (IRQ flags, RSSI, FIFO pointers, etc.) are never cached.
+    """
+    def __init__(self) -> None:
+        self._values: list[int | None] = [None] * REGISTERS_COUNT
+        self.modulation: SX127x_Modulation | None = None
+
+    def is_volatile(self, address: int) -> bool:
+        if self.modulation == SX127x_Modulation.LORA:
+            return address in LORA_VOLATILE
+        if self.modulation == SX127x_Modulation.FSK:
+            return address in FSK_VOLATILE
+        return address in LORA_VOLATILE or address in FSK_VOLATILE
+
+    def get(self, address: int) -> int | None:
+        if not 0 <= address < REGISTERS_COUNT or self.is_volatile(address):
+            return None
+        return self._values[address]
+
+    def get_several(self, address: int, amount: int) -> list[int] | None:
+        values: list[int] = []
+        for addr in range(address, address + amount):
+            val: int | None = self.get(addr)
+            if val is None:
+                return None
+            values.append(val)
+        return values
+
+    def update(self, address: int, data: Iterable[int]) -> None:
+        """ Store burst written (or read) data starting from address """
+        for addr, val in enumerate(data, start=address):
+            if addr == SX127x_Registers.OP_MODE.value:
+                self._update_modulation(val)
+            if 0 <= addr < REGISTERS_COUNT and not self.is_volatile(addr):
+                self._values[addr] = val
+
+    def load(self, address: int, data: Iterable[int]) -> None:
+        """ Replace shadow content by registers image read from chip """
+        self.invalidate()
+        self.update(address, data)
+
+    def invalidate(self, address: int | None = None) -> None:
+        if address is None:
+            self._values = [None] * REGISTERS_COUNT
+            self.modulation = None
+        elif 0 <= address < REGISTERS_COUNT:
+            self._values[address] = None
+
+    def _update_modulation(self, op_mode: int) -> None:
+        modulation = SX127x_Modulation(op_mode & 0x80)
+        if self.modulation is not None and self.modulation != modulation:
+            for addr in PAGED_REGISTERS:
+                self._values[addr] = None
+        self.modulation = modulation
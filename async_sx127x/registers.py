@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Any, NamedTuple
 
 
 class SX127x_Registers(Enum):
@@ -157,3 +158,102 @@ class SX127x_FSK_SHAPING(Enum):
     GAUSSIAN_1 = 1
     GAUSSIAN_0_5 = 2
     GAUSSIAN_0_3 = 3
+
+class FieldSpec(NamedTuple):
+    register: SX127x_Registers
+    mask: int
+    shift: int = 0
+    kind: type = int
+    size: int = 1  # amount of consecutive registers, MSB first
+
+
+class SX127x_Field(Enum):
+    """
+    Register bit-fields. Enum kinds hold raw (already shifted by `shift`)
+    register values, e.g. SX127x_BW or SX127x_CR.
+    """
+    MODULATION = FieldSpec(SX127x_Registers.OP_MODE, 0x80, 0, SX127x_Modulation)
+    LOW_FREQUENCY_MODE = FieldSpec(SX127x_Registers.OP_MODE, 0x08, 3, bool)
+    MODE = FieldSpec(SX127x_Registers.OP_MODE, 0x07, 0, SX127x_Mode)
+    FRF = FieldSpec(SX127x_Registers.FREQ_MSB, 0xFFFFFF, 0, int, 3)
+    PA_SELECT = FieldSpec(SX127x_Registers.PA_CONFIG, 0x80, 7, bool)
+    MAX_POWER = FieldSpec(SX127x_Registers.PA_CONFIG, 0x70, 4)
+    OUTPUT_POWER = FieldSpec(SX127x_Registers.PA_CONFIG, 0x0F)
+    PA_DAC = FieldSpec(SX127x_Registers.PA_DAC, 0xFF)
+    OCP = FieldSpec(SX127x_Registers.OCP, 0xFF)
+    LNA_GAIN = FieldSpec(SX127x_Registers.LNA, 0xE0, 5)
+    LNA_BOOST = FieldSpec(SX127x_Registers.LNA, 0x03)
+
+    LORA_BANDWIDTH = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_1, 0xF0, 0,
+                               SX127x_BW)
+    LORA_CODING_RATE = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_1, 0x0E, 0,
+                                 SX127x_CR)
+    LORA_HEADER_MODE = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_1, 0x01, 0,
+                                 SX127x_HeaderMode)
+    LORA_SF = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_2, 0xF0, 4)
+    LORA_CRC = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_2, 0x04, 2, bool)
+    LORA_LDRO = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_3, 0x08, 3, bool)
+    LORA_AGC = FieldSpec(SX127x_Registers.LORA_MODEM_CONFIG_3, 0x04, 2, bool)
+    LORA_PREAMBLE_LENGTH = FieldSpec(SX127x_Registers.LORA_PREAMBLE_MSB,
+                                     0xFFFF, 0, int, 2)
+    LORA_PAYLOAD_LENGTH = FieldSpec(SX127x_Registers.LORA_PAYLOAD_LENGTH, 0xFF)
+    LORA_SYNC_WORD = FieldSpec(SX127x_Registers.LORA_SYNC_WORD, 0xFF)
+    LORA_FIFO_ADDR_PTR = FieldSpec(SX127x_Registers.LORA_FIFO_ADDR_PTR, 0xFF)
+    LORA_FIFO_TX_BASE_ADDR = FieldSpec(SX127x_Registers.LORA_FIFO_TX_BASE_ADDR,
+                                       0xFF)
+    LORA_FIFO_RX_BASE_ADDR = FieldSpec(SX127x_Registers.LORA_FIFO_RX_BASE_ADDR,
+                                       0xFF)
+    LORA_IRQ_FLAGS_MASK = FieldSpec(SX127x_Registers.LORA_IRQ_FLAGS_MASK, 0xFF)
+
+    FSK_BITRATE = FieldSpec(SX127x_Registers.FSK_BITRATE_MSB, 0xFFFF, 0, int, 2)
+    FSK_BITRATE_FRAC = FieldSpec(SX127x_Registers.BITRATE_FRAC, 0x0F)
+    FSK_DEVIATION = FieldSpec(SX127x_Registers.FSK_FDEV_MSB, 0xFFFF, 0, int, 2)
+    FSK_DATA_SHAPING = FieldSpec(SX127x_Registers.PA_RAMP, 0x60, 5,
+                                 SX127x_FSK_SHAPING)
+    FSK_AUTO_AFC = FieldSpec(SX127x_Registers.FSK_RX_CONFIG, 0x10, 4, bool)
+    FSK_AFC_BW_MANTISSA = FieldSpec(SX127x_Registers.FSK_AFC_BW, 0x18, 3)
+    FSK_AFC_BW_EXPONENT = FieldSpec(SX127x_Registers.FSK_AFC_BW, 0x07)
+    FSK_AFC_CLEAR = FieldSpec(SX127x_Registers.FSK_AFC_FEI, 0x02, 1, bool)
+    FSK_AFC_AUTOCLEAR = FieldSpec(SX127x_Registers.FSK_AFC_FEI, 0x01, 0, bool)
+    FSK_PREAMBLE_LENGTH = FieldSpec(SX127x_Registers.FSK_PREAMBLE_MSB,
+                                    0xFFFF, 0, int, 2)
+    FSK_RESTART_RX_MODE = FieldSpec(SX127x_Registers.FSK_SYNC_CONFIG, 0xC0, 6,
+                                    SX127x_RestartRxMode)
+    FSK_SYNC_ON = FieldSpec(SX127x_Registers.FSK_SYNC_CONFIG, 0x10, 4, bool)
+    FSK_SYNC_SIZE = FieldSpec(SX127x_Registers.FSK_SYNC_CONFIG, 0x07)
+    FSK_PACKET_FORMAT = FieldSpec(SX127x_Registers.FSK_PACKET_CONFIG1, 0x80, 7,
+                                  bool)
+    FSK_DC_FREE = FieldSpec(SX127x_Registers.FSK_PACKET_CONFIG1, 0x60, 5,
+                            SX127x_DcFree)
+    FSK_CRC = FieldSpec(SX127x_Registers.FSK_PACKET_CONFIG1, 0x10, 4, bool)
+    FSK_CRC_AUTOCLEAR_OFF = FieldSpec(SX127x_Registers.FSK_PACKET_CONFIG1,
+                                      0x08, 3, bool)
+    FSK_PAYLOAD_LENGTH = FieldSpec(SX127x_Registers.FSK_PACKET_CONFIG2,
+                                   0x07FF, 0, int, 2)
+    FSK_TX_START_CONDITION = FieldSpec(SX127x_Registers.FSK_FIFO_THRESH, 0x80,
+                                       7, bool)
+    FSK_FIFO_THRESHOLD = FieldSpec(SX127x_Registers.FSK_FIFO_THRESH, 0x3F)
+
+    @property
+    def address(self) -> int:
+        return self.value.register.value
+
+    def encode(self, value: Any) -> list[tuple[int, int, int]]:
+        """ Returns (address, mask, bits) for every register of the field """
+        spec: FieldSpec = self.value
+        raw: int = value.value if isinstance(value, Enum) else int(value)
+        bits: int = raw << spec.shift
+        if bits & ~spec.mask or raw < 0:
+            raise ValueError(f'Value {value} does not fit into {self.name}')
+        result: list[tuple[int, int, int]] = []
+        for i in range(spec.size):
+            offset: int = 8 * (spec.size - 1 - i)
+            result.append((self.address + i, (spec.mask >> offset) & 0xFF,
+                           (bits >> offset) & 0xFF))
+        return result
+
+    def decode(self, registers: list[int]) -> Any:
+        """ Field value from `size` registers starting from field address """
+        spec: FieldSpec = self.value
+        raw: int = int.from_bytes(bytes(registers[:spec.size]), 'big')
+        return spec.kind((raw & spec.mask) >> spec.shift)
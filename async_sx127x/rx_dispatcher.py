@@ -0,0 +1,69 @@
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from loguru import logger
+
+from async_sx127x.packets import PacketRecord
+
+
+T = TypeVar('T', bound=PacketRecord)
+RX_PREDICATE = Callable[[T], bool]
+
+
+class RxDispatcher(Generic[T]):
+    """
+    Hands received packets to coroutines waiting for them. A waiter
+    registers a future (with optional match predicate) before it starts
+    waiting, `check_rx_input` resolves it with the first matching packet.
+    `polled` is set while an RX loop calls check_rx_input, waiters then
+    just await their future instead of polling the radio themselves.
+    """
+    def __init__(self) -> None:
+        self.polled: bool = False
+        self._waiters: list[tuple[asyncio.Future, RX_PREDICATE | None]] = []
+
+    def subscribe(self, predicate: RX_PREDICATE | None = None
+                  ) -> asyncio.Future:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, predicate))
+        return future
+
+    def unsubscribe(self, future: asyncio.Future) -> None:
+        self._waiters = [(waiter, predicate)
+                         for waiter, predicate in self._waiters
+                         if waiter is not future]
+        future.cancel()
+
+    def dispatch(self, packet: T) -> int:
+        """ Resolves waiters matching the packet, returns their number """
+        if not self._waiters:
+            return 0
+        resolved: int = 0
+        waiting: list[tuple[asyncio.Future, RX_PREDICATE | None]] = []
+        for future, predicate in self._waiters:
+            if future.done():
+                continue
+            try:
+                matched: bool = predicate is None or predicate(packet)
+            except Exception as err:
+                logger.error(f'RX predicate failed: {err!r}')
+                matched = False
+            if matched:
+                future.set_result(packet)
+                resolved += 1
+            else:
+                waiting.append((future, predicate))
+        self._waiters = waiting
+        return resolved
+
+    async def wait(self, future: asyncio.Future,
+                   poll: Callable[[], Awaitable], interval: float = 0.0) -> T:
+        """
+        Awaits the future. Without RX loop calls `poll` (check_rx_input)
+        every `interval` seconds itself.
+        """
+        while not future.done() and not self.polled:
+            if not await poll() and interval:
+                await asyncio.sleep(interval)
+        return await future
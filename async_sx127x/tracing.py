@@ -0,0 +1,176 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterator
+
+from async_sx127x.interfaces.base_interface import BaseInterface
+from async_sx127x.interfaces.stats import TransactionRecord
+
+
+# Round trips allowed per call of the hot paths. The first init of every
+# modulation also learns the chip reset image, the next ones cost 2-3.
+# FSK send_single polls the chip, so its cost depends on air time.
+HOT_PATH_BUDGETS: dict[str, int] = {
+    'LoRa_Controller.check_rx_input': 3,
+    'LoRa_Controller.send_single': 5,
+    'LoRa_Controller.init': 7,
+    'LoRa_Controller.read_config': 1,
+    'FSK_Controller.check_rx_input': 4,
+    'FSK_Controller.init': 8,
+    'FSK_Controller.read_config': 1,
+}
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class CallTrace:
+    """ Transactions made during one high-level call """
+    __slots__ = ('name', 'round_trips', 'bytes_out', 'bytes_in', 'started',
+                 'wall_ns')
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.round_trips: int = 0
+        self.bytes_out: int = 0
+        self.bytes_in: int = 0
+        self.started: int = time.perf_counter_ns()
+        self.wall_ns: int = 0
+
+
+class CallSummary:
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.calls: int = 0
+        self.round_trips: int = 0
+        self.max_round_trips: int = 0
+        self.bytes_out: int = 0
+        self.bytes_in: int = 0
+        self.wall_ns: int = 0
+        self.max_wall_ns: int = 0
+
+    def add(self, trace: CallTrace) -> None:
+        self.calls += 1
+        self.round_trips += trace.round_trips
+        self.max_round_trips = max(self.max_round_trips, trace.round_trips)
+        self.bytes_out += trace.bytes_out
+        self.bytes_in += trace.bytes_in
+        self.wall_ns += trace.wall_ns
+        self.max_wall_ns = max(self.max_wall_ns, trace.wall_ns)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {'calls': self.calls,
+                'round_trips': round(self.round_trips / self.calls, 2),
+                'max_round_trips': self.max_round_trips,
+                'bytes_out': round(self.bytes_out / self.calls, 1),
+                'bytes_in': round(self.bytes_in / self.calls, 1),
+                'wall_ms': round(self.wall_ns / self.calls / 1e6, 3),
+                'max_wall_ms': round(self.max_wall_ns / 1e6, 3)}
+
+
+class CallTracer:
+    """
+    Attributes interface transactions to the traced calls which are running
+    in the current task. Nested traced calls (send_repeat -> send_single)
+    are accounted on every level.
+    """
+    def __init__(self) -> None:
+        self.calls: dict[str, CallSummary] = {}
+        self._interfaces: list[BaseInterface] = []
+
+    def attach(self, interface: BaseInterface) -> None:
+        stats = interface.stats or interface.enable_stats()
+        stats.hooks.append(self._on_transaction)
+        self._interfaces.append(interface)
+
+    def detach(self) -> None:
+        for interface in self._interfaces:
+            if interface.stats and self._on_transaction in interface.stats.hooks:
+                interface.stats.hooks.remove(self._on_transaction)
+        self._interfaces.clear()
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+    def _on_transaction(self, record: TransactionRecord) -> None:
+        for trace in _active_calls.get():
+            trace.round_trips += 1
+            trace.bytes_out += record.bytes_out
+            trace.bytes_in += record.bytes_in
+
+    def add(self, trace: CallTrace) -> None:
+        summary: CallSummary | None = self.calls.get(trace.name)
+        if summary is None:
+            summary = self.calls[trace.name] = CallSummary(trace.name)
+        summary.add(trace)
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        return {name: summary.snapshot()
+                for name, summary in sorted(self.calls.items())}
+
+    def assert_budget(self, name: str, round_trips: int) -> None:
+        """ Raises BudgetExceeded if any call of `name` made more round trips """
+        summary: CallSummary | None = self.calls.get(name)
+        if summary is not None and summary.max_round_trips > round_trips:
+            raise BudgetExceeded(f'{name} made {summary.max_round_trips} round '
+                                 f'trips, budget is {round_trips}')
+
+    def assert_budgets(self, budgets: dict[str, int] = HOT_PATH_BUDGETS) -> None:
+        for name, round_trips in budgets.items():
+            self.assert_budget(name, round_trips)
+
+
+_active_calls: ContextVar[tuple[CallTrace, ...]] = ContextVar('_active_calls',
+                                                              default=())
+_tracers: list[CallTracer] = []
+
+
+def traced(func: Callable) -> Callable:
+    """ Marks coroutine function as high-level call for CallTracer """
+    name: str = func.__qualname__
+
+    @wraps(func)
+    async def _wrapper(*args, **kwargs):
+        if not _tracers:
+            return await func(*args, **kwargs)
+        trace = CallTrace(name)
+        token = _active_calls.set((*_active_calls.get(), trace))
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _active_calls.reset(token)
+            trace.wall_ns = time.perf_counter_ns() - trace.started
+            for tracer in _tracers:
+                tracer.add(trace)
+    return _wrapper
+
+
+def start(*interfaces: BaseInterface) -> CallTracer:
+    tracer = CallTracer()
+    for interface in interfaces:
+        tracer.attach(interface)
+    _tracers.append(tracer)
+    return tracer
+
+
+def stop(tracer: CallTracer) -> None:
+    tracer.detach()
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+@contextmanager
+def tracing(*interfaces: BaseInterface) -> Iterator[CallTracer]:
+    """
+        with tracing(radio.driver.interface) as tracer:
+            await radio.lora.send_single(b'ping')
+        tracer.assert_budgets()
+    """
+    tracer: CallTracer = start(*interfaces)
+    try:
+        yield tracer
+    finally:
+        stop(tracer)
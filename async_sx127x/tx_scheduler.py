@@ -0,0 +1,218 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import heapq
+import time
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+
+class TxDeadlineExceeded(TimeoutError):
+    pass
+
+
+class TxRequest:
+    """ Queued transmission: coroutine factory and its scheduling data """
+    __slots__ = ('job', 'priority', 'caller', 'airtime_ms', 'deadline', 'seq',
+                 'future', 'context', 'timer')
+
+    def __init__(self, job: Callable[[], Awaitable], priority: int,
+                 caller: str, airtime_ms: float, deadline: float | None,
+                 seq: int) -> None:
+        self.job: Callable[[], Awaitable] = job
+        self.priority: int = priority
+        self.caller: str = caller
+        self.airtime_ms: float = airtime_ms
+        self.deadline: float | None = deadline  # time.monotonic() value
+        self.seq: int = seq
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.context: contextvars.Context = contextvars.copy_context()
+        self.timer: asyncio.TimerHandle | None = None  # deadline expiry
+
+    def __lt__(self, other: TxRequest) -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class TxScheduler:
+    """
+    Serializes radio transmissions of several services. Requests run one at
+    a time in a worker task: the lowest `priority` value first, callers with
+    equal priority take turns, requests of one caller keep their order.
+    Requests not started before `deadline` fail with TxDeadlineExceeded,
+    cancelling the returned future drops a request or stops it if it is on
+    air. With `duty_cycle` (e.g. 0.01) the air time of transmissions in the
+    last `window` seconds is limited, requests wait for the budget.
+    """
+    def __init__(self, duty_cycle: float | None = None,
+                 window: float = 3600.0) -> None:
+        self.duty_cycle: float | None = duty_cycle
+        self.window: float = window
+        self._queues: dict[str, list[TxRequest]] = {}
+        self._turns: dict[str, int] = {}  # caller -> seq of its last start
+        self._airtime: deque[tuple[float, float]] = deque()  # (time, ms)
+        self._airtime_ms: float = 0.0
+        self._seq = count()
+        self._wakeup: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+        self._job: asyncio.Task | None = None  # task of the current request
+        self.current: TxRequest | None = None
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, job: Callable[[], Awaitable], priority: int = 0,
+               caller: str = '', airtime_ms: float = 0.0,
+               deadline: float | None = None) -> asyncio.Future:
+        """
+        Queues `job` (coroutine function without arguments). `deadline` is
+        a time.monotonic() value. Returns future of the job result. Jobs
+        submitted by the running job task itself (e.g. an ACK sent by its
+        answer handler) start at once, the queue would wait for their
+        caller. Tasks spawned by a job are queued as usual.
+        """
+        if self._job is not None and asyncio.current_task() is self._job:
+            return asyncio.ensure_future(job())
+        request = TxRequest(job, priority, caller, airtime_ms, deadline,
+                            next(self._seq))
+        if deadline is not None:
+            request.timer = asyncio.get_running_loop().call_later(
+                max(deadline - time.monotonic(), 0.0), self._expire, request)
+        heapq.heappush(self._queues.setdefault(caller, []), request)
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._work(), name='radio_tx_queue')
+        self._wakeup.set()  # type: ignore
+        return request.future
+
+    def account(self, airtime_ms: float) -> None:
+        """ Adds air time of a transmitted frame to the duty cycle budget """
+        self._airtime.append((time.monotonic(), airtime_ms))
+        self._airtime_ms += airtime_ms
+
+    async def wait_budget(self, airtime_ms: float) -> None:
+        """ Waits until a frame of `airtime_ms` fits the duty cycle budget """
+        delay: float = self._budget_delay(airtime_ms)
+        if delay:
+            logger.debug(f'TX duty cycle: frame waits {delay:.1f} s')
+            await asyncio.sleep(delay)
+
+    def airtime_used(self) -> float:
+        """ Air time in the current window, ms """
+        border: float = time.monotonic() - self.window
+        while self._airtime and self._airtime[0][0] < border:
+            self._airtime_ms -= self._airtime.popleft()[1]
+        return self._airtime_ms
+
+    def _budget_delay(self, airtime_ms: float) -> float:
+        if self.duty_cycle is None or not self._airtime:
+            return 0.0
+        allowed: float = self.duty_cycle * self.window * 1000
+        excess: float = self.airtime_used() + airtime_ms - allowed
+        delay: float = 0.0
+        for moment, spent in self._airtime:
+            if excess <= 0:
+                break
+            excess -= spent
+            delay = moment + self.window - time.monotonic()
+        return max(delay, 0.0)
+
+    def _select(self) -> TxRequest | None:
+        """ Request to run next, it stays queued """
+        best: TxRequest | None = None
+        for caller, queue in list(self._queues.items()):
+            while queue and queue[0].future.done():  # cancelled by caller
+                heapq.heappop(queue)
+            if not queue:
+                del self._queues[caller]
+                continue
+            head: TxRequest = queue[0]
+            if best is None or head.priority < best.priority or \
+                    (head.priority == best.priority and
+                     self._turns.get(caller, -1) <
+                     self._turns.get(best.caller, -1)):
+                best = head
+        return best
+
+    def _take(self, request: TxRequest) -> None:
+        heapq.heappop(self._queues[request.caller])
+        self._turns[request.caller] = request.seq
+        if request.timer is not None:
+            request.timer.cancel()
+
+    def _expire(self, request: TxRequest) -> None:
+        """ Fails a request which has not started before its deadline """
+        if request is self.current or request.future.done():
+            return
+        request.future.set_exception(TxDeadlineExceeded(
+            f'TX of {request.caller or "radio"} missed its deadline'))
+
+    async def _work(self) -> None:
+        while True:
+            request: TxRequest | None = self._select()
+            if request is None:
+                self._turns.clear()  # callers take turns while queued only
+                self._wakeup.clear()  # type: ignore
+                await self._wakeup.wait()  # type: ignore
+                continue
+            delay: float = self._budget_delay(request.airtime_ms)
+            if request.deadline is not None and \
+                    time.monotonic() + delay > request.deadline:
+                self._take(request)
+                self._expire(request)
+                continue
+            if delay:
+                # selected again after the wait, requests queued meanwhile
+                # may go first
+                logger.debug(f'TX duty cycle: waiting {delay:.1f} s')
+                wakeup: asyncio.Event = self._wakeup  # type: ignore
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._take(request)
+            await self._run(request)
+
+    async def _run(self, request: TxRequest) -> None:
+        self.current = request
+        task: asyncio.Task = asyncio.create_task(request.job(),
+                                                 context=request.context)
+        self._job = task
+        request.future.add_done_callback(
+            lambda future: task.cancel() if future.cancelled() else None)
+        try:
+            result: Any = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():  # the worker is stopped
+                task.cancel()
+                request.future.cancel()
+                raise
+            if not request.future.done():
+                request.future.cancel()
+        except Exception as exc:
+            if not request.future.done():
+                request.future.set_exception(exc)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+        finally:
+            self.current = None
+            self._job = None
+
+    async def stop(self) -> None:
+        """ Stops the worker and cancels queued requests """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for queue in self._queues.values():
+            for request in queue:
+                request.future.cancel()
+        self._queues.clear()
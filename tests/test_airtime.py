@@ -0,0 +1,102 @@
+import unittest
+from itertools import product
+from math import ceil
+from unittest import mock
+
+from async_sx127x import airtime
+from async_sx127x.airtime import (MAX_PAYLOAD, fsk_table, fsk_time_on_air,
+                                  fsk_time_on_air_array, lora_table,
+                                  lora_time_on_air, lora_time_on_air_array)
+from async_sx127x.registers import SX127x_DcFree
+
+
+def baseline_lora(length: int, sf: int, bw: float, cr: int, ldro: bool,
+                  implicit: bool, crc: bool, preamble: int) -> float:
+    """ LoRa_Controller.time_on_air before the airtime module """
+    t_sym: float = 2 ** sf / bw
+    preamble_time: float = (preamble + 4.25) * t_sym
+    _tmp_1: int = 8 * length - 4 * sf + 28
+    _tmp_2: int = 16 * crc - 20 * implicit
+    _devider: int = 4 * (sf - 2 * ldro)
+    _ceil: int = ceil((_tmp_1 + _tmp_2) / _devider)
+    payload_symbol_nb: float = 8 + max(_ceil * cr, 0)
+    return round(payload_symbol_nb * t_sym + preamble_time, 3)
+
+
+class LoRaAirTimeTest(unittest.TestCase):
+    def test_datasheet_example(self) -> None:
+        # SF7, 125 kHz, CR 4/5, 10 bytes with CRC: 28 symbols + preamble
+        self.assertEqual(lora_time_on_air(10, 7, 125), 41.216)
+
+    def test_matches_baseline(self) -> None:
+        for sf, bw, cr, ldro, implicit, crc, preamble in product(
+                range(6, 13), (7.8, 62.5, 125, 500), range(5, 9),
+                (False, True), (False, True), (False, True), (6, 8, 12)):
+            for length in (0, 1, 13, 64, 255):
+                args = (length, sf, bw, cr, ldro, implicit, crc, preamble)
+                self.assertEqual(lora_time_on_air(*args), baseline_lora(*args),
+                                 args)
+
+    def test_table(self) -> None:
+        table: tuple[float, ...] = lora_table(9, 125, 6, False, False, True, 8)
+        self.assertEqual(len(table), MAX_PAYLOAD + 1)
+        self.assertEqual(table, tuple(baseline_lora(length, 9, 125, 6, False,
+                                                    False, True, 8)
+                                      for length in range(MAX_PAYLOAD + 1)))
+        self.assertIs(lora_table(9, 125, 6, False, False, True, 8), table)
+
+
+class FSKAirTimeTest(unittest.TestCase):
+    def test_air_time(self) -> None:
+        # (8 preamble + 6 sync + 1 length + 10 data + 2 CRC) bytes at 4.8 kbps
+        self.assertEqual(fsk_time_on_air(10, 4800), 45.0)
+        self.assertEqual(fsk_time_on_air(10, 4800, crc=False,
+                                         variable_length=False), 40.0)
+        self.assertEqual(fsk_time_on_air(10, 4800, address=True), 46.667)
+
+    def test_manchester(self) -> None:
+        # the body after the sync word is doubled
+        self.assertEqual(fsk_time_on_air(10, 4800,
+                                         dc_free=SX127x_DcFree.MANCHESTER),
+                         66.667)
+        self.assertEqual(fsk_time_on_air(10, 4800,
+                                         dc_free=SX127x_DcFree.WHITENING),
+                         fsk_time_on_air(10, 4800))
+
+    def test_table(self) -> None:
+        for dc_free in SX127x_DcFree:
+            with self.subTest(dc_free=dc_free):
+                table = fsk_table(9600, 4, 3, True, dc_free)
+                self.assertEqual(table, tuple(
+                    fsk_time_on_air(length, 9600, 4, 3, True, dc_free)
+                    for length in range(MAX_PAYLOAD + 1)))
+
+
+class ArrayAirTimeTest(unittest.TestCase):
+    def check(self) -> None:
+        times = lora_time_on_air_array(range(MAX_PAYLOAD + 1), 7, 125)
+        self.assertEqual(list(times), list(lora_table(7, 125)))
+        times = lora_time_on_air_array(20, [7, 8, 9, 10, 11, 12], 125, 5,
+                                       [False] * 5 + [True])
+        self.assertEqual(list(times), [lora_time_on_air(20, sf, 125, 5,
+                                                        sf == 12)
+                                       for sf in range(7, 13)])
+        self.assertEqual(float(lora_time_on_air_array(10, 7, 125)), 41.216)
+        times = fsk_time_on_air_array(10, [4800], manchester=[False, True])
+        self.assertEqual(list(times), [45.0, 66.667])
+
+    def test_fallback(self) -> None:
+        with mock.patch.object(airtime, 'np', None):
+            self.check()
+            times = lora_time_on_air_array([10, 20], 7, 125)
+            self.assertIsInstance(times, list)
+            with self.assertRaises(ValueError):
+                lora_time_on_air_array([10, 20], [7, 8, 9], 125)
+
+    @unittest.skipIf(airtime.np is None, 'numpy is not installed')
+    def test_numpy(self) -> None:
+        self.check()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import unittest
+
+from async_sx127x.interfaces.base_interface import BaseInterface
+
+
+class ScriptedInterface(BaseInterface):
+    """ Transport which returns replies put to `replies`, b'' if there is none """
+    def __init__(self) -> None:
+        super().__init__()
+        self.connection_status = True
+        self.replies: asyncio.Queue[bytes] = asyncio.Queue()
+        self.written: list[bytes] = []
+        self._write = self._scripted_write
+        self._read = self._scripted_read
+
+    async def _scripted_write(self, data: bytes) -> None:
+        self.written.append(bytes(data))
+
+    async def _scripted_read(self, amount: int = 1) -> bytes:
+        try:
+            return await asyncio.wait_for(self.replies.get(), 0.05)
+        except asyncio.TimeoutError:
+            return b''
+
+
+class PendingQueueTest(unittest.TestCase):
+    def test_cleared_while_reading(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            first = asyncio.create_task(interface.read(0x42))  # 5 retries
+            await asyncio.sleep(0.1)  # the reader got empty data, it retries
+            failed = interface._pending.popleft()
+            failed.future.set_exception(ConnectionResetError('link lost'))
+            second = asyncio.create_task(interface.read(0x06))
+            await asyncio.sleep(0)
+            await interface.replies.put(b'\x12')
+            self.assertEqual(await asyncio.wait_for(second, 1), 0x12)
+            with self.assertRaises(ConnectionResetError):
+                await first
+            self.assertFalse(interface._pending)
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+    def test_replies_in_order(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            for reply in (b'\x01', b'\x02', b'\x03'):
+                interface.replies.put_nowait(reply)
+            answers = await asyncio.gather(*(interface.read(address)
+                                             for address in (1, 2, 3)))
+            self.assertEqual(answers, [1, 2, 3])
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+
+class CommandBatchTest(unittest.TestCase):
+    def test_replies_parsed_in_order(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            interface.replies.put_nowait(b'\x74\x39\x6c\x80\x00ab')
+            async with interface.batch() as batch:
+                sf_reg = batch.read(0x1E)
+                written = batch.write(0x39, [0x12])
+                frf = batch.read_several(0x06, 3)
+                fifo = batch.read_burst(0x00, 2)
+                self.assertEqual(len(batch), 4)
+            self.assertEqual(interface.written, [b'\x01\x1e\x02\x39\x12'
+                                                 b'\x07\x06\x03\x07\x00\x02'])
+            self.assertEqual(sf_reg.result(), 0x74)
+            self.assertEqual(written.result(), 0x39)
+            self.assertEqual(frf.result(), [0x6C, 0x80, 0x00])
+            self.assertEqual(fifo.result(), b'ab')
+            self.assertEqual(len(batch), 0)
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+    def test_in_flight_with_single_requests(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            batch = interface.batch()
+            first, second = batch.read(0x01), batch.read(0x02)
+            for reply in (b'\x05', b'\x01\x02', b'\x06'):
+                interface.replies.put_nowait(reply)
+            before, _, after = await asyncio.gather(interface.read(0x05),
+                                                    batch.execute(),
+                                                    interface.read(0x06))
+            self.assertEqual((before, first.result(), second.result(), after),
+                             (5, 1, 2, 6))
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+    def test_executed_again(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            async with interface.batch() as batch:
+                first = batch.read(0x01)
+                interface.replies.put_nowait(b'\x81')
+                await batch.execute()  # flushed by a read inside the block
+                second = batch.read(0x02)
+                interface.replies.put_nowait(b'\x1a')
+            self.assertEqual((first.result(), second.result()), (0x81, 0x1A))
+            self.assertEqual(interface.written, [b'\x01\x01', b'\x01\x02'])
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+    def test_failed_batch_cancels_futures(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()  # no reply comes
+            batch = interface.batch()
+            replies = [batch.read(0x01), batch.write(0x01, [0x81])]
+            with self.assertRaises(RuntimeError):
+                await batch.execute()
+            self.assertTrue(all(reply.cancelled() for reply in replies))
+            self.assertEqual(len(batch), 0)
+            interface.stop_reader()
+
+        asyncio.run(scenario())
+
+    def test_error_in_block_sends_nothing(self) -> None:
+        async def scenario() -> None:
+            interface = ScriptedInterface()
+            with self.assertRaises(ValueError):
+                async with interface.batch() as batch:
+                    reply = batch.read(0x01)
+                    raise ValueError('configuration error')
+            self.assertTrue(reply.cancelled())
+            self.assertEqual(interface.written, [])
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
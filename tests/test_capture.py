@@ -0,0 +1,97 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from async_sx127x.capture import (CaptureKind, CaptureReader, CaptureWriter,
+                                  FILE_HEADER)
+from async_sx127x.packets import (FSK_RX_Record, FSK_TX_Record, LoRaRxRecord,
+                                  LoRaTxRecord, PacketRecord)
+
+
+def sample_records() -> list[PacketRecord]:
+    return [LoRaRxRecord(b'lora rx', 433_000_000, 'beacon', True, 40, 90,
+                         b'\x00\x01\x00', 10, 125.0, True, 123.456),
+            LoRaTxRecord(b'lora tx', 433_000_000, 10, 125.0, False, 61.5,
+                         'control', 2),
+            FSK_RX_Record(b'\x06fsk rx', 436_500_000, '', -70, False),
+            FSK_TX_Record(b'fsk tx', 436_500_000, 'telemetry', 1)]
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = Path(self._dir.name, 'radio.sxcap')
+
+    def tearDown(self) -> None:
+        self._dir.cleanup()
+
+    def _capture(self, records: list, writer: CaptureWriter | None = None
+                 ) -> CaptureWriter:
+        async def scenario() -> CaptureWriter:
+            capture = writer or CaptureWriter(self.path, flush_interval=0.01)
+            await capture.start()
+            for record in records:
+                capture.write(record)
+            await asyncio.sleep(0.05)
+            await capture.stop()
+            return capture
+
+        return asyncio.run(scenario())
+
+    def test_round_trip(self) -> None:
+        records = sample_records()
+        self.assertEqual(self._capture(records).written, 4)
+        captured = list(CaptureReader(self.path))
+        self.assertEqual([packet.kind for packet in captured],
+                         list(CaptureKind))
+        for record, packet in zip(records, captured):
+            self.assertEqual(packet.data, record.data)
+            self.assertEqual(packet.time_ns, record.time_ns)
+            self.assertEqual(packet.caller, record.caller)
+            self.assertEqual(packet.to_model().model_dump(exclude={'timestamp'}),
+                             record.to_model().model_dump(exclude={'timestamp'}))
+
+    def test_truncated_tail(self) -> None:
+        self._capture(sample_records())
+        raw: bytes = self.path.read_bytes()
+        for cut in (1, 5, 40):  # inside the data, the caller, the header
+            self.path.write_bytes(raw[:-cut])
+            captured = list(CaptureReader(self.path))
+            self.assertEqual(len(captured), 3)
+            self.assertEqual(captured[-1].data, b'\x06fsk rx')
+        self.path.write_bytes(raw[:FILE_HEADER.size])
+        self.assertEqual(list(CaptureReader(self.path)), [])
+
+    def test_bad_record_skipped(self) -> None:
+        records = sample_records()
+        writer = self._capture([records[0], object(), records[1]])
+        self.assertEqual(writer.written, 2)
+        self.assertEqual([packet.data for packet in CaptureReader(self.path)],
+                         [b'lora rx', b'lora tx'])
+
+    def test_failed_write_requeued(self) -> None:
+        writer = CaptureWriter(self.path, flush_interval=0.01,
+                               fsync_interval=0)
+        failures = [OSError('Input/output error')]
+
+        def fsync(fd: int) -> None:
+            if failures:  # the chunk is in the file already
+                raise failures.pop()
+
+        with mock.patch('async_sx127x.capture.os.fsync', fsync):
+            self._capture(sample_records(), writer)
+        self.assertFalse(failures)
+        self.assertEqual(writer.written, 4)
+        self.assertEqual(len(list(CaptureReader(self.path))), 4)
+
+    def test_caller_cut_on_character(self) -> None:
+        record = FSK_TX_Record(b'x', 436_500_000, 'я' * 200)
+        self._capture([record])
+        caller: str = list(CaptureReader(self.path))[0].caller
+        self.assertEqual(caller, 'я' * 127)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+
+from async_sx127x.driver import SX127x_Driver
+from async_sx127x.registers import SX127x_Modulation, SX127x_Registers
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class UploadConfigTest(unittest.TestCase):
+    async def _driver(self) -> SX127x_Driver:
+        driver = SX127x_Driver()
+        self.assertTrue(await driver.connect('emulator'))
+        await driver.reset()
+        return driver
+
+    def test_fsk_rx_config_uploaded(self) -> None:
+        async def scenario() -> int:
+            driver = await self._driver()
+
+            async def configure() -> None:
+                await driver.set_fsk_auto_afc(True)
+
+            await driver.upload_config(SX127x_Modulation.FSK, configure)
+            value: int = await driver.interface.read(
+                SX127x_Registers.FSK_RX_CONFIG.value)
+            await driver.disconnect()
+            return value
+
+        self.assertTrue(run(scenario()) & 0x10)  # AfcAutoOn
+
+    def test_lora_irq_mask_uploaded(self) -> None:
+        async def scenario() -> int:
+            driver = await self._driver()
+
+            async def configure() -> None:
+                await driver.set_lora_irq_flags_mask(0xB7)
+
+            await driver.upload_config(SX127x_Modulation.LORA, configure)
+            value: int = await driver.interface.read(
+                SX127x_Registers.LORA_IRQ_FLAGS_MASK.value)
+            await driver.disconnect()
+            return value
+
+        self.assertEqual(run(scenario()), 0xB7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import unittest
+
+from async_sx127x.emulator import SX127xEmulator, serve_pty, serve_tcp
+from async_sx127x.interfaces.emulator import EmulatorInterface
+from async_sx127x.radio_controller import RadioController
+from async_sx127x.registers import SX127x_LoRa_ISR
+
+
+async def exchange(radio: RadioController, chip: SX127xEmulator
+                   ) -> tuple[bytes, list[int | None], bytes | None]:
+    """ Sends a packet, then receives an injected one after DIO0 events """
+    tx = await radio.send_single(b'ping')
+    events: list[int | None] = [await radio.driver.interface.wait_irq(1)]
+    await radio.driver.set_rx_continuous_mode()
+    chip.inject(b'pong', delay=0.01)
+    events.append(await radio.driver.interface.wait_irq(1))
+    packet = await radio.lora.check_rx_input()
+    await radio.disconnect()
+    return bytes(tx.data), events, bytes(packet.data) if packet else None
+
+
+class EmulatorTransportTest(unittest.TestCase):
+    def check(self, result: tuple[bytes, list[int | None], bytes | None]
+              ) -> None:
+        tx_data, (tx_irq, rx_irq), rx_data = result
+        self.assertEqual(tx_data, b'ping')
+        self.assertTrue(tx_irq and tx_irq & SX127x_LoRa_ISR.TXDONE.value)
+        self.assertTrue(rx_irq and rx_irq & SX127x_LoRa_ISR.RXDONE.value)
+        self.assertEqual(rx_data, b'pong')
+
+    def test_in_process(self) -> None:
+        async def scenario():
+            radio = RadioController('lora', sf=7, bw=500, notifications=True)
+            self.assertTrue(await radio.connect('emulator'))
+            interface = radio.driver.interface
+            self.assertIsInstance(interface, EmulatorInterface)
+            self.assertTrue(interface.notifications)
+            self.assertTrue(interface.emulator.notify)
+            return await exchange(radio, interface.emulator)
+
+        self.check(asyncio.run(scenario()))
+
+    def test_tcp(self) -> None:
+        async def scenario():
+            chip = SX127xEmulator(time_scale=0.05)
+            server: asyncio.Server = await serve_tcp(chip)
+            port: int = server.sockets[0].getsockname()[1]
+            radio = RadioController('lora', sf=7, bw=500, notifications=True)
+            try:
+                self.assertTrue(await radio.connect(f'127.0.0.1:{port}'))
+                self.assertTrue(chip.notify)
+                return await exchange(radio, chip)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        self.check(asyncio.run(scenario()))
+
+    def test_pty(self) -> None:
+        async def scenario():
+            chip = SX127xEmulator(time_scale=0.05)
+            server = serve_pty(chip)
+            radio = RadioController('lora', sf=7, bw=500, notifications=True)
+            try:
+                self.assertTrue(await radio.connect(server.port))
+                self.assertTrue(chip.notify)
+                return await exchange(radio, chip)
+            finally:
+                server.close()
+
+        self.check(asyncio.run(scenario()))
+
+    def test_notifications_off(self) -> None:
+        async def scenario() -> int | None:
+            radio = RadioController('lora', sf=7, bw=500)
+            self.assertTrue(await radio.connect('emulator'))
+            self.assertFalse(radio.driver.interface.emulator.notify)
+            await radio.driver.set_rx_continuous_mode()
+            radio.driver.interface.emulator.inject(b'pong', delay=0)
+            irq: int | None = await radio.driver.interface.wait_irq(0.2)
+            await radio.disconnect()
+            return irq
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+
+class LinkedEmulatorTest(unittest.TestCase):
+    def test_linked_chips(self) -> None:
+        async def scenario() -> tuple[bytes | None, bytes | None]:
+            chips = (SX127xEmulator(time_scale=0.05),
+                     SX127xEmulator(time_scale=0.05))
+            chips[0].link(chips[1])
+            node, peer = (RadioController('lora', sf=7, bw=500)
+                          for _ in chips)
+            for radio, chip in zip((node, peer), chips):
+                radio.driver.set_interface(EmulatorInterface(chip))
+                await radio.driver.interface.connect()
+                await radio.current_mode.init()
+            await peer.driver.interface.enable_notifications()
+            await peer.driver.set_rx_continuous_mode()
+            await node.send_single(b'over the air')
+            irq: int | None = await peer.driver.interface.wait_irq(1)
+            self.assertTrue(irq and irq & SX127x_LoRa_ISR.RXDONE.value)
+            heard = await peer.lora.check_rx_input()
+            # the other way round, without notifications
+            await node.driver.set_rx_continuous_mode()
+            await peer.send_single(b'back')
+            answer = await node.wait_packet(2)
+            for radio in (node, peer):
+                await radio.disconnect()
+            return (bytes(heard.data) if heard else None,
+                    bytes(answer.data) if answer else None)
+
+        self.assertEqual(asyncio.run(scenario()), (b'over the air', b'back'))
+
+    def test_different_channel_is_not_heard(self) -> None:
+        async def scenario():
+            chips = (SX127xEmulator(time_scale=0.05),
+                     SX127xEmulator(time_scale=0.05))
+            chips[0].link(chips[1])
+            node = RadioController('lora', sf=7, bw=500)
+            peer = RadioController('lora', sf=8, bw=500)
+            for radio, chip in zip((node, peer), chips):
+                radio.driver.set_interface(EmulatorInterface(chip))
+                await radio.driver.interface.connect()
+                await radio.current_mode.init()
+            await peer.driver.set_rx_continuous_mode()
+            await node.send_single(b'lost')
+            packet = await peer.wait_packet(0.3)
+            for radio in (node, peer):
+                await radio.disconnect()
+            return packet
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+
+if __name__ == '__main__':
+    unittest.main()
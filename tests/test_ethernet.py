@@ -0,0 +1,174 @@
+import asyncio
+import unittest
+
+from async_sx127x.emulator import SX127xEmulator, serve_tcp
+from async_sx127x.interfaces.base_interface import LinkReset, PendingRequest
+from async_sx127x.interfaces.ethernet import EthernetInterface
+from async_sx127x.radio_controller import RadioController
+from async_sx127x.registers import SX127x_Field, SX127x_Modulation
+
+
+class LinkProxy:
+    """
+    TCP proxy in front of the emulator server. Replies can be held or
+    delayed, `drop()` breaks the links but new connections are accepted.
+    """
+    def __init__(self) -> None:
+        self.hold: bool = False
+        self.delay: float = 0.0
+        self.connections: int = 0
+        self._writers: list[asyncio.StreamWriter] = []
+
+    async def start(self, chip: SX127xEmulator) -> int:
+        self._backend: asyncio.Server = await serve_tcp(chip)
+        self._backend_port: int = self._backend.sockets[0].getsockname()[1]
+        self._server: asyncio.Server = await asyncio.start_server(
+            self._client, '127.0.0.1', 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _client(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        up_reader, up_writer = await asyncio.open_connection(
+            '127.0.0.1', self._backend_port)
+        self._writers += [writer, up_writer]
+        replies = asyncio.create_task(self._replies(up_reader, writer))
+        try:
+            while data := await reader.read(1024):
+                up_writer.write(data)
+        except ConnectionError:
+            pass
+        finally:
+            replies.cancel()
+            up_writer.close()
+            writer.close()
+
+    async def _replies(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        while data := await reader.read(1024):
+            while self.hold:
+                await asyncio.sleep(0.005)
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if not writer.is_closing():
+                writer.write(data)
+
+    def drop(self) -> None:
+        for writer in self._writers:
+            writer.transport.abort()
+        self._writers.clear()
+
+    async def stop(self) -> None:
+        self.drop()
+        for server in (self._server, self._backend):
+            server.close()
+
+
+def restored_callback(restored: asyncio.Event):
+    async def _callback() -> None:
+        restored.set()
+    return _callback
+
+
+class ReconnectTest(unittest.TestCase):
+    def test_pending_fail_later_succeed(self) -> None:
+        async def scenario() -> None:
+            chip = SX127xEmulator()
+            proxy = LinkProxy()
+            port: int = await proxy.start(chip)
+            interface = EthernetInterface(read_timeout=1.0)
+            self.assertTrue(await interface.connect(f'127.0.0.1:{port}'))
+            restored = asyncio.Event()
+            interface.on_reconnect.append(restored_callback(restored))
+            self.assertEqual(await interface.read(0x42), 0x12)  # RegVersion
+            proxy.hold = True
+            pending = [asyncio.create_task(interface.read(address))
+                       for address in (0x06, 0x07)]
+            await asyncio.sleep(0.05)
+            proxy.drop()
+            for request in pending:
+                with self.assertRaises(ConnectionResetError):
+                    await asyncio.wait_for(request, 2)
+            proxy.hold = False
+            await asyncio.wait_for(restored.wait(), 2)
+            self.assertEqual(proxy.connections, 2)
+            self.assertEqual(await interface.read(0x06), 0x6C)
+            self.assertEqual(await interface.read_several(0x06, 3),
+                             [0x6C, 0x80, 0x00])
+            await interface.disconnect()
+            await proxy.stop()
+
+        asyncio.run(scenario())
+
+    def test_read_after_reconnect_raises_link_reset(self) -> None:
+        async def scenario() -> None:
+            chip = SX127xEmulator()
+            proxy = LinkProxy()
+            port: int = await proxy.start(chip)
+            interface = EthernetInterface(read_timeout=1.0)
+            self.assertTrue(await interface.connect(f'127.0.0.1:{port}'))
+            # a request in flight on the old link, read outside the reader
+            request = PendingRequest([1])
+            interface._pending.append(request)
+            proxy.drop()
+            with self.assertRaises(LinkReset):
+                await asyncio.wait_for(interface._read(1), 2)
+            with self.assertRaises(ConnectionResetError):
+                request.future.result()
+            self.assertFalse(interface._pending)
+            self.assertEqual(await interface.read(0x42), 0x12)
+            await interface.disconnect()
+            await proxy.stop()
+
+        asyncio.run(scenario())
+
+    def test_late_reply_is_not_taken(self) -> None:
+        async def scenario() -> None:
+            chip = SX127xEmulator()
+            chip.write(0x40, [0x11])
+            proxy = LinkProxy()
+            port: int = await proxy.start(chip)
+            interface = EthernetInterface(read_timeout=0.1)
+            self.assertTrue(await interface.connect(f'127.0.0.1:{port}'))
+            restored = asyncio.Event()
+            interface.on_reconnect.append(restored_callback(restored))
+            proxy.delay = 0.3
+            with self.assertRaises(ConnectionResetError):
+                await asyncio.wait_for(interface.read(0x42), 2)
+            proxy.delay = 0.0
+            await asyncio.wait_for(restored.wait(), 2)
+            await asyncio.sleep(0.3)  # the late 0x12 reply goes to the old link
+            self.assertEqual(await interface.read(0x40), 0x11)
+            await interface.disconnect()
+            await proxy.stop()
+
+        asyncio.run(scenario())
+
+    def test_radio_restored(self) -> None:
+        async def scenario() -> tuple[int, bool]:
+            chip = SX127xEmulator(time_scale=0.05)
+            proxy = LinkProxy()
+            port: int = await proxy.start(chip)
+            radio = RadioController('lora', sf=9, bw=500, notifications=True)
+            self.assertTrue(await radio.connect(f'127.0.0.1:{port}'))
+            restored = asyncio.Event()  # called after radio._restore
+            radio.driver.interface.on_reconnect.append(
+                restored_callback(restored))
+            chip.reset()  # the bridge rebooted with the radio
+            self.assertEqual(chip.modulation, SX127x_Modulation.FSK)
+            proxy.drop()
+            await asyncio.wait_for(restored.wait(), 3)
+            self.assertEqual(chip.modulation, SX127x_Modulation.LORA)
+            sf: int = chip._field(SX127x_Field.LORA_SF)
+            notify: bool = chip.notify
+            transmitted = await radio.send_single(b'after reconnect')
+            self.assertEqual(bytes(transmitted.data), b'after reconnect')
+            await radio.disconnect()
+            await proxy.stop()
+            return sf, notify
+
+        self.assertEqual(asyncio.run(scenario()), (9, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import asyncio
+import unittest
+
+from async_sx127x.interfaces.stats import InterfaceStats, OPCODE_NAMES
+from async_sx127x.radio_controller import RadioController
+
+
+async def rx_transactions(payload: bytes | None
+                          ) -> tuple[bytes | None, dict[str, int], int]:
+    """ Opcodes and their counts of one check_rx_input call """
+    radio = RadioController('lora', sf=7, bw=500)
+    assert await radio.connect('emulator')
+    await radio.driver.set_rx_continuous_mode()
+    chip = radio.driver.interface.emulator
+    if payload is not None:
+        chip.inject(payload, delay=0)
+        while not chip.rx_pending():
+            await asyncio.sleep(0.005)
+    stats: InterfaceStats = radio.driver.interface.enable_stats()
+    packet = await radio.lora.check_rx_input()
+    counts: dict[str, int] = {OPCODE_NAMES[opcode]: opcode_stats.count
+                              for opcode, opcode_stats in stats.opcodes.items()}
+    transactions: int = stats.totals()[0]
+    await radio.disconnect()
+    return bytes(packet.data) if packet else None, counts, transactions
+
+
+class CheckRxInputTest(unittest.TestCase):
+    def test_no_packet(self) -> None:
+        data, counts, transactions = asyncio.run(rx_transactions(None))
+        self.assertIsNone(data)
+        self.assertEqual(counts, {'read': 1})
+        self.assertEqual(transactions, 1)
+
+    def test_packet(self) -> None:
+        for payload in (b'ping', bytes(range(255))):
+            with self.subTest(size=len(payload)):
+                data, counts, transactions = asyncio.run(
+                    rx_transactions(payload))
+                self.assertEqual(data, payload)
+                # IRQ flags, status burst, then one batch of FIFO pointer,
+                # data and IRQ clear
+                self.assertEqual(counts, {'read': 1, 'read_several': 1,
+                                          'batch': 1})
+                self.assertEqual(transactions, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
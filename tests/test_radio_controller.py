@@ -0,0 +1,33 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from async_sx127x.radio_controller import RadioController
+
+
+class RxRoutineTest(unittest.TestCase):
+    def test_unexpected_error_resets_polling(self) -> None:
+        async def scenario() -> bytes | None:
+            radio = RadioController('lora', sf=7, bw=500)
+            self.assertTrue(await radio.connect('emulator'))
+            await radio.driver.set_rx_continuous_mode()
+            failure = mock.AsyncMock(side_effect=TimeoutError('Radio reading '
+                                                              'timeout'))
+            with mock.patch.object(radio.lora, 'check_rx_input', failure):
+                with self.assertRaises(TimeoutError):
+                    await radio.rx_routine()
+            self.assertFalse(radio._rx_running)
+            self.assertFalse(radio.lora.rx.polled)
+            # without RX loop the waiter polls the radio itself
+            waiter = asyncio.create_task(radio.wait_packet(2))
+            await asyncio.sleep(0.05)
+            radio.driver.interface.emulator.inject(b'after error', delay=0)
+            packet = await waiter
+            await radio.disconnect()
+            return bytes(packet.data) if packet else None
+
+        self.assertEqual(asyncio.run(scenario()), b'after error')
+
+
+if __name__ == '__main__':
+    unittest.main()
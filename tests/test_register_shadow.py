@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+
+from async_sx127x.driver import SX127x_Driver
+from async_sx127x.interfaces.stats import OPCODE_NAMES, InterfaceStats
+from async_sx127x.register_shadow import RegisterShadow
+from async_sx127x.registers import SX127x_Modulation, SX127x_Registers
+
+
+LORA_OP_MODE = 0x81  # LongRangeMode, standby
+FSK_OP_MODE = 0x01
+IRQ_FLAGS: int = SX127x_Registers.LORA_IRQ_FLAGS.value
+MODEM_CONFIG_2: int = SX127x_Registers.LORA_MODEM_CONFIG_2.value
+
+
+def counts(stats: InterfaceStats) -> dict[str, int]:
+    return {OPCODE_NAMES[opcode]: opcode_stats.count
+            for opcode, opcode_stats in stats.opcodes.items()}
+
+
+class RegisterShadowTest(unittest.TestCase):
+    def test_write_through(self) -> None:
+        shadow = RegisterShadow()
+        shadow.update(SX127x_Registers.OP_MODE.value, [LORA_OP_MODE])
+        self.assertEqual(shadow.modulation, SX127x_Modulation.LORA)
+        shadow.update(0x06, [0x6C, 0x80, 0x00])  # RegFrf burst
+        self.assertEqual(shadow.get_several(0x06, 3), [0x6C, 0x80, 0x00])
+        self.assertIsNone(shadow.get_several(0x06, 4))
+        shadow.invalidate(0x07)
+        self.assertIsNone(shadow.get(0x07))
+        self.assertEqual(shadow.get(0x06), 0x6C)
+
+    def test_volatile_not_cached(self) -> None:
+        shadow = RegisterShadow()
+        shadow.update(SX127x_Registers.OP_MODE.value, [LORA_OP_MODE])
+        shadow.update(IRQ_FLAGS, [0x40])
+        shadow.update(SX127x_Registers.FIFO.value, [0x55])
+        self.assertIsNone(shadow.get(IRQ_FLAGS))
+        self.assertIsNone(shadow.get(SX127x_Registers.FIFO.value))
+        # the same address is configuration on the FSK page
+        shadow.update(SX127x_Registers.OP_MODE.value, [FSK_OP_MODE])
+        shadow.update(IRQ_FLAGS, [0x12])
+        self.assertEqual(shadow.get(IRQ_FLAGS), 0x12)
+
+    def test_modulation_switch_drops_paged_registers(self) -> None:
+        shadow = RegisterShadow()
+        shadow.load(0x01, [LORA_OP_MODE] + list(range(2, 0x71)))
+        self.assertEqual(shadow.get(MODEM_CONFIG_2), MODEM_CONFIG_2)
+        shadow.update(SX127x_Registers.OP_MODE.value, [FSK_OP_MODE])
+        self.assertIsNone(shadow.get(MODEM_CONFIG_2))
+        self.assertEqual(shadow.get(0x06), 0x06)  # common register
+        self.assertEqual(shadow.get(0x40), 0x40)  # DIO mapping
+
+    def test_load_replaces_content(self) -> None:
+        shadow = RegisterShadow()
+        shadow.update(SX127x_Registers.OP_MODE.value, [LORA_OP_MODE])
+        shadow.update(0x42, [0x12])
+        shadow.load(0x06, [0x6C])
+        self.assertIsNone(shadow.get(0x42))
+        self.assertIsNone(shadow.modulation)
+        self.assertEqual(shadow.get(0x06), 0x6C)
+
+
+class DriverShadowTest(unittest.TestCase):
+    async def _driver(self, shadow: bool) -> SX127x_Driver:
+        driver = SX127x_Driver(shadow_registers=shadow)
+        self.assertTrue(await driver.connect('emulator'))
+        await driver.reset()
+        await driver.set_modulation(SX127x_Modulation.LORA)
+        await driver.get_all_registers()
+        return driver
+
+    def test_setter_transactions(self) -> None:
+        async def scenario(shadow: bool) -> tuple[dict[str, int], int]:
+            driver = await self._driver(shadow)
+            stats: InterfaceStats = driver.interface.enable_stats()
+            await driver.set_lora_sf(9)
+            sf: int = await driver.get_lora_sf()
+            chip_sf: int = driver.interface.emulator.read(MODEM_CONFIG_2) >> 4
+            self.assertEqual((sf, chip_sf), (9, 9))
+            await driver.disconnect()
+            return counts(stats)
+
+        # read-modify-write and read back without the shadow
+        self.assertEqual(asyncio.run(scenario(False)), {'read': 2, 'write': 1})
+        self.assertEqual(asyncio.run(scenario(True)), {'write': 1})
+
+    def test_volatile_read_from_chip(self) -> None:
+        async def scenario() -> tuple[list[int], dict[str, int]]:
+            driver = await self._driver(True)
+            await driver.set_rx_continuous_mode()
+            stats: InterfaceStats = driver.interface.enable_stats()
+            flags: list[int] = [await driver.read_register(IRQ_FLAGS)]
+            driver.interface.emulator.inject(b'ping', delay=0)
+            while not driver.interface.emulator.rx_pending():
+                await asyncio.sleep(0.005)
+            flags.append(await driver.read_register(IRQ_FLAGS))
+            await driver.disconnect()
+            return flags, counts(stats)
+
+        flags, calls = asyncio.run(scenario())
+        self.assertFalse(flags[0] & 0x40)
+        self.assertTrue(flags[1] & 0x40)  # RxDone
+        self.assertEqual(calls, {'read': 2})
+
+    def test_resync(self) -> None:
+        async def scenario() -> tuple[int, int, dict[str, int]]:
+            driver = await self._driver(True)
+            # changed behind the driver, e.g. by another host
+            driver.interface.emulator.write(0x06, [0x6D])
+            stale: int = await driver.read_register(0x06)
+            stats: InterfaceStats = driver.interface.enable_stats()
+            await driver.sync_shadow()
+            request = stats.opcodes[7]
+            fresh: int = await driver.read_register(0x06)
+            await driver.read_registers(0x06, 3)
+            await driver.disconnect()
+            self.assertEqual(request.bytes_out, 3)  # read_several(0x01, 0x70)
+            self.assertEqual(request.bytes_in, 0x70)
+            return stale, fresh, counts(stats)
+
+        stale, fresh, calls = asyncio.run(scenario())
+        self.assertEqual(stale, 0x6C)
+        self.assertEqual(fresh, 0x6D)
+        self.assertEqual(calls, {'read_several': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
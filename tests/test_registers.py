@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from enum import Enum
+from typing import Any
+
+from async_sx127x.driver import SX127x_Driver
+from async_sx127x.registers import (SX127x_BW, SX127x_Field, SX127x_Mode,
+                                    SX127x_Modulation, SX127x_Registers)
+
+
+def apply(field: SX127x_Field, value: Any, registers: list[int]) -> list[int]:
+    """ Registers of the field after writing `value` over `registers` """
+    result: list[int] = list(registers)
+    for i, (address, mask, bits) in enumerate(field.encode(value)):
+        assert address == field.address + i
+        result[i] = (result[i] & ~mask) | bits
+    return result
+
+
+class FieldTest(unittest.TestCase):
+    def test_sub_byte(self) -> None:
+        self.assertEqual(SX127x_Field.LORA_SF.encode(9), [(0x1E, 0xF0, 0x90)])
+        self.assertEqual(SX127x_Field.LORA_SF.decode([0x94]), 9)
+        self.assertIs(SX127x_Field.LORA_CRC.decode([0x94]), True)
+        self.assertEqual(SX127x_Field.LORA_BANDWIDTH.encode(SX127x_BW.BW10_4),
+                         [(0x1D, 0xF0, 0x10)])
+        self.assertIs(SX127x_Field.LORA_BANDWIDTH.decode([0x13]),
+                      SX127x_BW.BW10_4)
+        self.assertIs(SX127x_Field.MODE.decode([0x85]), SX127x_Mode.RXCONT)
+        self.assertIs(SX127x_Field.MODULATION.decode([0x85]),
+                      SX127x_Modulation.LORA)
+
+    def test_multi_register(self) -> None:
+        self.assertEqual(SX127x_Field.FRF.encode(0x6C8012),
+                         [(0x06, 0xFF, 0x6C), (0x07, 0xFF, 0x80),
+                          (0x08, 0xFF, 0x12)])
+        self.assertEqual(SX127x_Field.FRF.decode([0x6C, 0x80, 0x12]), 0x6C8012)
+        self.assertEqual(SX127x_Field.LORA_PREAMBLE_LENGTH.decode([0x01, 0x02]),
+                         0x0102)
+        # PayloadLength(10:8) shares RegPacketConfig2 with other bits
+        self.assertEqual(SX127x_Field.FSK_PAYLOAD_LENGTH.encode(0x5AA),
+                         [(0x31, 0x07, 0x05), (0x32, 0xFF, 0xAA)])
+        self.assertEqual(SX127x_Field.FSK_PAYLOAD_LENGTH.decode([0xF5, 0xAA]),
+                         0x5AA)
+        self.assertEqual(apply(SX127x_Field.FSK_PAYLOAD_LENGTH, 0x123,
+                               [0xF8, 0x00]), [0xF9, 0x23])
+
+    def test_out_of_range(self) -> None:
+        for field, value in ((SX127x_Field.LORA_SF, 16),
+                             (SX127x_Field.LORA_SF, -1),
+                             (SX127x_Field.FSK_PAYLOAD_LENGTH, 0x800),
+                             (SX127x_Field.FRF, 1 << 24),
+                             (SX127x_Field.LORA_PREAMBLE_LENGTH, 0x10000)):
+            with self.subTest(field=field.name, value=value):
+                with self.assertRaises(ValueError):
+                    field.encode(value)
+
+    def test_round_trip(self) -> None:
+        for field in SX127x_Field:
+            spec = field.value
+            if issubclass(spec.kind, Enum):
+                values: list[Any] = list(spec.kind)
+            elif spec.kind is bool:
+                values = [False, True]
+            else:
+                top: int = spec.mask >> spec.shift
+                values = [0, 1, top // 3, top]
+            for value in values:
+                with self.subTest(field=field.name, value=value):
+                    # the other bits of the registers are kept
+                    for fill in (0x00, 0xFF):
+                        registers: list[int] = apply(field, value,
+                                                     [fill] * spec.size)
+                        self.assertEqual(field.decode(registers), value)
+                        others: int = ~spec.mask & ((1 << 8 * spec.size) - 1)
+                        raw: int = int.from_bytes(bytes(registers), 'big')
+                        self.assertEqual(raw & others,
+                                         others if fill else 0)
+
+
+class PreambleLengthTest(unittest.TestCase):
+    def test_lora_preamble_length(self) -> None:
+        async def scenario() -> tuple[int, list[int], int]:
+            driver = SX127x_Driver()
+            self.assertTrue(await driver.connect('emulator'))
+            await driver.set_modulation(SX127x_Modulation.LORA)
+            address: int = SX127x_Registers.LORA_PREAMBLE_MSB.value
+            driver.interface.emulator.write(address, [0x01, 0x2C])
+            wide: int = await driver.get_lora_preamble_length()
+            await driver.set_lora_preamble_length(100)
+            registers: list[int] = driver.interface.emulator.read_several(
+                address, 2)
+            length: int = await driver.get_lora_preamble_length()
+            await driver.disconnect()
+            return wide, registers, length
+
+        self.assertEqual(asyncio.run(scenario()), (300, [0x00, 100], 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+from async_sx127x.emulator import SX127xEmulator, serve_pty
+from async_sx127x.interfaces.serial_fd import FdSerialInterface
+
+
+@unittest.skipIf(sys.platform == 'win32', 'pseudo terminals are POSIX only')
+class FdSerialInterfaceTest(unittest.TestCase):
+    def test_lost_device(self) -> None:
+        async def scenario() -> None:
+            server = serve_pty(SX127xEmulator(time_scale=0))
+            interface = FdSerialInterface(timeout=0.2)
+            self.assertTrue(await interface.connect(server.port))
+            self.assertEqual(await interface.read(0x42), 0x12)
+            server.close()  # the adapter is unplugged
+            await asyncio.sleep(0.05)
+            self.assertFalse(interface.connection_status)
+            loop = asyncio.get_running_loop()
+            self.assertFalse(loop.remove_reader(interface._fd))
+            port = interface._interface
+            self.assertTrue(await interface.disconnect())
+            self.assertFalse(port.is_open)
+
+        asyncio.run(scenario())
+
+    def test_eof(self) -> None:
+        async def scenario() -> None:
+            interface = FdSerialInterface(timeout=0.2)
+            read_end, write_end = os.pipe()
+            os.set_blocking(read_end, False)
+            loop = asyncio.get_running_loop()
+            interface._interface = mock.Mock()
+            interface._fd, interface._loop = read_end, loop
+            interface.connection_status = True
+            loop.add_reader(read_end, interface._on_readable)
+            os.close(write_end)  # read() returns b'' from now on
+            await asyncio.sleep(0.05)
+            self.assertFalse(interface.connection_status)
+            self.assertFalse(loop.remove_reader(read_end))
+            await interface.disconnect()
+            interface._interface.close.assert_called_once()
+            os.close(read_end)
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
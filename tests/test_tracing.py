@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+
+from async_sx127x.emulator import SX127xEmulator
+from async_sx127x.interfaces.emulator import EmulatorInterface
+from async_sx127x.radio_controller import RadioController
+from async_sx127x.tracing import (HOT_PATH_BUDGETS, BudgetExceeded, CallTracer,
+                                  tracing)
+
+
+async def hot_paths(mode: str) -> CallTracer:
+    """ Runs the budgeted calls of `mode` on a fresh emulator under tracing """
+    chip = SX127xEmulator(time_scale=0.05)
+    radio = RadioController(mode, sf=7, bw=500)
+    radio.driver.set_interface(EmulatorInterface(chip))
+    await radio.driver.interface.connect()
+    controller = radio.current_mode
+    with tracing(radio.driver.interface) as tracer:
+        await controller.init()  # learns the reset image
+        await controller.init()
+        await controller.read_config()
+        await controller.send_single(b'ping')
+        await radio.driver.set_rx_continuous_mode()
+        assert await controller.check_rx_input() is None
+        chip.inject(b'pong', delay=0)
+        while not chip.rx_pending():
+            await asyncio.sleep(0.005)
+        packet = await controller.check_rx_input()
+        assert packet is not None and bytes(packet.data).endswith(b'pong')
+    await radio.disconnect()
+    return tracer
+
+
+class HotPathBudgetTest(unittest.TestCase):
+    def check(self, mode: str, prefix: str) -> None:
+        tracer: CallTracer = asyncio.run(hot_paths(mode))
+        budgets: dict[str, int] = {name: round_trips for name, round_trips
+                                   in HOT_PATH_BUDGETS.items()
+                                   if name.startswith(prefix)}
+        self.assertTrue(budgets)
+        self.assertLessEqual(budgets.keys(), tracer.calls.keys())
+        tracer.assert_budgets()
+        # a call over its budget is reported
+        name: str = max(budgets, key=budgets.__getitem__)
+        with self.assertRaises(BudgetExceeded):
+            tracer.assert_budget(name, tracer.calls[name].max_round_trips - 1)
+
+    def test_lora(self) -> None:
+        self.check('lora', 'LoRa_Controller.')
+
+    def test_fsk(self) -> None:
+        self.check('fsk', 'FSK_Controller.')
+
+
+if __name__ == '__main__':
+    unittest.main()
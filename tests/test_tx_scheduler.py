@@ -0,0 +1,168 @@
+import asyncio
+import time
+import unittest
+
+from async_sx127x.emulator import SX127xEmulator
+from async_sx127x.interfaces.emulator import EmulatorInterface
+from async_sx127x.radio_controller import RadioController
+from async_sx127x.tx_scheduler import TxDeadlineExceeded, TxScheduler
+
+
+class TxSchedulerTest(unittest.TestCase):
+    def test_nested_submit_runs_at_once(self) -> None:
+        async def scenario() -> list[str]:
+            queue = TxScheduler()
+            order: list[str] = []
+
+            async def ack() -> str:
+                order.append('ack')
+                return 'ack'
+
+            async def request() -> str:
+                order.append('request')
+                # answer handler sending an ACK from the running job
+                answer = await asyncio.wait_for(queue.submit(ack), 1)
+                order.append('done')
+                return answer
+
+            self.assertEqual(await queue.submit(request), 'ack')
+            await queue.stop()
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ['request', 'ack', 'done'])
+
+    def test_spawned_task_is_queued(self) -> None:
+        async def scenario() -> list[str]:
+            queue = TxScheduler()
+            log: list[str] = []
+            spawned: list[asyncio.Future] = []
+
+            def job(name: str, duration: float = 0.05):
+                async def run() -> str:
+                    log.append(f'{name} start')
+                    await asyncio.sleep(duration)
+                    log.append(f'{name} end')
+                    return name
+                return run
+
+            async def later() -> str:
+                await asyncio.sleep(0.01)
+                return await queue.submit(job('spawned'), caller='c')
+
+            async def first() -> str:
+                spawned.append(asyncio.create_task(later()))
+                return await job('first')()
+
+            results = await asyncio.gather(queue.submit(first, caller='a'),
+                                           queue.submit(job('second'),
+                                                        caller='b'))
+            results.append(await spawned[0])
+            await queue.stop()
+            self.assertEqual(results, ['first', 'second', 'spawned'])
+            return log
+
+        log: list[str] = asyncio.run(scenario())
+        self.assertEqual(log, ['first start', 'first end', 'second start',
+                               'second end', 'spawned start', 'spawned end'])
+
+    def test_deadline_expires_while_queued(self) -> None:
+        async def scenario() -> float:
+            queue = TxScheduler()
+
+            async def long_job() -> None:
+                await asyncio.sleep(0.5)
+
+            async def short_job() -> None:
+                pass
+
+            running = queue.submit(long_job)
+            started: float = time.monotonic()
+            late = queue.submit(short_job, deadline=started + 0.05)
+            with self.assertRaises(TxDeadlineExceeded):
+                await late
+            waited: float = time.monotonic() - started
+            await running
+            await queue.stop()
+            return waited
+
+        self.assertLess(asyncio.run(scenario()), 0.3)
+
+    def test_priority_during_budget_wait(self) -> None:
+        async def scenario() -> list[str]:
+            queue = TxScheduler(duty_cycle=0.01, window=0.5)  # 5 ms
+            order: list[str] = []
+
+            def job(name: str):
+                async def run() -> None:
+                    order.append(name)
+                    queue.account(4)
+                return run
+
+            await queue.submit(job('first'), 5, 'x', airtime_ms=4)
+            low = queue.submit(job('low'), 5, 'x', airtime_ms=4)
+            await asyncio.sleep(0.05)  # low waits for the budget
+            high = queue.submit(job('high'), 0, 'y', airtime_ms=4)
+            await asyncio.gather(low, high)
+            await queue.stop()
+            self.assertEqual(queue._turns, {})
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ['first', 'high', 'low'])
+
+    def test_wait_budget(self) -> None:
+        async def scenario() -> float:
+            queue = TxScheduler(duty_cycle=0.01, window=0.3)  # 3 ms
+            queue.account(3)
+            started: float = time.monotonic()
+            await queue.wait_budget(1)
+            return time.monotonic() - started
+
+        self.assertGreater(asyncio.run(scenario()), 0.2)
+
+
+class RadioTxQueueTest(unittest.TestCase):
+    def test_ack_from_answer_handler(self) -> None:
+        async def scenario() -> tuple[bytes | None, list[bytes]]:
+            chips = (SX127xEmulator(time_scale=0.05),
+                     SX127xEmulator(time_scale=0.05))
+            chips[0].link(chips[1])
+            node, peer = (RadioController('lora', sf=7, bw=500)
+                          for _ in chips)
+            for radio, chip in zip((node, peer), chips):
+                radio.driver.set_interface(EmulatorInterface(chip))
+                await radio.driver.interface.connect()
+                await radio.current_mode.init()
+            heard: list[bytes] = []
+
+            async def answer(packet) -> None:
+                heard.append(bytes(packet.data))
+                if packet.data == b'request':
+                    await asyncio.sleep(0.03)  # turnaround of the peer
+                    await peer.send_single(b'answer')
+
+            async def ack(packet) -> bool:
+                await node.send_single(b'ack')
+                return True
+
+            peer.received.subscribe(answer)
+            await peer.driver.set_rx_continuous_mode()
+            rx_task = asyncio.create_task(peer.rx_routine())
+            transaction = await asyncio.wait_for(
+                node.send_repeat(b'request', 0.5, max_retries=3,
+                                 answer_handler=ack), 5)
+            await asyncio.sleep(0.2)
+            await peer.finish_rx_routine()
+            await rx_task
+            for radio in (node, peer):
+                await radio.disconnect()
+            answer_data = transaction.answer.data if transaction.answer \
+                else None
+            return answer_data, heard
+
+        answer_data, heard = asyncio.run(scenario())
+        self.assertEqual(answer_data, b'answer')
+        self.assertEqual(heard[-1], b'ack')
+
+
+if __name__ == '__main__':
+    unittest.main()
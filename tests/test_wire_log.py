@@ -0,0 +1,74 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from async_sx127x.interfaces.wire_log import (WireDirection, read_wire_log,
+                                              recording)
+from async_sx127x.radio_controller import RadioController
+
+
+class WireLogTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = Path(self._dir.name, 'init.wire')
+
+    def tearDown(self) -> None:
+        self._dir.cleanup()
+
+    def _record(self) -> None:
+        async def scenario() -> None:
+            radio = RadioController('lora', sf=9, bw=125, wire_log=self.path)
+            self.assertTrue(await radio.connect('emulator'))
+            await radio.driver.get_lora_sf()
+            await radio.driver.disconnect()
+
+        asyncio.run(scenario())
+
+    def _playback(self, **settings) -> tuple[int, bool, int]:
+        async def scenario() -> tuple[int, bool, int]:
+            radio = RadioController('lora', **settings)
+            self.assertTrue(await radio.connect(f'playback:{self.path}'))
+            sf: int = await radio.driver.get_lora_sf()
+            interface = radio.driver.interface
+            result = interface.mismatches, interface.finished, sf
+            await radio.driver.disconnect()
+            return result
+
+        return asyncio.run(scenario())
+
+    def test_recording_context(self) -> None:
+        async def scenario() -> int:
+            radio = RadioController('lora')
+            self.assertTrue(await radio.connect('emulator'))
+            async with recording(radio.driver.interface, self.path) as log:
+                await radio.driver.get_lora_sf()
+            await radio.driver.disconnect()
+            return log.writes
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual([event.direction for event in read_wire_log(self.path)],
+                         [WireDirection.WRITE, WireDirection.READ])
+
+    def test_record(self) -> None:
+        self._record()
+        events = read_wire_log(self.path)
+        writes = [event for event in events
+                  if event.direction == WireDirection.WRITE]
+        self.assertTrue(writes)
+        times = [event.time_ns for event in events]
+        self.assertEqual(times, sorted(times))
+
+    def test_playback_same_config(self) -> None:
+        self._record()
+        self.assertEqual(self._playback(sf=9, bw=125), (0, True, 9))
+
+    def test_playback_counts_mismatches(self) -> None:
+        self._record()
+        mismatches, _, sf = self._playback(sf=7, bw=125)
+        self.assertGreater(mismatches, 0)
+        self.assertEqual(sf, 9)  # replies are served as recorded
+
+
+if __name__ == '__main__':
+    unittest.main()